@@ -0,0 +1,158 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Synthetic evidence locker generator."""
+
+import json
+import tempfile
+from datetime import datetime as dt, timedelta
+from pathlib import Path
+
+from compliance.utils.data_parse import format_json, get_sha256_hash
+
+import git
+
+BASE_DATE = dt(2020, 1, 1)
+BRANCH = "master"
+GITCONFIG = {"user": {"email": "prune-bench@example.com", "name": "prune-bench"}}
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def generate_locker(
+    path,
+    evidences=100,
+    partitioned=0,
+    partitions=4,
+    folders=10,
+    tombstones=0,
+    history=1,
+    content_size=256,
+):
+    """
+    Generate a synthetic evidence locker as a bare git repository.
+
+    Evidence is spread evenly across ``raw/bench<N>`` folders, each with its
+    own index file.  The first ``partitioned`` evidence are partitioned.  Each
+    index file is padded with ``tombstones`` previously pruned evidence entries
+    to grow its size.  The first commit adds every evidence and each further
+    commit updates an evenly spread slice of the evidence, so ``history`` sets
+    the commit history depth.  Generated content and timestamps are fixed so
+    that lockers generated with the same arguments are identical.
+
+    :param path: the path of the bare git repository to create.
+    :param evidences: the number of evidence.
+    :param partitioned: the number of partitioned evidence.
+    :param partitions: the number of partitions for each partitioned evidence.
+    :param folders: the number of evidence folders.
+    :param tombstones: the number of pruned evidence entries in each index file.
+    :param history: the number of commits.
+    :param content_size: the approximate size of each evidence file in bytes.
+
+    :returns: the sorted list of generated evidence paths.
+    """
+    with tempfile.TemporaryDirectory() as work:
+        repo = git.Repo.init(work)
+        repo.git.symbolic_ref("HEAD", f"refs/heads/{BRANCH}")
+        indexes = {}
+        for folder in range(folders):
+            indexes[f"raw/bench{folder}"] = _get_tombstoned(tombstones)
+        paths = []
+        for commit in range(history):
+            updated = []
+            ev_nums = range(commit, evidences, history) if commit else range(evidences)
+            for ev_num in ev_nums:
+                updated.extend(
+                    _write_evidence(
+                        work,
+                        indexes,
+                        ev_num,
+                        folders,
+                        partitioned,
+                        partitions,
+                        content_size,
+                        commit,
+                    )
+                )
+            for folder, metadata in indexes.items():
+                index_file = Path(work, folder, "index.json")
+                index_file.parent.mkdir(parents=True, exist_ok=True)
+                index_file.write_text(format_json(metadata))
+                updated.append(str(index_file))
+            repo.index.add(updated)
+            repo.index.commit(f"Synthetic evidence update {commit}")
+            if not commit:
+                paths = sorted(
+                    f"{folder}/{name}"
+                    for folder, metadata in indexes.items()
+                    for name, ev_meta in metadata.items()
+                    if "last_update" in ev_meta
+                )
+        repo.close()
+        git.Repo.clone_from(work, path, bare=True).close()
+    return paths
+
+
+def _get_timestamp(commit):
+    return (BASE_DATE + timedelta(days=commit)).strftime(TIMESTAMP_FORMAT)
+
+
+def _get_tombstoned(count):
+    metadata = {}
+    for num in range(count):
+        metadata[f"pruned_{num:06d}.json"] = {
+            "description": "Synthetic pruned evidence",
+            "pruned_by": GITCONFIG["user"]["email"],
+            "tombstones": {
+                f"pruned_{num:06d}.json": [
+                    {
+                        "eol": _get_timestamp(1),
+                        "last_update": _get_timestamp(0),
+                        "reason": "Synthetic evidence pruned",
+                    }
+                ]
+            },
+        }
+    return metadata
+
+
+def _write_evidence(
+    work, indexes, ev_num, folders, partitioned, partitions, content_size, commit
+):
+    folder = f"raw/bench{ev_num % folders}"
+    name = f"evidence_{ev_num:06d}.json"
+    Path(work, folder).mkdir(parents=True, exist_ok=True)
+    ev_meta = {
+        "description": f"Synthetic evidence {ev_num}",
+        "last_update": _get_timestamp(commit),
+        "ttl": 86400,
+    }
+    indexes[folder][name] = ev_meta
+    data = "x" * content_size
+    if ev_num >= partitioned:
+        ev_file = Path(work, folder, name)
+        ev_file.write_text(json.dumps({"commit": commit, "data": data}))
+        return [str(ev_file)]
+    ev_meta.update(
+        {"partition_fields": ["region"], "partition_root": None, "partitions": {}}
+    )
+    ev_files = []
+    for part in range(partitions):
+        key = [f"region-{part}"]
+        part_hash = get_sha256_hash(key, 10)
+        ev_meta["partitions"][part_hash] = key
+        ev_file = Path(work, folder, f"{part_hash}_{name}")
+        ev_file.write_text(
+            json.dumps([{"region": key[0], "commit": commit, "data": data}])
+        )
+        ev_files.append(str(ev_file))
+    return ev_files
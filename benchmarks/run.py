@@ -0,0 +1,225 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune benchmark runner."""
+
+import argparse
+import json
+import logging
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from compliance.utils.data_parse import format_json
+
+import git
+
+from benchmarks.generator import GITCONFIG, generate_locker
+
+from prune import __version__ as version
+from prune.locker import PruneLocker
+
+PRUNER = GITCONFIG["user"]["email"]
+REASON = "Synthetic evidence pruned"
+REPEAT = 3
+TOLERANCE = 0.25
+SCENARIOS = {
+    "baseline": {"evidences": 500, "folders": 10, "prune": 100},
+    "partitioned": {
+        "evidences": 500,
+        "partitioned": 250,
+        "partitions": 8,
+        "folders": 10,
+        "prune": 100,
+    },
+    "large-index": {
+        "evidences": 500,
+        "folders": 2,
+        "tombstones": 5000,
+        "prune": 100,
+    },
+    "deep-history": {"evidences": 500, "folders": 10, "history": 250, "prune": 100},
+}
+
+
+def run_scenario(spec, repeat=REPEAT):
+    """
+    Benchmark pruning evidence from a synthetic locker.
+
+    The locker is generated once and every run prunes the same evidence from
+    a fresh copy of it, pushing to the copy through a ``file://`` URL.  Half
+    of the evidence is removed one at a time using ``remove_evidence`` and the
+    other half in bulk using ``remove_evidences``.
+
+    :param spec: the scenario as a dictionary of locker generator arguments
+      along with the number of evidence to ``prune``.
+    :param repeat: the number of runs.
+
+    :returns: a dictionary of phase name/timing statistics pairs.
+    """
+    spec = dict(spec)
+    prune = spec.pop("prune")
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        origin = Path(tmp, "origin.git")
+        paths = generate_locker(origin, **spec)
+        targets = paths[:: max(len(paths) // prune, 1)][:prune]
+        for run in range(repeat):
+            remote = Path(tmp, f"remote-{run}.git")
+            shutil.copytree(origin, remote)
+            runs.append(_prune(remote, Path(tmp, f"locker-{run}"), targets))
+    phases = {}
+    for run in runs:
+        for name, phase in run.items():
+            phases.setdefault(name, []).append(phase)
+    return {
+        name: {
+            "median": statistics.median(p["seconds"] for p in timings),
+            "min": min(p["seconds"] for p in timings),
+            "count": timings[0]["count"],
+        }
+        for name, timings in phases.items()
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Compare benchmark results with baseline results.
+
+    :param results: the benchmark results.
+    :param baseline: the baseline benchmark results.
+    :param tolerance: the allowed slow down as a fraction of the baseline.
+
+    :returns: a list of regression messages.
+    """
+    regressions = []
+    for scenario, phases in results["scenarios"].items():
+        base_phases = baseline["scenarios"].get(scenario, {}).get("phases", {})
+        for name, phase in phases["phases"].items():
+            if name not in base_phases:
+                continue
+            base = base_phases[name]["median"]
+            if phase["median"] > base * (1 + tolerance):
+                regressions.append(
+                    f"{scenario} {name}: {phase['median']:.3f}s "
+                    f"vs {base:.3f}s baseline"
+                )
+    return regressions
+
+
+def _prune(remote, local_path, targets):
+    locker = PruneLocker(
+        name=f"prune-bench-{local_path.name}",
+        repo_url=f"file://{remote}",
+        do_push=True,
+        gitconfig=GITCONFIG,
+        local_path=str(local_path),
+    )
+    locker.logger.setLevel(logging.WARNING)
+    with locker:
+        evidences = locker.resolve_evidences({target: REASON for target in targets})
+        _tombstone(locker, evidences)
+        half = len(evidences) // 2
+        with locker.timer.phase("remove-evidence", count=half):
+            for evidence, reason in evidences[:half]:
+                locker.remove_evidence(evidence, reason, PRUNER)
+        with locker.timer.phase("remove-evidences", count=len(evidences) - half):
+            locker.remove_evidences(evidences[half:], PRUNER)
+    locker.repo.close()
+    return locker.timer.get_report()["phases"]
+
+
+def _tombstone(locker, evidences):
+    # Tombstone copies of the index metadata, leaving the locker untouched
+    indexes = {}
+    for evidence, _ in evidences:
+        index_file = locker.get_index_file(evidence)
+        if index_file not in indexes:
+            indexes[index_file] = json.loads(Path(index_file).read_text())
+    with locker.timer.phase("tombstone", count=len(evidences)):
+        for evidence, reason in evidences:
+            locker.tombstone_metadata(
+                indexes[locker.get_index_file(evidence)], [(evidence, reason)], PRUNER
+            )
+
+
+def _get_environment():
+    return {
+        "git": ".".join(str(v) for v in git.Git().version_info),
+        "platform": platform.platform(),
+        "prune": version,
+        "python": platform.python_version(),
+    }
+
+
+def run(args=None):
+    """Run the prune benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scenario",
+        help="the scenario to run, can be repeated - defaults to all scenarios",
+        choices=SCENARIOS.keys(),
+        action="append",
+    )
+    parser.add_argument(
+        "--repeat",
+        help="the number of runs per scenario - defaults to %(default)s",
+        type=int,
+        default=REPEAT,
+    )
+    parser.add_argument("--output", help="path to write the JSON results to")
+    parser.add_argument(
+        "--baseline", help="path to JSON results to check for regressions against"
+    )
+    parser.add_argument(
+        "--tolerance",
+        help=(
+            "the allowed slow down as a fraction of the baseline "
+            "- defaults to %(default)s"
+        ),
+        type=float,
+        default=TOLERANCE,
+    )
+    args = parser.parse_args(args)
+    results = {"environment": _get_environment(), "scenarios": {}}
+    for scenario in args.scenario or SCENARIOS.keys():
+        start = time.perf_counter()
+        phases = run_scenario(SCENARIOS[scenario], args.repeat)
+        results["scenarios"][scenario] = {
+            "spec": SCENARIOS[scenario],
+            "phases": phases,
+        }
+        print(f"\n{scenario} ({time.perf_counter() - start:.1f}s)")
+        for name, phase in phases.items():
+            print(
+                f"  {name:<16} median {phase['median']:>8.3f}s  "
+                f"min {phase['min']:>8.3f}s  count {phase['count']}"
+            )
+    if args.output:
+        Path(args.output).write_text(format_json(results))
+    if args.baseline:
+        regressions = compare(
+            results, json.loads(Path(args.baseline).read_text()), args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -13,4 +13,4 @@
 # limitations under the License.
 """The Auditree abandoned evidence management tool."""
 
-__version__ = "1.0.0"
+__version__ = "1.1.0"
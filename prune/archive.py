@@ -0,0 +1,109 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune locker archival helpers."""
+
+import os
+
+import git
+
+
+def get_object_store_size(repo):
+    """
+    Provide the size of a repository object store.
+
+    :param repo: the GitPython repository object.
+
+    :returns: the size in bytes of the loose objects, packs and pack indexes.
+    """
+    size = 0
+    for root, _, files in os.walk(os.path.join(repo.git_dir, "objects")):
+        size += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return size
+
+
+def push_to_archive(repo, archive_path, rev, ref):
+    """
+    Archive the history of a revision in a bare archive repository.
+
+    The archive repository is created if it does not exist.  A push only
+    transfers the objects that the archive does not hold yet, so the archive
+    grows by the history written, or rewritten, since the previous archive.
+
+    :param repo: the GitPython repository object.
+    :param archive_path: the path of the bare archive repository.
+    :param rev: the revision, typically a branch, to archive.
+    :param ref: the archive repository reference to archive the history to.
+    """
+    archive_path = os.path.abspath(archive_path)
+    if not os.path.isdir(archive_path):
+        git.Repo.init(archive_path, bare=True).close()
+    repo.git.push(archive_path, f"+{rev}:{ref}")
+
+
+def remove_from_history(repo, branch, pathspec_file):
+    """
+    Rewrite the history of a branch without the supplied paths.
+
+    The rewrite uses ``git filter-branch`` with an index filter so that no
+    working tree is checked out for each commit.  Paths are read from a file,
+    one literal path per line.
+
+    :param repo: the GitPython repository object.
+    :param branch: the branch to rewrite.
+    :param pathspec_file: the path to the file listing the paths to remove.
+
+    :returns: a dictionary mapping each original commit SHA to the SHA of the
+      commit that replaces it in the rewritten history.
+    """
+    map_file = f"{os.path.abspath(pathspec_file)}.map"
+    repo.git.filter_branch(
+        "--force",
+        "--index-filter",
+        (
+            "git rm --cached --ignore-unmatch -q "
+            f"--pathspec-from-file={os.path.abspath(pathspec_file)}"
+        ),
+        "--commit-filter",
+        (
+            'sha=$(git commit-tree "$@") && '
+            f'echo "$GIT_COMMIT $sha" >> "{map_file}" && echo "$sha"'
+        ),
+        "--",
+        branch,
+        env={"FILTER_BRANCH_SQUELCH_WARNING": "1", "GIT_LITERAL_PATHSPECS": "1"},
+    )
+    commit_map = {}
+    if os.path.exists(map_file):
+        with open(map_file) as f:
+            commit_map = dict(line.split() for line in f if line.strip())
+        os.remove(map_file)
+    return commit_map
+
+
+def shrink(repo, refs=None):
+    """
+    Drop unreachable objects from a repository object store.
+
+    References to the rewritten history, such as the ``refs/original``
+    backups made by ``git filter-branch``, are deleted along with the
+    reflogs before repacking.
+
+    :param repo: the GitPython repository object.
+    :param refs: additional references to delete before repacking.
+    """
+    backups = repo.git.for_each_ref("--format=%(refname)", "refs/original/")
+    for ref in backups.splitlines() + list(refs or []):
+        repo.git.update_ref("-d", ref)
+    repo.git.reflog("expire", "--expire=now", "--all")
+    repo.git.gc("--prune=now", "--quiet")
@@ -0,0 +1,145 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune locker mirror cache."""
+
+import fcntl
+import hashlib
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlparse
+
+import git
+
+# The git default number of loose objects from which gc --auto repacks
+GC_AUTO = 6700
+
+
+class MirrorCache(object):
+    """
+    Maintain bare locker mirrors that persist between prune runs.
+
+    Each locker URL has its own bare mirror in the cache folder.  A mirror is
+    refreshed with an incremental fetch and prune runs work from a local clone
+    that shares the mirror's objects, so nothing is cloned from the remote
+    once the mirror exists.  Mirror access is serialized with a file lock so
+    that concurrent prune runs on the same host can share a mirror.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        Construct and initialize the mirror cache object.
+
+        :param cache_dir: the folder holding the locker mirrors.
+        """
+        self.cache_dir = Path(cache_dir).expanduser()
+
+    def get_mirror_path(self, repo_url):
+        """
+        Provide the path to the bare mirror of a locker.
+
+        :param repo_url: the URL of the locker without credentials.
+
+        :returns: the path to the locker mirror.
+        """
+        name = urlparse(repo_url).path.rstrip("/").rsplit("/", 1)[-1]
+        if name.endswith(".git"):
+            name = name[:-4]
+        url_hash = hashlib.sha256(repo_url.encode()).hexdigest()[:12]
+        return self.cache_dir / f"{name}-{url_hash}.git"
+
+    @contextmanager
+    def lock(self, repo_url):
+        """
+        Provide exclusive access to a locker mirror.
+
+        :param repo_url: the URL of the locker without credentials.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        lock_path = self.get_mirror_path(repo_url).with_suffix(".lock")
+        with open(lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def refresh(self, repo_url, repo_url_with_creds):
+        """
+        Create or incrementally update the bare mirror of a locker.
+
+        Credentials are only used for the network operation and are not
+        stored in the mirror configuration.  A new mirror is cloned to a
+        temporary folder and only moved into place once complete, so that an
+        interrupted clone does not leave a broken mirror behind.
+
+        Automatic garbage collection is disabled in the mirror so that git
+        never collects garbage in the background, outside of the mirror lock,
+        while clones share the mirror objects.  Garbage is instead collected
+        after each fetch, with the lock held, once the mirror holds enough
+        loose objects or packs for ``git gc --auto`` to act.  Call it with the
+        mirror lock held.
+
+        :param repo_url: the URL of the locker without credentials.
+        :param repo_url_with_creds: the URL of the locker with credentials.
+
+        :returns: the path to the locker mirror.
+        """
+        mirror_path = self.get_mirror_path(repo_url)
+        if not mirror_path.is_dir():
+            # Left behind by an interrupted run, which no longer holds the lock
+            tmp_path = mirror_path.with_suffix(".tmp")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            mirror = git.Repo.clone_from(repo_url_with_creds, tmp_path, mirror=True)
+            mirror.remote().set_url(repo_url)
+            with mirror.config_writer() as cw:
+                cw.set_value("gc", "auto", 0)
+            mirror.close()
+            tmp_path.rename(mirror_path)
+            return mirror_path
+        mirror = git.Repo(mirror_path)
+        mirror.git.fetch("--prune", repo_url_with_creds, "+refs/*:refs/*")
+        mirror.git(c=[f"gc.auto={GC_AUTO}", "gc.autoDetach=false"]).gc(
+            "--auto", "--quiet"
+        )
+        mirror.close()
+        return mirror_path
+
+    def clone(self, repo_url, repo_url_with_creds, local_path, branch, **kwargs):
+        """
+        Provide a local locker clone that shares the objects of its mirror.
+
+        The mirror is refreshed first.  The clone's remote points to the
+        locker itself so that pushing does not go through the mirror.
+
+        :param repo_url: the URL of the locker without credentials.
+        :param repo_url_with_creds: the URL of the locker with credentials.
+        :param local_path: the path to clone the locker to.
+        :param branch: the branch to check out.
+        :param kwargs: additional git clone options.
+
+        :returns: the cloned GitPython repository object.
+        """
+        with self.lock(repo_url):
+            mirror_path = self.refresh(repo_url, repo_url_with_creds)
+            repo = git.Repo.clone_from(
+                str(mirror_path),
+                local_path,
+                shared=True,
+                single_branch=True,
+                branch=branch,
+                **kwargs,
+            )
+        repo.remote().set_url(repo_url_with_creds)
+        return repo
@@ -11,24 +11,46 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-"""Prune command line interface."""
+"""
+Prune command line interface.
 
+The compliance framework and GitPython are only imported once a command runs
+so that help, version and argument validation stay fast.
+"""
+
+import cProfile
+import hashlib
 import json
 import os
 import shutil
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
 
-from compliance.utils.credentials import Config
-from compliance.config import get_config
+from compliance.utils.data_parse import format_json
 
 from ilcli import Command
 
 from prune import __version__ as version
-from prune.locker import PruneLocker
+from prune.constants import CLONE_MODES, COMPACT_PARTITIONS, PUSH_RETRIES
+from prune.manifest import chunked, read_manifest, write_manifest
+from prune.selectors import get_selector_folder, validate_selector
+from prune.trash import CLEANUP_MODES, Trash
+
+
+CHUNK_SIZE = 1000
+PARALLEL_LOCKERS = 4
+CLONE_LIMIT = 4
+PRUNE_LIMIT = 8
+PUSH_LIMIT = 2
+THRESHOLD_DAYS = 30
+TOMBSTONE_DB = "~/.prune/tombstones.db"
 
 
 class _CorePruneCommand(Command):
+    trash = None
+
     def _init_arguments(self):
         self.add_argument(
             "locker",
@@ -36,6 +58,82 @@ class _CorePruneCommand(Command):
                 "the URL to the evidence locker repository, "
                 "as an example https://github.com/my-org/my-repo"
             ),
+            nargs="?",
+        )
+        self.add_argument(
+            "--lockers-file",
+            help=(
+                "path to a JSON file of locker URL/prune configuration pairs, "
+                "where a prune configuration is either a JSON object of "
+                "evidence-path/reason pairs or the path to a config file"
+            ),
+            metavar="~/path/to/lockers_file.json",
+            default=False,
+        )
+        self.add_argument(
+            "--parallel",
+            help=(
+                "the number of lockers from a --lockers-file pruned at the "
+                "same time - defaults to %(default)s"
+            ),
+            type=int,
+            default=PARALLEL_LOCKERS,
+        )
+        self.add_argument(
+            "--pipeline",
+            help=(
+                "prune the lockers from a --lockers-file in a pipeline, "
+                "overlapping the clone, prune, push and cleanup of different "
+                "lockers, rather than pruning --parallel lockers at a time"
+            ),
+            action="store_true",
+        )
+        self.add_argument(
+            "--clone-limit",
+            help="with --pipeline, the number of concurrent clones "
+            "- defaults to %(default)s",
+            type=int,
+            default=CLONE_LIMIT,
+        )
+        self.add_argument(
+            "--prune-limit",
+            help="with --pipeline, the number of lockers pruned or cleaned up "
+            "at the same time - defaults to %(default)s",
+            type=int,
+            default=PRUNE_LIMIT,
+        )
+        self.add_argument(
+            "--push-limit",
+            help="with --pipeline, the number of concurrent pushes "
+            "- defaults to %(default)s",
+            type=int,
+            default=PUSH_LIMIT,
+        )
+        self.add_argument(
+            "--workers",
+            help=(
+                "the number of threads used to retrieve and tombstone evidence "
+                "within a locker - defaults to %(default)s"
+            ),
+            type=int,
+            default=1,
+        )
+        self.add_argument(
+            "--timings",
+            help="display wall time, counts and bytes for each prune phase",
+            action="store_true",
+        )
+        self.add_argument(
+            "--timings-file",
+            help="path to write a JSON report of the prune phase timings to",
+            metavar="~/path/to/timings.json",
+            default=False,
+        )
+        self.add_argument(
+            "--profile",
+            help="path to write cProfile statistics for the prune run to",
+            metavar="~/path/to/prune.prof",
+            default=False,
         )
         self.add_argument(
             "--branch",
@@ -57,10 +155,22 @@ class _CorePruneCommand(Command):
         )
         self.add_argument(
             "--config-file",
-            help="path to a file containing the files to prune",
+            help=(
+                "path to a file containing the files to prune, either a JSON "
+                "object or a JSON Lines (.jsonl) or CSV (.csv) manifest"
+            ),
             metavar="~/path/to/config_file.json",
             default=False,
         )
+        self.add_argument(
+            "--chunk-size",
+            help=(
+                "the number of configuration entries processed at a time "
+                "- defaults to %(default)s"
+            ),
+            type=int,
+            default=CHUNK_SIZE,
+        )
         self.add_argument(
             "--git-config",
             help="JSON git configuration for signing commits",
@@ -79,68 +189,555 @@ class _CorePruneCommand(Command):
             metavar="~/path/to/git_config_file.json",
             default=False,
         )
+        self.add_argument(
+            "--clone-mode",
+            help=(
+                "the locker clone strategy - defaults to %(default)s.  "
+                "sparse and blobless only check out the folders holding "
+                "the evidence to prune"
+            ),
+            choices=CLONE_MODES,
+            default="full",
+        )
+        self.add_argument(
+            "--cache-dir",
+            help=(
+                "keep a mirror of the locker in this folder and refresh it "
+                "incrementally rather than cloning the locker on every run"
+            ),
+            metavar="~/path/to/cache",
+            default=False,
+        )
+        self.add_argument(
+            "--report",
+            help=(
+                "dry-run only, path to write a report of the planned changes "
+                "to as JSON or as Markdown (.md).  The report is built from "
+                "the git object database without checking out the locker"
+            ),
+            metavar="~/path/to/report.json",
+            default=False,
+        )
+        self.add_argument(
+            "--checkpoint-items",
+            help="commit pruned evidence every time this many evidence are pruned",
+            type=int,
+            default=None,
+        )
+        self.add_argument(
+            "--checkpoint-seconds",
+            help="commit pruned evidence every time this many seconds pass",
+            type=int,
+            default=None,
+        )
+        self.add_argument(
+            "--checkpoint-push",
+            help="push to the remote locker after each checkpoint commit",
+            action="store_true",
+        )
+        self.add_argument(
+            "--resume",
+            help=(
+                "resume an interrupted run, reusing its local locker if present "
+                "and skipping evidence that is already pruned"
+            ),
+            action="store_true",
+        )
+        self.add_argument(
+            "--compact-partitions",
+            help=(
+                "the number of partitions from which partitioned evidence gets "
+                "a single compact tombstone rather than one per partition "
+                "- defaults to %(default)s"
+            ),
+            type=int,
+            default=COMPACT_PARTITIONS,
+        )
+        self.add_argument(
+            "--bare",
+            help=(
+                "prune without checking out the locker files, writing index "
+                "file updates and evidence removals straight to git.  "
+                "Requires a full or shallow clone"
+            ),
+            action="store_true",
+        )
+        self.add_argument(
+            "--split-tombstones",
+            help=(
+                "move pruned evidence entries and their tombstones from index "
+                "files to tombstones.json files under notifications/prune/"
+                "tombstones"
+            ),
+            action="store_true",
+        )
+        self.add_argument(
+            "--cleanup",
+            help=(
+                "how local lockers are removed - defaults to %(default)s.  "
+                "background and detached move local lockers to a trash folder "
+                "and delete them in a background thread or in a separate "
+                "process.  defer moves local lockers to the trash folder and "
+                "leaves them for a later run to delete"
+            ),
+            choices=CLEANUP_MODES,
+            default="sync",
+        )
+        self.add_argument(
+            "--archive-dir",
+            help=(
+                "archive the locker history to a git repository in this folder, "
+                "then remove archived evidence from the locker history and "
+                "repack it.  Requires a full clone"
+            ),
+            metavar="~/path/to/archive",
+            default=False,
+        )
+        self.add_argument(
+            "--archive-days",
+            help=(
+                "with --archive-dir, archive pruned evidence last updated at "
+                "least this many days ago - defaults to %(default)s"
+            ),
+            type=int,
+            default=0,
+        )
+        self.add_argument(
+            "--tombstone-db",
+            help=(
+                "update the tombstone index in this SQLite database after "
+                "pushing, for use by the lookup and recover commands"
+            ),
+            metavar="~/path/to/tombstones.db",
+            default=False,
+        )
+        self.add_argument(
+            "--push-retries",
+            help=(
+                "the number of times a push rejected because the remote locker "
+                "changed is retried after merging the remote changes "
+                "- defaults to %(default)s"
+            ),
+            type=int,
+            default=PUSH_RETRIES,
+        )
 
     def _validate_arguments(self, args):
-        parsed = urlparse(args.locker)
-        if not (parsed.scheme and parsed.hostname and parsed.path):
+        if bool(args.locker) == bool(args.lockers_file):
+            return "ERROR: Provide either a locker url or a --lockers-file."
+        if args.locker and not is_locker_url(args.locker):
             return "ERROR: locker url must be of the form " "https://hostname/org/repo"
-        if bool(args.config) == bool(args.config_file):
+        if args.lockers_file and (args.config or args.config_file):
+            return "ERROR: Prune configurations are provided by the --lockers-file."
+        if args.locker and bool(args.config) == bool(args.config_file):
             return "ERROR: Provide either a --config or a --config-file."
         if args.git_config and args.git_config_file:
             return "ERROR: Provide either a --git-config or a --git-config-file."
+        if args.chunk_size < 1:
+            return "ERROR: --chunk-size must be a positive number."
+        if args.parallel < 1:
+            return "ERROR: --parallel must be a positive number."
+        if args.workers < 1:
+            return "ERROR: --workers must be a positive number."
+        if args.pipeline and not args.lockers_file:
+            return "ERROR: --pipeline requires a --lockers-file."
+        if args.profile and (args.lockers_file or args.workers > 1):
+            return (
+                "ERROR: --profile cannot be used with a --lockers-file "
+                "or more than one worker."
+            )
+        for limit in ["clone_limit", "prune_limit", "push_limit"]:
+            if getattr(args, limit) < 1:
+                option = limit.replace("_", "-")
+                return f"ERROR: --{option} must be a positive number."
+        if args.push_retries < 0:
+            return "ERROR: --push-retries must not be negative."
+        if args.compact_partitions < 1:
+            return "ERROR: --compact-partitions must be a positive number."
+        if args.cache_dir and args.clone_mode in ["shallow", "blobless"]:
+            return f"ERROR: --cache-dir cannot be used with {args.clone_mode} clones."
+        if args.report and self.name != "dry-run":
+            return "ERROR: --report is only available in dry-run mode."
+        if args.report and args.lockers_file:
+            return "ERROR: --report cannot be used with a --lockers-file."
+        if args.report and args.clone_mode in ["sparse", "blobless"]:
+            return f"ERROR: --report cannot be used with {args.clone_mode} clones."
+        for checkpoint in ["checkpoint_items", "checkpoint_seconds"]:
+            if getattr(args, checkpoint) is not None and getattr(args, checkpoint) < 1:
+                option = checkpoint.replace("_", "-")
+                return f"ERROR: --{option} must be a positive number."
+        if args.checkpoint_push and not (
+            args.checkpoint_items or args.checkpoint_seconds
+        ):
+            return (
+                "ERROR: --checkpoint-push requires --checkpoint-items "
+                "or --checkpoint-seconds."
+            )
+        if args.archive_dir and (args.clone_mode != "full" or args.cache_dir):
+            return "ERROR: --archive-dir requires a full clone without --cache-dir."
+        if args.bare and args.clone_mode in ["sparse", "blobless"]:
+            return f"ERROR: --bare cannot be used with {args.clone_mode} clones."
+        if args.bare and args.archive_dir:
+            return "ERROR: --bare cannot be used with --archive-dir."
+        if args.archive_dir and args.resume:
+            return "ERROR: --archive-dir cannot be used with --resume."
+        if args.archive_days < 0:
+            return "ERROR: --archive-days must not be negative."
+        if args.tombstone_db and self.name != "push-remote":
+            return "ERROR: --tombstone-db is only available in push-remote mode."
 
     def _run(self, args):
+        try:
+            if not args.profile:
+                return self._execute(args)
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(self._execute, args)
+            finally:
+                profiler.dump_stats(args.profile)
+                self.out(f"Profile statistics written to {args.profile}")
+        finally:
+            # Local lockers trashed in the background are deleted before exiting
+            if self.trash:
+                self.trash.wait()
+
+    def _execute(self, args):
         self.out(self.intro_msg)
+        if args.cleanup != "sync":
+            self.trash = Trash(args.cleanup)
         gitconfig = None
         if args.git_config or args.git_config_file:
             gitconfig = args.git_config or json.loads(open(args.git_config_file).read())
         if args.branch:
-            c = get_config()
-            c.load()
-            c.raw_config["locker"]["default_branch"] = args.branch
+            set_default_branch(args.branch)
+        if args.lockers_file:
+            return self._run_lockers(args, gitconfig)
+        if args.report:
+            return self._plan(args, args.config or args.config_file, gitconfig)
+        locker = self._prune(
+            args, args.locker, args.config or args.config_file, gitconfig
+        )
+        if isinstance(locker, str):
+            return locker
+        self.out(self.outro_msg)
+        self._cleanup(locker)
+        self._report_timings(args, {args.locker: locker.timer})
+
+    def _run_lockers(self, args, gitconfig):
+        lockers = json.loads(open(args.lockers_file).read())
+        for repo in lockers.keys():
+            if not is_locker_url(repo):
+                return (
+                    f"ERROR: locker url {repo} must be of the form "
+                    "https://hostname/org/repo"
+                )
+        if args.pipeline:
+            results = self._run_pipeline(args, lockers, gitconfig)
+        else:
+            results = {}
+            with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+                futures = {
+                    pool.submit(self._prune_locker, args, repo, config, gitconfig): repo
+                    for repo, config in lockers.items()
+                }
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+        self.out(self.outro_msg)
+        self.out("\nPrune results:")
+        for repo in lockers.keys():
+            result = results[repo]
+            status = "ERROR" if result["error"] else "OK"
+            detail = result["error"] or f"{result['pruned']} evidence pruned"
+            self.out(f"  {status} {repo}: {detail} in {result['duration']:.3f}s")
+        self._report_timings(
+            args,
+            {
+                repo: result["timer"]
+                for repo, result in results.items()
+                if result["timer"] is not None
+            },
+        )
+        if any(result["error"] for result in results.values()):
+            return 1
+
+    def _prune_locker(self, args, repo, config, gitconfig):
+        start = time.perf_counter()
+        result = {"pruned": 0, "error": None, "timer": None}
+        try:
+            locker = self._prune(args, repo, config, gitconfig, get_locker_name(repo))
+            if isinstance(locker, str):
+                result["error"] = locker
+            else:
+                result["pruned"] = locker.pruned_count
+                result["timer"] = locker.timer
+                self._cleanup(locker)
+        except Exception as e:
+            result["error"] = f"{e.__class__.__name__}: {e}"
+        result["duration"] = time.perf_counter() - start
+        return result
+
+    def _run_pipeline(self, args, lockers, gitconfig):
+        from prune.pipeline import PrunePipeline, Stage
+
+        def clone(job):
+            job["start"] = time.perf_counter()
+            name = get_locker_name(job["repo"])
+            locker_kwargs = self._get_locker_kwargs(args, job["config"], name)
+            if isinstance(locker_kwargs, str):
+                job["error"] = locker_kwargs
+                return
+            job["locker"] = self._get_locker(
+                job["repo"], args.creds, self.name, gitconfig, **locker_kwargs
+            )
+            job["locker"].init()
+
+        def prune(job):
+            self._prune_evidences(args, job["locker"], job["config"])
+            job["locker"].commit_pruned()
+            self._report_archive(job["locker"])
+
+        def push(job):
+            if job["locker"].repo_url_with_creds:
+                with job["locker"].timer.phase("push"):
+                    job["locker"].push()
+                self._report_kept(job["locker"])
+                self._index_tombstones(args, job["locker"])
+
+        def cleanup(job):
+            locker = job.get("locker")
+            job["pruned"] = locker.pruned_count if locker else 0
+            job["timer"] = locker.timer if locker else None
+            try:
+                # A failed locker is kept for inspection or a resumed run
+                if locker and not job["error"]:
+                    self._cleanup(locker)
+            finally:
+                job["duration"] = time.perf_counter() - job["start"]
+
+        pipeline = PrunePipeline(
+            [
+                Stage("clone", clone, args.clone_limit),
+                Stage("prune", prune, args.prune_limit),
+                Stage("push", push, args.push_limit),
+                Stage("cleanup", cleanup, args.prune_limit, always=True),
+            ]
+        )
+        jobs = pipeline.run(
+            {"repo": repo, "config": config} for repo, config in lockers.items()
+        )
+        return {job["repo"]: job for job in jobs}
+
+    def _prune(self, args, repo, config, gitconfig, name="prune"):
         # self.name drives the Locker push mode.
         #   - dry-run translates to locker no-push mode
         #   - push-remote translates to locker full-remote mode
-        locker_args = [args.locker, args.creds, self.name, gitconfig]
-        local_locker_path = None
-        evidences = args.config
-        if not evidences:
-            evidences = json.loads(open(args.config_file).read())
-        with self._get_locker(*locker_args) as locker:
-            self.out("Locker has been cloned...")
-            self.out(f"Local locker location is {locker.local_path}")
-            pruner = locker.repo.config_reader().get_value("user", "email")
-            for evidence, reason in evidences.items():
-                locker.remove_evidence(
-                    locker.get_evidence(evidence, ignore_ttl=True), reason, pruner
+        locker_kwargs = self._get_locker_kwargs(args, config, name)
+        if isinstance(locker_kwargs, str):
+            return locker_kwargs
+        with self._get_locker(
+            repo, args.creds, self.name, gitconfig, **locker_kwargs
+        ) as locker:
+            self._prune_evidences(args, locker, config)
+        self._report_kept(locker)
+        self._report_archive(locker)
+        self._index_tombstones(args, locker)
+        return locker
+
+    def _get_locker_kwargs(self, args, config, name):
+        try:
+            folder_paths = self._read_config(config)
+        except (OSError, ValueError) as e:
+            return f"ERROR: {e}"
+        sparse_paths = []
+        if args.clone_mode in ["sparse", "blobless"]:
+            sparse_paths = folder_paths
+            if sparse_paths is None:
+                return (
+                    f"ERROR: {args.clone_mode} clones require every evidence path "
+                    "and selector to start with a locker folder."
                 )
+        return {
+            "name": name,
+            "clone_mode": args.clone_mode,
+            "sparse_paths": sparse_paths,
+            "cache_dir": args.cache_dir,
+            "workers": args.workers,
+            "checkpoint_items": args.checkpoint_items,
+            "checkpoint_seconds": args.checkpoint_seconds,
+            "checkpoint_push": args.checkpoint_push,
+            "journal_path": f"{tempfile.gettempdir()}/{name}.journal.jsonl",
+            "resume": args.resume,
+            "archive_dir": args.archive_dir,
+            "archive_days": args.archive_days,
+            "compact_partitions": args.compact_partitions,
+            "split_tombstones": args.split_tombstones,
+            "bare": args.bare,
+            "push_retries": args.push_retries,
+        }
+
+    def _prune_evidences(self, args, locker, config):
+        self.out("Locker has been cloned...")
+        self.out(f"Local locker location is {locker.local_path}")
+        if locker.resumed_from:
+            self.out(
+                f"Resuming after checkpoint {locker.resumed_from['checkpoint']} "
+                f"with {locker.pruned_count} evidence already pruned..."
+            )
+        pruner = locker.repo.config_reader().get_value("user", "email")
+        chunk_size = min(args.chunk_size, args.checkpoint_items or args.chunk_size)
+        for chunk in chunked(self._get_entries(config), chunk_size):
+            evidences = locker.resolve_evidences(locker.select_evidences(dict(chunk)))
+            locker.remove_evidences(evidences, pruner)
+            for evidence, _ in evidences:
                 self.out(
-                    f"\nEvidence {evidence} removed by "
+                    f"\nEvidence {evidence.path} removed by "
                     f"{pruner}, tombstone applied..."
                 )
-            local_locker_path = locker.local_path
+            if locker.checkpoint():
+                self.out(
+                    f"\nCheckpoint {locker.checkpoints} committed, "
+                    f"{locker.pruned_count} evidence pruned so far..."
+                )
+
+    def _report_kept(self, locker):
+        for ev_path in locker.kept:
+            self.out(f"\nEvidence {ev_path} updated remotely, kept rather than pruned")
+
+    def _report_archive(self, locker):
+        if locker.archive_report:
+            report = locker.archive_report
+            self.out(
+                f"\nArchived {report['files']} files to {report['archive']}, "
+                f"object store reduced from {report['size_before']} "
+                f"to {report['size_after']} bytes"
+            )
+
+    def _index_tombstones(self, args, locker):
+        if not args.tombstone_db:
+            return
+        from prune.recovery import TombstoneIndex
+
+        with locker.timer.phase("tombstone-db"):
+            index = TombstoneIndex(args.tombstone_db)
+            try:
+                index.update(locker.repo_url, locker.repo)
+            finally:
+                index.close()
+
+    def _plan(self, args, config, gitconfig):
+        from prune.plan import PrunePlan, format_markdown
+
+        try:
+            self._read_config(config)
+        except (OSError, ValueError) as e:
+            return f"ERROR: {e}"
+        locker = self._get_locker(
+            args.locker,
+            args.creds,
+            self.name,
+            gitconfig,
+            clone_mode=args.clone_mode,
+            cache_dir=args.cache_dir,
+            no_checkout=True,
+            compact_partitions=args.compact_partitions,
+            split_tombstones=args.split_tombstones,
+        )
+        locker.init()
+        self.out("Locker has been cloned without a checkout...")
+        pruner = locker.repo.config_reader().get_value("user", "email")
+        plan = PrunePlan(locker)
+        with locker.timer.phase("plan"):
+            for chunk in chunked(self._get_entries(config), args.chunk_size):
+                plan.add(dict(chunk), pruner)
+        report = plan.get_report()
+        with open(args.report, "w") as f:
+            if args.report.lower().endswith(".md"):
+                f.write(format_markdown(report))
+            else:
+                f.write(format_json(report))
+        summary = report["summary"]
+        for error in plan.errors:
+            self.out(f"ERROR: {error['path']}: {error['error']}")
+        self.out(
+            f"\nPlanned removal of {summary['evidence']} evidence, "
+            f"{summary['files']} files and {summary['bytes']} bytes across "
+            f"{summary['index_files']} index files"
+        )
+        self.out(f"Dry-run report written to {args.report}")
         self.out(self.outro_msg)
-        self._remove_locker(local_locker_path)
+        locker.repo.close()
+        self._cleanup(locker)
+        self._report_timings(args, {args.locker: locker.timer})
+
+    def _cleanup(self, locker):
+        with locker.timer.phase("cleanup"):
+            self._remove_locker(locker.local_path)
+            if locker.journal_path and os.path.isfile(locker.journal_path):
+                os.remove(locker.journal_path)
+
+    def _report_timings(self, args, timers):
+        if args.timings:
+            for repo, timer in timers.items():
+                self.out(f"\n{repo}")
+                self.out(timer.format_report())
+        if args.timings_file:
+            with open(args.timings_file, "w") as f:
+                f.write(
+                    format_json(
+                        {repo: timer.get_report() for repo, timer in timers.items()}
+                    )
+                )
+            self.out(f"Timings report written to {args.timings_file}")
 
-    def _get_locker(self, repo, creds, mode, gitconfig=None):
-        local_locker_path = f"{tempfile.gettempdir()}/prune"
-        if os.path.isdir(local_locker_path):
+    def _get_entries(self, config):
+        if isinstance(config, dict):
+            return iter(config.items())
+        return read_manifest(config)
+
+    def _read_config(self, config):
+        # One pass over the configuration validates every selector and finds
+        # one path per locker folder, None if a path has no locker folder
+        folders = {}
+        sparse = True
+        for key, _ in self._get_entries(config):
+            validate_selector(key)
+            folder = get_selector_folder(key)
+            sparse = sparse and bool(folder)
+            folders.setdefault(folder, key)
+        return list(folders.values()) if sparse else None
+
+    def _get_locker(self, repo, creds, mode, gitconfig=None, name="prune", **kwargs):
+        from compliance.utils.credentials import Config
+
+        from prune.locker import PruneLocker
+
+        local_locker_path = f"{tempfile.gettempdir()}/{name}"
+        if os.path.isdir(local_locker_path) and kwargs.get("resume"):
+            self.out("Local locker found, resuming...")
+        elif os.path.isdir(local_locker_path):
             self.out("Local locker found...")
             self._remove_locker(local_locker_path)
+        journal_path = kwargs.get("journal_path")
+        if journal_path and os.path.isfile(journal_path) and not kwargs.get("resume"):
+            os.remove(journal_path)
         self.out(
             f"Cloning local locker for {repo}.  Depending on the "
             "size of your locker, this may take a while..."
         )
         return PruneLocker(
-            name="prune",
+            name=name,
             repo_url=repo,
             creds=Config(creds),
             do_push=True if mode == "push-remote" else False,
             gitconfig=gitconfig,
+            **kwargs,
         )
 
     def _remove_locker(self, locker_path):
         self.out("Removing local locker...")
+        if self.trash:
+            self.out(f"Trashed local locker {self.trash.move(locker_path)}...")
+            return
         shutil.rmtree(locker_path)
         self.out("Local locker has been removed...")
 
@@ -161,10 +758,292 @@ class PushToRemote(_CorePruneCommand):
     outro_msg = "Remote locker was updated..."
 
 
+class Scan(Command):
+    """Scan a locker for abandoned and orphaned evidence."""
+
+    name = "scan"
+
+    def _init_arguments(self):
+        self.add_argument(
+            "locker",
+            help=(
+                "the URL to the evidence locker repository, "
+                "as an example https://github.com/my-org/my-repo"
+            ),
+            nargs="?",
+        )
+        self.add_argument(
+            "--local-path",
+            help="path to a local evidence locker to scan instead of cloning one",
+            metavar="~/path/to/locker",
+            default=False,
+        )
+        self.add_argument(
+            "--branch",
+            help="Branch name for locker repository",
+            default=False,
+        )
+        self.add_argument(
+            "--creds",
+            metavar="~/path/creds",
+            help="the path to credentials file - defaults to %(default)s",
+            default="~/.credentials",
+        )
+        self.add_argument(
+            "--threshold-days",
+            help=(
+                "the number of days after its time to live expires that "
+                "evidence is considered abandoned - defaults to %(default)s"
+            ),
+            type=int,
+            default=THRESHOLD_DAYS,
+        )
+        self.add_argument(
+            "--workers",
+            help=(
+                "the number of threads used to parse index files "
+                "- defaults to %(default)s"
+            ),
+            type=int,
+            default=1,
+        )
+        self.add_argument(
+            "--output",
+            help=(
+                "path to write abandoned evidence to as a prune configuration "
+                "file, either a JSON object or a JSON Lines (.jsonl) or "
+                "CSV (.csv) manifest"
+            ),
+            metavar="~/path/to/config_file.jsonl",
+            default=False,
+        )
+
+    def _validate_arguments(self, args):
+        if bool(args.locker) == bool(args.local_path):
+            return "ERROR: Provide either a locker url or a --local-path."
+        if args.locker and not is_locker_url(args.locker):
+            return "ERROR: locker url must be of the form " "https://hostname/org/repo"
+        if args.threshold_days < 0:
+            return "ERROR: --threshold-days must not be negative."
+        if args.workers < 1:
+            return "ERROR: --workers must be a positive number."
+
+    def _run(self, args):
+        from compliance.utils.credentials import Config
+
+        from prune.locker import PruneLocker
+
+        if args.local_path:
+            self._scan(args, os.path.expanduser(args.local_path))
+            return
+        if args.branch:
+            set_default_branch(args.branch)
+        locker = PruneLocker(
+            name=f"{get_locker_name(args.locker)}-scan",
+            repo_url=args.locker,
+            creds=Config(args.creds),
+        )
+        if os.path.isdir(locker.local_path):
+            shutil.rmtree(locker.local_path)
+        self.out(
+            f"Cloning local locker for {args.locker}.  Depending on the "
+            "size of your locker, this may take a while..."
+        )
+        locker.init()
+        try:
+            self._scan(args, locker.local_path)
+        finally:
+            locker.repo.close()
+            shutil.rmtree(locker.local_path)
+
+    def _scan(self, args, local_path):
+        from compliance.locker import DAY
+
+        from prune.scan import LockerScan
+
+        start = time.perf_counter()
+        scan = LockerScan(local_path, args.threshold_days * DAY, args.workers).scan()
+        abandoned = scan.get_abandoned()
+        if args.output:
+            count = write_manifest(args.output, abandoned)
+        else:
+            count = 0
+            for count, (path, reason) in enumerate(abandoned, 1):
+                self.out(f"{path}: {reason}")
+        for path in scan.orphans:
+            self.out(f"Orphaned file {path} is not listed in an index file")
+        for path in scan.missing:
+            self.out(f"Evidence {path} is listed in its index file but missing")
+        self.out(
+            f"\nScanned {scan.files} files and {scan.index_files} index files "
+            f"in {time.perf_counter() - start:.3f}s: {count} abandoned, "
+            f"{len(scan.orphans)} orphaned and {len(scan.missing)} missing"
+        )
+        if args.output:
+            self.out(f"Abandoned evidence written to {args.output}")
+
+
+class _TombstoneCommand(Command):
+    def _init_arguments(self):
+        self.add_argument(
+            "locker",
+            help=(
+                "the URL to the evidence locker repository, "
+                "as an example https://github.com/my-org/my-repo"
+            ),
+            nargs="?",
+        )
+        self.add_argument(
+            "--local-path",
+            help="path to a local evidence locker to use instead of cloning one",
+            metavar="~/path/to/locker",
+            default=False,
+        )
+        self.add_argument(
+            "--evidence",
+            help="the removed evidence path, or evidence partition file path",
+            metavar="raw/foo/bar.json",
+            required=True,
+        )
+        self.add_argument(
+            "--tombstone-db",
+            help="the tombstone index SQLite database - defaults to %(default)s",
+            metavar="~/path/to/tombstones.db",
+            default=TOMBSTONE_DB,
+        )
+        self.add_argument(
+            "--branch",
+            help="Branch name for locker repository",
+            default=False,
+        )
+        self.add_argument(
+            "--creds",
+            metavar="~/path/creds",
+            help="the path to credentials file - defaults to %(default)s",
+            default="~/.credentials",
+        )
+
+    def _validate_arguments(self, args):
+        if bool(args.locker) == bool(args.local_path):
+            return "ERROR: Provide either a locker url or a --local-path."
+        if args.locker and not is_locker_url(args.locker):
+            return "ERROR: locker url must be of the form " "https://hostname/org/repo"
+
+    def _run(self, args):
+        from compliance.utils.credentials import Config
+
+        import git
+
+        from prune.locker import PruneLocker
+
+        if args.local_path:
+            local_path = os.path.abspath(os.path.expanduser(args.local_path))
+            repo = git.Repo(local_path)
+            try:
+                return self._lookup(args, local_path, repo)
+            finally:
+                repo.close()
+        if args.branch:
+            set_default_branch(args.branch)
+        locker = PruneLocker(
+            name=f"{get_locker_name(args.locker)}-{self.name}",
+            repo_url=args.locker,
+            creds=Config(args.creds),
+            bare=True,
+        )
+        if os.path.isdir(locker.local_path):
+            shutil.rmtree(locker.local_path)
+        self.out(
+            f"Cloning local locker for {args.locker} without a checkout.  "
+            "Depending on the size of your locker, this may take a while..."
+        )
+        locker.init()
+        try:
+            return self._lookup(args, args.locker, locker.repo)
+        finally:
+            locker.repo.close()
+            shutil.rmtree(locker.local_path)
+
+    def _lookup(self, args, locker, repo):
+        from prune.recovery import TombstoneIndex
+
+        index = TombstoneIndex(args.tombstone_db)
+        try:
+            start = time.perf_counter()
+            count = index.update(locker, repo)
+            self.out(
+                f"Tombstone index updated from {count} index files "
+                f"in {time.perf_counter() - start:.3f}s"
+            )
+            tombstones = index.lookup(locker, args.evidence)
+        finally:
+            index.close()
+        if not tombstones:
+            self.out(f"No tombstones found for {args.evidence}")
+            return 1
+        return self._handle(args, repo, tombstones)
+
+
+class Lookup(_TombstoneCommand):
+    """Look up the tombstones of removed evidence."""
+
+    name = "lookup"
+
+    def _handle(self, args, repo, tombstones):
+        for tombstone in tombstones:
+            self.out(
+                f"{tombstone['file']}: last seen in commit "
+                f"{tombstone['commit_sha'] or 'unknown'}, removed "
+                f"{tombstone['eol']} by {tombstone['pruner'] or 'unknown'} - "
+                f"{tombstone['reason']}"
+            )
+            if tombstone["archive"]:
+                self.out(f"  archived to {tombstone['archive']}")
+
+
+class Recover(_TombstoneCommand):
+    """Restore removed evidence from the locker history without a checkout."""
+
+    name = "recover"
+
+    def _init_arguments(self):
+        super()._init_arguments()
+        self.add_argument(
+            "--output-dir",
+            help="the folder to restore evidence to - defaults to %(default)s",
+            metavar="~/path/to/folder",
+            default=".",
+        )
+        self.add_argument(
+            "--archive-dir",
+            help=(
+                "the folder holding the archive repositories of archived evidence "
+                "- defaults to %(default)s"
+            ),
+            metavar="~/path/to/archive",
+            default=".",
+        )
+
+    def _handle(self, args, repo, tombstones):
+        from prune.recovery import recover_evidence
+
+        # A file is restored once, from the most recent commit holding it
+        latest = {}
+        for tombstone in tombstones:
+            latest.setdefault(tombstone["file"], tombstone)
+        output_dir = os.path.expanduser(args.output_dir)
+        archive_dir = os.path.expanduser(args.archive_dir)
+        results = recover_evidence(repo, latest.values(), output_dir, archive_dir)
+        for file_path, error in results:
+            self.out(f"ERROR: {error}" if error else f"Restored {file_path}")
+        if any(error for _, error in results):
+            return 1
+
+
 class Prune(Command):
     """The prune CLI base command."""
 
-    subcommands = [DryRun, PushToRemote]
+    subcommands = [DryRun, PushToRemote, Scan, Lookup, Recover]
 
     def _init_arguments(self):
         self.add_argument(
@@ -175,6 +1054,43 @@ class Prune(Command):
         )
 
 
+def is_locker_url(url):
+    """
+    Confirm whether the supplied URL is a valid locker URL.
+
+    :param url: the locker URL.
+
+    :returns: True or False (URL is or isn't valid)
+    """
+    parsed = urlparse(url)
+    return bool(parsed.scheme and parsed.hostname and parsed.path)
+
+
+def set_default_branch(branch):
+    """
+    Override the locker branch in the framework configuration.
+
+    :param branch: the locker branch name.
+    """
+    from compliance.config import get_config
+
+    c = get_config()
+    c.load()
+    c.raw_config["locker"]["default_branch"] = branch
+
+
+def get_locker_name(url):
+    """
+    Provide a unique local locker name for a locker URL.
+
+    :param url: the locker URL.
+
+    :returns: the local locker name.
+    """
+    repo = urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]
+    return f"prune-{repo}-{hashlib.sha256(url.encode()).hexdigest()[:8]}"
+
+
 def run():
     """Execute the prune CLI."""
     prune = Prune()
@@ -0,0 +1,79 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune evidence descriptors."""
+
+from pathlib import PurePath
+
+from compliance.utils.exceptions import EvidenceNotFoundError
+
+
+class EvidenceDescriptor(object):
+    """
+    Describe locker evidence using its index file metadata alone.
+
+    A descriptor provides the evidence attributes needed to prune evidence
+    without reading the evidence content from the locker.
+    """
+
+    def __init__(self, path, metadata):
+        """
+        Construct and initialize the evidence descriptor object.
+
+        :param path: the evidence path relative to the locker root.
+        :param metadata: the evidence metadata from its index file.
+        """
+        self.path = path
+        self.dir_path = str(PurePath(path).parent)
+        self.name = PurePath(path).name
+        self.description = metadata.get("description")
+        self.ttl = metadata.get("ttl")
+        self.last_update = metadata.get("last_update")
+        self.part_fields = metadata.get("partition_fields")
+        self.part_root = metadata.get("partition_root")
+        self.partitions = metadata.get("partitions", {})
+
+    @property
+    def extension(self):
+        """Provide the evidence file extension."""
+        return PurePath(self.name).suffix.lstrip(".")
+
+    @property
+    def is_partitioned(self):
+        """Provide whether the evidence is partitioned."""
+        return self.part_fields is not None and self.extension == "json"
+
+    @property
+    def files(self):
+        """Provide the evidence file paths relative to the locker root."""
+        if not self.is_partitioned:
+            return [self.path]
+        return [f"{self.dir_path}/{part}_{self.name}" for part in self.partitions]
+
+
+def describe_evidence(evidence_path, metadata):
+    """
+    Provide an evidence descriptor from the content of its index file.
+
+    :param evidence_path: the evidence path relative to the locker root.
+    :param metadata: the content of the evidence index file.
+
+    :returns: the evidence descriptor object.
+    """
+    ev_meta = metadata.get(PurePath(evidence_path).name)
+    if not isinstance(ev_meta, dict) or "last_update" not in ev_meta:
+        raise EvidenceNotFoundError(
+            f"Evidence {evidence_path} is not found in the locker. "
+            "It may not be a valid evidence path or may already be pruned."
+        )
+    return EvidenceDescriptor(evidence_path, ev_meta)
@@ -0,0 +1,84 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune locker history helpers."""
+
+import os
+from pathlib import PurePath
+
+COMMIT_MARKER = "\x00"
+
+
+def get_last_commits(repo, paths, rev="HEAD"):
+    """
+    Provide the most recent commit that touched each of the supplied paths.
+
+    The history is walked once for all paths, limited to the folders that
+    contain them, and the walk stops as soon as every path is resolved.
+    Paths that are not found in the available history (a shallow clone for
+    example) are not included in the result.  In a shallow clone, the
+    boundary commits list every file they hold as changed, so a path only
+    found in a boundary commit is not resolved either.
+
+    :param repo: the GitPython repository object.
+    :param paths: an iterable of file paths relative to the repository root.
+    :param rev: the revision to start walking history from.
+
+    :returns: a dictionary of relative path/commit SHA pairs.
+    """
+    targets = set(paths)
+    commits = {}
+    if not targets:
+        return commits
+    folders = sorted({str(PurePath(path).parent) for path in targets})
+    boundary = get_shallow_commits(repo)
+    proc = repo.git(c="core.quotepath=off").log(
+        rev,
+        "--name-only",
+        "--no-renames",
+        "--format=%x00%H",
+        "--",
+        *folders,
+        as_process=True,
+    )
+    commit = None
+    try:
+        for line in proc.stdout:
+            line = line.decode("utf-8").rstrip("\n")
+            if line.startswith(COMMIT_MARKER):
+                commit = line[len(COMMIT_MARKER) :]
+            elif line in targets and commit not in boundary:
+                targets.discard(line)
+                commits[line] = commit
+                if not targets:
+                    break
+    finally:
+        proc.proc.kill()
+        proc.proc.wait()
+        proc.stdout.close()
+    return commits
+
+
+def get_shallow_commits(repo):
+    """
+    Provide the boundary commits of a shallow clone.
+
+    :param repo: the GitPython repository object.
+
+    :returns: the set of boundary commit SHAs, empty for a complete history.
+    """
+    try:
+        with open(os.path.join(repo.git_dir, "shallow")) as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
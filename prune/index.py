@@ -0,0 +1,130 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune index file helpers."""
+
+import json
+import re
+from pathlib import PurePath
+
+from compliance.utils.data_parse import format_json
+
+TOMBSTONES_DIR = "notifications/prune/tombstones"
+TOMBSTONES_FILE = "tombstones.json"
+TOP_LEVEL_KEY = re.compile(r'\n  "')
+
+
+def format_index(metadata, text=None, changed=None):
+    """
+    Provide index file metadata in the canonical ``format_json`` format.
+
+    Only the top level entries that changed are serialized.  The text of every
+    other entry is reused from the current index file content, provided that
+    content is itself in the canonical format, so updating a few entries of a
+    large index file costs little more than copying it.
+
+    :param metadata: the index file metadata as a dictionary.
+    :param text: the current index file content.
+    :param changed: the names of the top level entries that changed.
+
+    :returns: the index file content.
+    """
+    entries = _get_entries(text) if text and metadata else None
+    if entries is None:
+        return format_json(metadata)
+    changed = set(changed or [])
+    parts = []
+    for key in sorted(metadata.keys()):
+        if key in entries and key not in changed:
+            parts.append(entries[key])
+        else:
+            value = format_json(metadata[key]).replace("\n", "\n  ")
+            parts.append(f"  {json.dumps(key)}: {value}")
+    return "{\n" + ",\n".join(parts) + "\n}"
+
+
+def get_tombstones_file(index_file, local_path=None):
+    """
+    Provide the path to the tombstones sidecar file of an index file.
+
+    Tombstones files are kept under ``TOMBSTONES_DIR``, in folders mirroring
+    the evidence folders, since the framework does not take files under the
+    ``notifications`` folder for evidence.
+
+    :param index_file: the index file path, relative to the locker root
+      unless the locker root path is provided.
+    :param local_path: the locker root path of an absolute index file path.
+
+    :returns: the tombstones file path, absolute if the locker root path is
+      provided.
+    """
+    folder = PurePath(index_file).parent
+    if local_path:
+        folder = folder.relative_to(local_path)
+    path = PurePath(TOMBSTONES_DIR, folder, TOMBSTONES_FILE)
+    return str(PurePath(local_path, path) if local_path else path)
+
+
+def get_evidence_folder(index_file):
+    """
+    Provide the evidence folder an index or tombstones file belongs to.
+
+    :param index_file: the index or tombstones file path relative to the
+      locker root.
+
+    :returns: the evidence folder path relative to the locker root.
+    """
+    folder = PurePath(index_file).parent
+    root = PurePath(TOMBSTONES_DIR).parts
+    if folder.parts[: len(root)] == root:
+        return PurePath(*folder.parts[len(root) :])
+    return folder
+
+
+def move_tombstones(metadata, tombstones, names):
+    """
+    Move pruned evidence entries from index metadata to tombstones metadata.
+
+    Tombstones for evidence already listed in the tombstones metadata, pruned
+    by an earlier run, are appended to the existing ones.
+
+    :param metadata: the index file metadata as a dictionary.
+    :param tombstones: the tombstones file metadata as a dictionary.
+    :param names: the names of the pruned evidence to move.
+    """
+    for name in names:
+        entry = metadata.pop(name)
+        previous = tombstones.get(name, {}).get("tombstones", {})
+        for key, records in entry["tombstones"].items():
+            previous.setdefault(key, []).extend(
+                r for r in records if r not in previous.get(key, [])
+            )
+        entry["tombstones"] = previous
+        tombstones[name] = entry
+
+
+def _get_entries(text):
+    # In the canonical format top level keys are the only lines indented by
+    # exactly two spaces and no string spans lines, so entries are found
+    # without parsing their values
+    if not text.startswith('{\n  "') or not text.rstrip("\n").endswith("\n}"):
+        return None
+    body = text.rstrip("\n")
+    starts = [match.start() + 1 for match in TOP_LEVEL_KEY.finditer(body)]
+    # Entries are followed by ",\n" except for the last one, followed by "\n}"
+    ends = [start - 2 for start in starts[1:]] + [len(body) - 2]
+    decoder = json.JSONDecoder()
+    return {
+        decoder.raw_decode(body, start + 2)[0]: body[start:end]
+        for start, end in zip(starts, ends)
+    }
@@ -14,35 +14,676 @@
 """Prune Locker."""
 
 import json
+import re
 import time
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime as dt, timedelta
+from pathlib import Path
+from threading import Lock
 
-from compliance.locker import Locker
+from compliance.config import get_config
+from compliance.locker import INDEX_FILE, Locker, is_index_file
 from compliance.utils.data_parse import format_json
+from compliance.utils.exceptions import LockerPushError
+
+import git
+from gitdb.base import IStream
+
+from prune.archive import (
+    get_object_store_size,
+    push_to_archive,
+    remove_from_history,
+    shrink,
+)
+from prune.cache import MirrorCache
+from prune.constants import CLONE_MODES, COMPACT_PARTITIONS, PUSH_RETRIES
+from prune.evidence import EvidenceDescriptor, describe_evidence
+from prune.history import get_last_commits
+from prune.index import (
+    TOMBSTONES_DIR,
+    TOMBSTONES_FILE,
+    format_index,
+    get_tombstones_file,
+    move_tombstones,
+)
+from prune.merge import merge_index
+from prune.selectors import (
+    TIMESTAMP_FORMAT,
+    EvidenceIndex,
+    get_selector_folder,
+    is_selector,
+)
+from prune.timing import PhaseTimer
+
+BLOB_MODE = "100644"
+BULK_REMOVE_FILES = 1000
+DEEPEN_STEP = 50
+MESSAGE_LIMIT = 1000
+NULL_SHA = "0" * 40
+MANIFESTS_DIR = "notifications/prune/manifests"
+PUSH_BACKOFF = 2
+PUSH_BACKOFF_LIMIT = 30
 
 
 class PruneLocker(Locker):
     """Provide prune specific locker functionality."""
 
-    def __init__(self, *args, **kwargs):
-        """Prune locker constructor to add evidences pruned."""
+    def __init__(
+        self,
+        *args,
+        clone_mode="full",
+        sparse_paths=None,
+        cache_dir=None,
+        message_limit=MESSAGE_LIMIT,
+        workers=1,
+        checkpoint_items=None,
+        checkpoint_seconds=None,
+        checkpoint_push=False,
+        journal_path=None,
+        resume=False,
+        no_checkout=False,
+        archive_dir=None,
+        archive_days=0,
+        compact_partitions=COMPACT_PARTITIONS,
+        split_tombstones=False,
+        bare=False,
+        push_retries=PUSH_RETRIES,
+        **kwargs,
+    ):
+        """
+        Prune locker constructor to add evidences pruned.
+
+        :param clone_mode: the clone strategy, one of ``full``, ``shallow``,
+          ``sparse`` or ``blobless``.  Defaults to ``full``.
+        :param sparse_paths: the evidence paths that drive which folders are
+          checked out when using the ``sparse`` or ``blobless`` clone modes.
+        :param cache_dir: the folder holding cached locker mirrors.  The
+          locker is cloned from its cached mirror when provided.
+        :param message_limit: the number of pruned evidence paths listed in
+          the commit message.  Beyond that, pruned evidence paths are written
+          to a manifest file committed to the locker.
+        :param workers: the number of threads used to retrieve evidence and
+          to prepare index file updates.  Defaults to 1.
+        :param checkpoint_items: commit pruned evidence once this many evidence
+          have been pruned since the last commit.
+        :param checkpoint_seconds: commit pruned evidence once this many
+          seconds have passed since the last commit.
+        :param checkpoint_push: push to the remote locker after each
+          checkpoint commit.  Defaults to False.
+        :param journal_path: the path to a local JSON Lines file recording
+          each checkpoint commit.
+        :param resume: resume a previous run by reusing the local locker, if
+          present, and skipping evidence that is already pruned.
+        :param no_checkout: clone the locker without checking out its files,
+          for reading the git object database only.  Defaults to False.
+        :param archive_dir: the folder holding the archive repository to push
+          the locker history to before removing archived evidence from the
+          history.
+        :param archive_days: archive pruned evidence last updated at least
+          this many days ago.  Defaults to 0, all pruned evidence.
+        :param compact_partitions: the number of partitions from which the
+          tombstones of partitioned evidence are stored as a single compact
+          tombstone rather than a tombstone per partition.  Defaults to 100.
+        :param split_tombstones: move pruned evidence entries, with their
+          tombstones, from index files to ``tombstones.json`` files under the
+          ``notifications/prune/tombstones`` folder.  Defaults to False.
+        :param bare: prune the locker without checking out its files.  Index
+          file updates and evidence removals are written straight to the git
+          object database and index.  Defaults to False.
+        :param push_retries: the number of times a push rejected because the
+          remote locker changed is retried, after rebasing the prune commits
+          onto the remote changes.  Defaults to 3.
+        """
+        if clone_mode not in CLONE_MODES:
+            raise ValueError(f"Unsupported clone mode {clone_mode}")
+        if cache_dir and clone_mode in ["shallow", "blobless"]:
+            raise ValueError(f"Clone mode {clone_mode} cannot use a mirror cache")
+        if (no_checkout or bare) and clone_mode in ["sparse", "blobless"]:
+            raise ValueError(f"Clone mode {clone_mode} requires a checkout")
+        if archive_dir and (clone_mode != "full" or cache_dir):
+            raise ValueError("Archiving requires a full clone without a mirror cache")
+        if archive_dir and bare:
+            raise ValueError("Archiving requires a checkout")
         super().__init__(*args, **kwargs)
+        # Per locker lock so lockers pruned at the same time do not block
+        self.lock = Lock()
         self.pruned = []
+        self.pruned_count = 0
+        self.message_limit = message_limit
+        self.workers = workers
+        self.manifest_path = None
+        self._manifest = None
+        self.clone_mode = clone_mode
+        self.sparse_paths = sparse_paths or []
+        self.cache_dir = cache_dir
+        self._evidence_index = None
+        self.timer = PhaseTimer()
+        self.checkpoint_items = checkpoint_items
+        self.checkpoint_seconds = checkpoint_seconds
+        self.checkpoint_push = checkpoint_push
+        self.journal_path = journal_path
+        self.resume = resume
+        self.no_checkout = no_checkout or bare
+        self.bare = bare
+        self._tracked = None
+        # GitPython shares one cat-file process, which workers must not race on
+        self._git_lock = Lock()
+        self._blobs = {}
+        self._indexes = {}
+        self.archive_dir = archive_dir
+        self.archive_path = None
+        self.archive_ref = None
+        self.archive_cutoff = None
+        if archive_dir:
+            stamp = self.commit_date.split(".")[0].replace(":", "")
+            self.archive_path = str(Path(archive_dir, f"{self.name}.git"))
+            self.archive_ref = f"refs/archive/{stamp}"
+            cutoff = dt.utcnow() - timedelta(days=archive_days)
+            self.archive_cutoff = cutoff.strftime(TIMESTAMP_FORMAT)
+        self.archived = []
+        self.compact_partitions = compact_partitions
+        self.split_tombstones = split_tombstones
+        self.archive_report = None
+        self._push_lease = None
+        self.push_retries = push_retries
+        self.kept = []
+        self.checkpoints = 0
+        self.resumed_from = None
+        self._uncommitted = 0
+        self._last_checkpoint = time.monotonic()
+        if clone_mode in ["sparse", "blobless"] and None in self.sparse_folders:
+            raise ValueError(f"Clone mode {clone_mode} requires evidence folders")
+        if self.clone_mode == "shallow":
+            self.clone_depth = 1
+
+    @property
+    def is_shallow(self):
+        """Provide whether the local locker holds a truncated history."""
+        return Path(self.repo.git_dir, "shallow").is_file()
+
+    @property
+    def sparse_folders(self):
+        """Provide the locker folders checked out in a sparse clone."""
+        folders = {get_selector_folder(path) for path in self.sparse_paths}
+        if self.split_tombstones and None not in folders:
+            folders.update({f"{TOMBSTONES_DIR}/{folder}" for folder in folders})
+        return sorted(folders, key=lambda folder: folder or "")
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Override check in routine with a custom prune commit message."""
         if exc_type:
             self.logger.error(" ".join([str(exc_type), str(exc_val)]))
-        pruned_files = "\n".join(self.pruned)
-        self.checkin(
-            (
-                "Pruned abandoned evidence at local time "
-                f"{time.ctime(time.time())}\n\n{pruned_files}"
-            )
-        )
+        self.commit_pruned()
         if self.repo_url_with_creds:
-            self.push()
+            with self.timer.phase("push"):
+                self.push()
         return
 
+    def commit_pruned(self):
+        """Commit pruned evidence and archive it when archiving is enabled."""
+        self._commit_pruned()
+        if self.archived:
+            with self.timer.phase("archive", count=len(self.archived)):
+                self.archive()
+
+    def archive(self):
+        """
+        Move archived evidence out of the locker history.
+
+        The locker branch history is pushed to a bare archive repository,
+        which the archived evidence tombstones point to by repository folder
+        name.  Only objects that the archive does not hold yet are added to
+        it, so that archiving again does not copy the whole history again.
+        The branch history is then rewritten without the archived evidence
+        files, the commits recorded by all other tombstones are updated to
+        their rewritten commits and unreachable objects are dropped so that
+        the locker object store shrinks.
+
+        :returns: a dictionary with the archive repository path, the number of
+          archived files and the object store size in bytes before and after.
+        """
+        before = get_object_store_size(self.repo)
+        self.logger.info(f"Archiving locker history to {self.archive_path}...")
+        push_to_archive(self.repo, self.archive_path, self.branch, self.archive_ref)
+        remote_ref = f"refs/remotes/origin/{self.branch}"
+        refs = self.repo.git.for_each_ref("--format=%(objectname)", remote_ref)
+        self._push_lease = refs.strip()
+        pathspec = Path(self.repo.git_dir, "prune-archive-paths")
+        pathspec.write_text("".join(f"{f}\n" for f in sorted(set(self.archived))))
+        self.logger.info(f"Removing {len(self.archived)} files from history...")
+        commit_map = remove_from_history(self.repo, self.branch, pathspec)
+        pathspec.unlink()
+        self._rewrite_tombstone_commits(commit_map)
+        # The remote tracking branch still holds the archived history
+        shrink(self.repo, [remote_ref] if self._push_lease else [])
+        self.archive_report = {
+            "archive": self.archive_path,
+            "files": len(set(self.archived)),
+            "size_before": before,
+            "size_after": get_object_store_size(self.repo),
+        }
+        self.logger.info(
+            f"Locker object store reduced from {before} "
+            f"to {self.archive_report['size_after']} bytes"
+        )
+        return self.archive_report
+
+    def _rewrite_tombstone_commits(self, commit_map):
+        # Tombstones of archived evidence keep the commit held by their archive
+        index_names = [INDEX_FILE, TOMBSTONES_FILE]
+        paths = self.repo.git.ls_files("-z").split("\0")
+        for path in [p for p in paths if Path(p).name in index_names]:
+            entry = self._get_index(self.get_file(path))
+            for name, ev_meta in entry["metadata"].items():
+                if not isinstance(ev_meta, dict):
+                    continue
+                for records in ev_meta.get("tombstones", {}).values():
+                    for record in records:
+                        if "archive" in record:
+                            continue
+                        if record.get("commit") in commit_map:
+                            record["commit"] = commit_map[record["commit"]]
+                            entry["changed"].add(name)
+                        if "commits" in record:
+                            commits = {
+                                commit_map.get(sha, sha): parts
+                                for sha, parts in record["commits"].items()
+                            }
+                            if commits != record["commits"]:
+                                record["commits"] = commits
+                                entry["changed"].add(name)
+        if self.flush_indexes():
+            self.checkin(
+                "Updated tombstone commits rewritten by archiving at local time "
+                f"{time.ctime(time.time())}"
+            )
+
+    def push(self):
+        """
+        Push the local git repository to the remote repository.
+
+        Prune commits are rebased onto the remote branch before pushing.  Index
+        and tombstones file conflicts are merged key by key, and evidence that
+        was updated remotely is kept rather than pruned, listed in ``kept``
+        and taken out of the pruned count and prune commits.  When the push is
+        rejected because the remote branch changed in the meantime, the push
+        is retried up to ``push_retries`` times after a growing delay.
+
+        After archiving, the rewritten history is force pushed provided that
+        the remote branch has not changed since it was last fetched.  Without
+        a checkout to rebase, a bare mode locker is pushed as is and the push
+        is rejected if the remote branch has changed since the clone.
+        """
+        if not self._do_push:
+            return
+        if self._push_lease is None and not self.bare:
+            self._push_rebased()
+            return
+        kwargs = {}
+        if self._push_lease is not None:
+            kwargs["force_with_lease"] = f"{self.branch}:{self._push_lease}"
+        self.logger.info(f"Pushing local locker to remote repo {self.repo_url}...")
+        push_info = self.repo.remote().push(self.branch, **kwargs)[0]
+        if push_info.flags >= git.remote.PushInfo.ERROR:
+            raise LockerPushError(push_info)
+
+    def _push_rebased(self):
+        remote = self.repo.remote()
+        for attempt in range(self.push_retries + 1):
+            if attempt:
+                delay = min(PUSH_BACKOFF * 2 ** (attempt - 1), PUSH_BACKOFF_LIMIT)
+                self.logger.info(f"Push rejected, retrying in {delay}s...")
+                time.sleep(delay)
+            self.logger.info(
+                f"Syncing local locker with remote repo {self.repo_url}..."
+            )
+            remote.fetch()
+            if not self._new_branch:
+                self._rebase(f"{remote.name}/{self.branch}")
+            if not attempt:
+                self._log_large_files()
+            self.logger.info(f"Pushing local locker to remote repo {self.repo_url}...")
+            push_info = remote.push(
+                self.branch,
+                force=get_config().get("locker.force_push", default=False),
+                set_upstream=True,
+            )[0]
+            if not push_info.flags & git.remote.PushInfo.REJECTED:
+                break
+        if push_info.flags >= git.remote.PushInfo.ERROR:
+            raise LockerPushError(push_info)
+
+    def _rebase(self, upstream):
+        try:
+            self.repo.git.rebase(upstream)
+            return
+        except git.GitCommandError:
+            if not self._is_rebasing():
+                raise
+        self.logger.info(f"Merging prune commits with {upstream} changes...")
+        try:
+            while self._is_rebasing():
+                kept = self._resolve_conflicts()
+                if kept:
+                    self._unprune(kept)
+                # A prune commit made redundant by remote changes is dropped
+                staged = self.repo.git.diff("--cached", "--name-only")
+                try:
+                    self.repo.git.rebase(
+                        "--continue" if staged else "--skip", env={"GIT_EDITOR": "true"}
+                    )
+                except git.GitCommandError:
+                    if not self._is_rebasing() or not self._get_unmerged():
+                        raise
+        except Exception:
+            if self._is_rebasing():
+                self.repo.git.rebase("--abort")
+            raise
+
+    def _is_rebasing(self):
+        return any(
+            Path(self.repo.git_dir, folder).is_dir()
+            for folder in ["rebase-merge", "rebase-apply"]
+        )
+
+    def _get_unmerged(self):
+        # Conflicted paths with their blob SHA by stage, where stage 1 is the
+        # common ancestor, 2 the remote side and 3 the prune commit
+        unmerged = {}
+        for entry in self.repo.git.ls_files("-u", "-z").split("\0"):
+            if entry:
+                info, path = entry.split("\t", 1)
+                _, sha, stage = info.split(" ")
+                unmerged.setdefault(path, {})[int(stage)] = sha
+        return unmerged
+
+    def _resolve_conflicts(self):
+        index_names = [INDEX_FILE, TOMBSTONES_FILE]
+        # Tombstones files are merged before the index files they belong to
+        unmerged = sorted(
+            self._get_unmerged().items(),
+            key=lambda u: (
+                Path(u[0]).name in index_names,
+                Path(u[0]).name == INDEX_FILE,
+            ),
+        )
+        all_kept = []
+        for path, stages in unmerged:
+            if Path(path).name not in index_names:
+                # Evidence updated remotely wins over evidence pruned locally
+                if 2 in stages:
+                    self.repo.git.checkout("--ours", "--", path)
+                    self.repo.git.add("--", path)
+                else:
+                    self.repo.git.rm("-q", "--", path)
+                continue
+            base, upstream, local = [
+                json.loads(self._read_stage(stages.get(n))) for n in [1, 2, 3]
+            ]
+            moved = {}
+            if Path(path).name == INDEX_FILE:
+                # Evidence moved to the tombstones file was pruned locally
+                moved = self._get_moved_tombstones(path, base, local)
+                local.update(moved)
+            merged, kept = merge_index(base, upstream, local)
+            for name in set(moved) - set(kept):
+                merged.pop(name, None)
+            if set(moved) & set(kept):
+                self._restore_tombstones(path, set(moved) & set(kept))
+            Path(self.local_path, path).write_text(format_json(merged))
+            ev_files = []
+            for name in kept:
+                ev_path = str(Path(path).parent / name)
+                self.logger.warning(f"Evidence {ev_path} updated remotely, kept...")
+                all_kept.append(ev_path)
+                ev_files.extend(EvidenceDescriptor(ev_path, merged[name]).files)
+            restore = []
+            if ev_files:
+                # Put back evidence files removed by the prune commit
+                restore = self.repo.git.ls_tree(
+                    "--name-only", "-z", "HEAD", "--", *ev_files
+                ).split("\0")
+                restore = [f for f in restore if f]
+            if restore:
+                self.repo.git.checkout("HEAD", "--", *restore)
+            self.repo.git.add("--", path, *restore)
+        return all_kept
+
+    def _unprune(self, kept):
+        # Evidence kept is taken out of the prune commit being replayed, its
+        # message and its manifest, so that they only list evidence pruned
+        self.kept.extend(kept)
+        self.pruned_count -= len(kept)
+        unlisted = len(kept)
+        message_file = Path(self.repo.git_dir, "rebase-merge", "message")
+        if message_file.is_file():
+            lines = message_file.read_text().split("\n")
+            listed = [line for line in lines if line not in kept]
+            unlisted -= len(lines) - len(listed)
+            message_file.write_text(
+                re.sub(
+                    r"\.\.\.and (\d+) more\.",
+                    lambda m: f"...and {int(m.group(1)) - unlisted} more.",
+                    "\n".join(listed),
+                )
+            )
+        manifests = self.repo.git.diff(
+            "--cached", "--name-only", "-z", "HEAD", "--", MANIFESTS_DIR
+        ).split("\0")
+        manifests = [manifest for manifest in manifests if manifest]
+        for manifest in manifests:
+            manifest_file = Path(self.local_path, manifest)
+            paths = manifest_file.read_text().splitlines()
+            manifest_file.write_text(
+                "".join(f"{path}\n" for path in paths if path not in kept)
+            )
+        if manifests:
+            self.repo.git.add("--", *manifests)
+
+    def _get_moved_tombstones(self, index_path, base, local):
+        tombstones_file = Path(self.local_path, get_tombstones_file(index_path))
+        if not tombstones_file.is_file():
+            return {}
+        tombstones = json.loads(tombstones_file.read_text())
+        return {
+            name: tombstones[name]
+            for name in base
+            if name not in local and name in tombstones
+        }
+
+    def _restore_tombstones(self, index_path, names):
+        # Tombstones of evidence kept go back to their upstream state
+        path = get_tombstones_file(index_path)
+        tombstones_file = Path(self.local_path, path)
+        tombstones = json.loads(tombstones_file.read_text())
+        try:
+            upstream = json.loads(self.repo.git.show(f"HEAD:{path}"))
+        except git.GitCommandError:
+            upstream = {}
+        for name in names:
+            if name in upstream:
+                tombstones[name] = upstream[name]
+            else:
+                tombstones.pop(name, None)
+        if not tombstones and not upstream:
+            self.repo.git.rm("-q", "-f", "--", path)
+            return
+        tombstones_file.write_text(format_json(tombstones))
+        self.repo.git.add("--", path)
+
+    def _read_stage(self, sha):
+        if sha is None:
+            return "{}"
+        return self.repo.git.get_object_data(sha)[3].decode("utf-8")
+
+    def checkpoint(self):
+        """
+        Commit the evidence pruned so far when a checkpoint is due.
+
+        A checkpoint is due once ``checkpoint_items`` evidence have been pruned
+        or ``checkpoint_seconds`` seconds have passed since the last commit.
+        The commit is pushed to the remote locker when ``checkpoint_push`` is
+        set.
+
+        :returns: True or False (a checkpoint was or wasn't committed)
+        """
+        if not self._uncommitted:
+            return False
+        due = self.checkpoint_items and self._uncommitted >= self.checkpoint_items
+        if self.checkpoint_seconds:
+            elapsed = time.monotonic() - self._last_checkpoint
+            due = due or elapsed >= self.checkpoint_seconds
+        if not due:
+            return False
+        self._commit_pruned()
+        self.pruned = []
+        if self.checkpoint_push and self.repo_url_with_creds:
+            with self.timer.phase("push"):
+                self.push()
+        return True
+
+    def init(self):
+        """
+        Initialize the local git repository, timing the locker clone.
+
+        When resuming a previous run in a local locker, changes made after
+        the last checkpoint commit are discarded.  When resuming, the progress
+        of the previous run is restored from its journal provided that the
+        locker is at the last journaled checkpoint commit.
+        """
+        resumed = self.resume and Path(self.local_path, ".git").is_dir()
+        with self.timer.phase("clone", count=1):
+            super().init()
+        if resumed:
+            self.logger.info(f"Resuming from {self.repo.head.commit.hexsha}...")
+        if self.bare:
+            # Fill the git index from the last commit without checking out
+            self.repo.git.read_tree("HEAD")
+        elif resumed:
+            self.repo.git.reset("--hard", "HEAD")
+        if self.resume:
+            self._restore_progress()
+
+    def _restore_progress(self):
+        try:
+            with open(self.journal_path) as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        except (TypeError, FileNotFoundError):
+            return
+        if not entries:
+            return
+        last = entries[-1]
+        if last["commit"] != self.repo.head.commit.hexsha:
+            self.logger.warning(
+                f"Locker is not at the last checkpoint commit {last['commit']}, "
+                "previous progress not restored..."
+            )
+            return
+        self.checkpoints = last["checkpoint"] + 1
+        self.pruned_count = last["total"]
+        self.resumed_from = last
+
+    def get_locker_repo(self, locker="evidence locker"):
+        """
+        Pull (clone) the remote repository to the local git repository.
+
+        The ``sparse`` and ``blobless`` clone modes only check out the folders
+        containing the evidence to prune along with their index files.  The
+        ``blobless`` clone mode also defers downloading file content that is
+        not checked out.  When a cache folder is provided the locker is cloned
+        from a locally cached mirror of the locker instead.  Without a checkout
+        no locker files are written to the local locker.
+
+        :param locker: the locker "name" used in logging
+        """
+        sparse = self.clone_mode in ["sparse", "blobless"]
+        custom = sparse or self.cache_dir or self.no_checkout
+        if Path(self.local_path, ".git").is_dir() or not custom:
+            super().get_locker_repo(locker)
+            return
+        kwargs = {"sparse": True} if sparse else {}
+        if self.no_checkout:
+            kwargs["no_checkout"] = True
+        start = time.perf_counter()
+        if self.cache_dir:
+            self.logger.info(
+                f"Cloning {locker} {self.repo_url} to {self.local_path} "
+                f"from the mirror cache in {self.cache_dir}..."
+            )
+            self.repo = MirrorCache(self.cache_dir).clone(
+                self.repo_url,
+                self.repo_url_with_creds,
+                self.local_path,
+                self.default_branch,
+                **kwargs,
+            )
+        else:
+            self.logger.info(
+                f"Cloning {locker} {self.repo_url} to {self.local_path} "
+                f"using {self.clone_mode} mode..."
+            )
+            if self.clone_mode == "blobless":
+                kwargs["filter"] = "blob:none"
+            if self.clone_depth:
+                kwargs["depth"] = self.clone_depth
+            self.repo = git.Repo.clone_from(
+                self.repo_url_with_creds,
+                self.local_path,
+                single_branch=True,
+                branch=self.default_branch,
+                **kwargs,
+            )
+        if sparse:
+            self.repo.git.sparse_checkout("set", *self.sparse_folders)
+        duration = time.perf_counter() - start
+        self.logger.info(f"{locker.title()} cloned in {duration:.3f}s")
+        self._checkout_branch()
+
+    def write_pkg_indexes(self):
+        """
+        Add package index files to the local git repository index.
+
+        Index files outside of a sparse checkout are left untouched.
+        """
+        self.repo.index.add(
+            [
+                f[0]
+                for f in self.repo.index.entries.keys()
+                if is_index_file(f[0]) and Path(self.local_path, f[0]).is_file()
+            ]
+        )
+
+    def get_evidence_index(self):
+        """
+        Provide the in-memory index of the evidence listed in index files.
+
+        The index is built once, from the index files found in the git index
+        that are checked out in the local locker.
+
+        :returns: the evidence index object.
+        """
+        if self._evidence_index is None:
+            self._evidence_index = EvidenceIndex()
+            for f in self.repo.index.entries.keys():
+                if is_index_file(f[0]) and self._is_file(f[0]):
+                    self._evidence_index.add_index(
+                        f[0], self._get_index(self.get_file(f[0]))["metadata"]
+                    )
+        return self._evidence_index
+
+    def select_evidences(self, config):
+        """
+        Expand prune configuration selectors into evidence paths.
+
+        :param config: a dictionary of evidence path or selector/reason pairs.
+
+        :returns: a dictionary of evidence path/reason pairs.
+        """
+        if not any(is_selector(key) for key in config.keys()):
+            return dict(config)
+        return self.get_evidence_index().expand(config)
+
     def remove_evidence(self, evidence, reason, pruner):
         """
         Remove the evidence file(s) and update the evidence metadata.
@@ -53,23 +694,535 @@ class PruneLocker(Locker):
         """
         with self.lock:
             index_file = self.get_index_file(evidence)
-            metadata = json.loads(open(index_file).read())
-            ev_meta = metadata.get(evidence.name, {})
-            tombstone_args = [evidence.name, ev_meta, reason]
-            if getattr(evidence, "is_partitioned", False):
-                parts = ev_meta.get("partitions", {}).keys()
+            metadata = self._get_index(index_file)["metadata"]
+            parts = metadata.get(evidence.name, {}).get("partitions", {}).keys()
+            commits = self._get_last_commits(
+                self._get_evidence_files(metadata, evidence)
+            )
+            ev_files = self._tombstone_index(
+                index_file, [(evidence, reason)], pruner, commits
+            )
+            self._record_pruned(evidence.path)
+            if getattr(evidence, "is_partitioned", False) and (
+                len(parts) <= BULK_REMOVE_FILES and not self.bare
+            ):
                 self.remove_partitions(evidence, parts)
-                tombstone_args[0] = parts
             else:
-                self.repo.index.remove(
-                    [self.get_file(evidence.path)], working_tree=True
-                )
-            self.pruned.append(evidence.path)
-            metadata[evidence.name] = {
-                "description": evidence.description,
-                "pruned_by": pruner,
-                "tombstones": self.create_tombstone_metadata(*tombstone_args),
+                self._remove_files(ev_files)
+
+    def get_evidence_descriptor(self, evidence_path, metadata=None):
+        """
+        Provide an evidence descriptor built from index file metadata alone.
+
+        Unlike ``get_evidence``, the evidence content is not read, only the
+        evidence files are confirmed to be present in the locker.
+
+        :param evidence_path: the evidence path relative to the locker root.
+        :param metadata: the content of the evidence index file.  The index
+          file is read from the locker when not provided.
+
+        :returns: the evidence descriptor object.
+        """
+        if metadata is None:
+            metadata = self._get_index(self.get_index_file_by_path(evidence_path))[
+                "metadata"
+            ]
+        descriptor = describe_evidence(evidence_path, metadata)
+        for ev_file in descriptor.files:
+            if not self._is_file(ev_file):
+                raise ValueError(f"Evidence {ev_file} was not found in the locker")
+        return descriptor
+
+    def resolve_evidences(self, config):
+        """
+        Provide the evidence descriptors for evidence path/reason pairs.
+
+        Evidence is described from index file metadata without reading its
+        content.  Each index file is read once and, when the locker has more
+        than one worker, index files are read concurrently.  Evidence already
+        pruned by this run, listed again in a later chunk for example, is
+        skipped.  When resuming a previous run, all evidence that is already
+        pruned is skipped.
+
+        :param config: a dictionary of evidence path/reason pairs.
+
+        :returns: a list of (evidence descriptor, reason) pairs.
+        """
+        paths = list(config.keys())
+        index_files = list(dict.fromkeys(map(self.get_index_file_by_path, paths)))
+        start = time.perf_counter()
+        entries = self._map(self._get_index, index_files)
+        indexes = {f: entry["metadata"] for f, entry in zip(index_files, entries)}
+        paths = [
+            path
+            for path in paths
+            if not self._is_pruned(path, indexes[self.get_index_file_by_path(path)])
+        ]
+        evidences = [
+            self.get_evidence_descriptor(
+                path, indexes[self.get_index_file_by_path(path)]
+            )
+            for path in paths
+        ]
+        self.timer.record(
+            "resolve",
+            time.perf_counter() - start,
+            len(paths),
+            sum(len(entry["content"]) for entry in entries),
+        )
+        return [(evidence, config[path]) for path, evidence in zip(paths, evidences)]
+
+    def remove_evidences(self, evidences, pruner):
+        """
+        Remove many evidence file(s) and update the evidence metadata.
+
+        Evidence is grouped by index file so that each index file is tombstoned
+        once and all evidence files are removed with a single git index remove.
+        When the locker has more than one worker, index files are read and
+        tombstoned concurrently before the git index is updated.
+
+        :param evidences: an iterable of (evidence object, reason) pairs
+        :param pruner: a string providing the email of the git user
+        """
+        by_index = {}
+        for evidence, reason in evidences:
+            index_file = self.get_index_file(evidence)
+            by_index.setdefault(index_file, []).append((evidence, reason))
+        if not by_index:
+            return
+        index_files = list(by_index.keys())
+        with self.lock:
+            entries = dict(zip(index_files, self._map(self._get_index, index_files)))
+            targets = []
+            for index_file, group in by_index.items():
+                for evidence, _ in group:
+                    targets.extend(
+                        self._get_evidence_files(
+                            entries[index_file]["metadata"], evidence
+                        )
+                    )
+            with self.timer.phase("history", count=len(targets)):
+                commits = self._get_last_commits(targets)
+            tombstoned = self._map(
+                lambda f: self._tombstone_index(f, by_index[f], pruner, commits),
+                index_files,
+            )
+            ev_files = []
+            for index_file, files in zip(index_files, tombstoned):
+                ev_files.extend(files)
+                for evidence, _ in by_index[index_file]:
+                    self._record_pruned(evidence.path)
+            if ev_files:
+                with self.timer.phase("git-index", count=len(ev_files)):
+                    self._remove_files(ev_files)
+
+    def get_evidence_metadata(self, evidence_path, evidence_dt=None):
+        """
+        Provide evidence metadata from package index file.
+
+        Current metadata is provided by the index file cache, so evidence
+        retrieved with ``get_evidence`` reflects changes not yet flushed.
+
+        :param evidence_path: the evidence relative path.
+        :param evidence_dt: the upper bound evidence commit date.
+
+        :returns: the metadata for the evidence specified.
+        """
+        if evidence_dt:
+            return super().get_evidence_metadata(evidence_path, evidence_dt)
+        index_file = self.get_index_file_by_path(evidence_path)
+        metadata = self._get_index(index_file)["metadata"]
+        ev_name = Path(evidence_path).name
+        return metadata.get(
+            ev_name, self._get_partitioned_evidence_metadata(metadata, ev_name)
+        )
+
+    def tombstone_metadata(
+        self, metadata, evidences, pruner, commits=None, tombstones=None
+    ):
+        """
+        Apply the tombstones of evidence to index file metadata.
+
+        Only the metadata supplied is changed, neither the locker files nor the
+        index file cache are, so that removals can be planned or measured
+        without a prune.  Tombstones follow the locker layout: partitions are
+        compacted from ``compact_partitions`` partitions and, when splitting
+        tombstones, pruned entries are moved to the tombstones metadata.
+
+        :param metadata: the index file metadata as a dictionary.
+        :param evidences: an iterable of (evidence descriptor, reason) pairs,
+          all listed in the index file.
+        :param pruner: a string providing the email of the git user.
+        :param commits: a dictionary of evidence file path/last commit SHA
+          pairs recorded in the tombstones.
+        :param tombstones: the tombstones file metadata as a dictionary,
+          required when splitting tombstones.
+
+        :returns: the paths of the evidence files tombstoned.
+        """
+        ev_files = []
+        names = []
+        for evidence, reason in evidences:
+            ev_files.extend(
+                self._tombstone_evidence(metadata, evidence, reason, pruner, commits)
+            )
+            names.append(evidence.name)
+        if self.split_tombstones:
+            move_tombstones(metadata, tombstones, names)
+        return ev_files
+
+    def flush_indexes(self):
+        """
+        Write changed index files back to the locker and stage them.
+
+        Index files are parsed once per run and the parsed copy is shared by
+        evidence lookup, removal and tombstone creation.  Changes are held in
+        memory until flushed so that each index file is written once no matter
+        how many evidence it lists are removed.  Index files are flushed before
+        every prune commit.
+
+        :returns: the list of index files written.
+        """
+        dirty = sorted(f for f, entry in self._indexes.items() if entry["changed"])
+        if not dirty:
+            return []
+        for index_file in dirty:
+            entry = self._indexes[index_file]
+            entry["content"] = self._write_index(
+                index_file, entry["metadata"], entry["content"], entry["changed"]
+            )
+            entry["changed"] = set()
+        with self.timer.phase("git-index", count=len(dirty)):
+            self._add_files(dirty)
+        for index_file in dirty:
+            self._indexes[index_file]["stamp"] = self._get_index_stamp(index_file)
+        return dirty
+
+    def _map(self, func, items):
+        if self.workers > 1 and len(items) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                return list(pool.map(func, items))
+        return [func(item) for item in items]
+
+    def _is_pruned(self, evidence_path, metadata):
+        # Evidence pruned earlier in this run, listed again by a later chunk
+        # or matched again by a selector, is always skipped
+        ev_name = Path(evidence_path).name
+        ev_meta = metadata.get(ev_name)
+        if ev_meta is None and self.split_tombstones:
+            index_file = self.get_index_file_by_path(evidence_path)
+            tombstones_file = get_tombstones_file(index_file, self.local_path)
+            ev_meta = self._get_index(tombstones_file)["metadata"].get(ev_name)
+        if not (
+            isinstance(ev_meta, dict)
+            and "tombstones" in ev_meta
+            and "last_update" not in ev_meta
+        ):
+            return False
+        if self.resume:
+            self.logger.info(f"Evidence {evidence_path} already pruned, skipping...")
+            return True
+        if any(
+            records and records[-1].get("eol") == self.commit_date
+            for records in ev_meta["tombstones"].values()
+        ):
+            self.logger.warning(
+                f"Evidence {evidence_path} already pruned by this run, skipping..."
+            )
+            return True
+        return False
+
+    def _is_file(self, file_path):
+        if not self.bare:
+            return Path(self.local_path, file_path).is_file()
+        return self._get_relative_path(self.get_file(file_path)) in self._get_tracked()
+
+    def _get_tracked(self):
+        # Staged blob SHAs by path, kept up to date as the git index changes
+        with self._git_lock:
+            if self._tracked is None:
+                tracked = {}
+                for entry in self.repo.git.ls_files("-s", "-z").split("\0"):
+                    if entry:
+                        info, path = entry.split("\t", 1)
+                        tracked[path] = info.split(" ")[1]
+                self._tracked = tracked
+        return self._tracked
+
+    def _get_index(self, index_file):
+        # Index files are parsed once and only read again when changed by
+        # something other than this locker, held changes are always kept
+        entry = self._indexes.get(index_file)
+        if entry is not None and entry["changed"]:
+            return entry
+        stamp = self._get_index_stamp(index_file)
+        if entry is None or entry["stamp"] != stamp:
+            content = self._read_index(index_file)
+            entry = {
+                "content": content,
+                "metadata": json.loads(content),
+                "stamp": stamp,
+                "changed": set(),
             }
+            self._indexes[index_file] = entry
+        return entry
+
+    def _get_index_stamp(self, index_file):
+        if self.bare:
+            return self._get_tracked().get(self._get_relative_path(index_file))
+        try:
+            stat = Path(index_file).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_blob(self, file_path):
+        # Read the staged content, which holds changes not yet committed
+        sha = self._get_tracked()[self._get_relative_path(file_path)]
+        with self._git_lock:
+            data = self.repo.git.get_object_data(sha)[3]
+        return data.decode("utf-8")
+
+    def _read_index(self, index_file):
+        start = time.perf_counter()
+        try:
+            if self.bare:
+                content = self._read_blob(index_file)
+            else:
+                with open(index_file) as f:
+                    content = f.read()
+        except (KeyError, FileNotFoundError):
+            return "{}"
+        duration = time.perf_counter() - start
+        self.timer.record("index-read", duration, 1, len(content))
+        self.timer.record_index_file(
+            self._get_relative_path(index_file), duration, read=len(content)
+        )
+        return content
+
+    def _tombstone_index(self, index_file, evidences, pruner, commits):
+        entry = self._get_index(index_file)
+        tombstones = None
+        if self.split_tombstones:
+            tombstones = self._get_index(
+                get_tombstones_file(index_file, self.local_path)
+            )
+        ev_files = self.tombstone_metadata(
+            entry["metadata"],
+            evidences,
+            pruner,
+            commits,
+            tombstones["metadata"] if tombstones else None,
+        )
+        names = [evidence.name for evidence, _ in evidences]
+        entry["changed"].update(names)
+        if tombstones:
+            tombstones["changed"].update(names)
+        return ev_files
+
+    def _write_index(self, index_file, metadata, content, changed):
+        start = time.perf_counter()
+        content = format_index(metadata, content, changed)
+        if self.bare:
+            data = content.encode("utf-8")
+            blob = self.repo.odb.store(IStream("blob", len(data), BytesIO(data)))
+            self._blobs[self._get_relative_path(index_file)] = blob.hexsha.decode()
+        else:
+            # Tombstones files may be the first file in their folder
+            Path(index_file).parent.mkdir(parents=True, exist_ok=True)
             with open(index_file, "w") as f:
-                f.write(format_json(metadata))
-            self.repo.index.add([index_file])
+                f.write(content)
+        duration = time.perf_counter() - start
+        self.timer.record("index-write", duration, 1, len(content))
+        self.timer.record_index_file(
+            self._get_relative_path(index_file), duration, written=len(content)
+        )
+        return content
+
+    def _get_relative_path(self, file_path):
+        return str(Path(file_path).relative_to(self.local_path))
+
+    def _add_files(self, file_paths):
+        if not self.bare:
+            self.repo.index.add(file_paths)
+            return
+        entries = []
+        for file_path in file_paths:
+            path = self._get_relative_path(file_path)
+            entries.append((BLOB_MODE, self._blobs.pop(path), path))
+        self._update_index(entries)
+        self._get_tracked().update({path: sha for _, sha, path in entries})
+
+    def _update_index(self, entries):
+        # One git plumbing call stages blobs already in the object database
+        # and removes paths, given a zero mode, without a working tree
+        info = Path(self.repo.git_dir, "prune-index-info")
+        info.write_bytes(
+            b"".join(
+                f"{mode} {sha}\t{path}\0".encode("utf-8") for mode, sha, path in entries
+            )
+        )
+        try:
+            with open(info, "rb") as istream:
+                self.repo.git.update_index("-z", "--index-info", istream=istream)
+        finally:
+            info.unlink()
+
+    def _remove_files(self, ev_files):
+        if self.bare:
+            paths = [self._get_relative_path(f) for f in ev_files]
+            self._update_index([("0", NULL_SHA, path) for path in paths])
+            for path in paths:
+                self._get_tracked().pop(path, None)
+            return
+        if len(ev_files) <= BULK_REMOVE_FILES:
+            self.repo.index.remove(ev_files, working_tree=True)
+            return
+        # Too many paths for a command line so git reads them from a file
+        pathspec = Path(self.repo.git_dir, "prune-remove-paths")
+        pathspec.write_text(
+            "".join(f"{self._get_relative_path(f)}\0" for f in ev_files)
+        )
+        try:
+            self.repo.git.rm(
+                "-q",
+                f"--pathspec-from-file={pathspec}",
+                "--pathspec-file-nul",
+                env={"GIT_LITERAL_PATHSPECS": "1"},
+            )
+        finally:
+            pathspec.unlink()
+
+    def _get_last_commits(self, paths):
+        commits = get_last_commits(self.repo, paths)
+        depth = DEEPEN_STEP
+        while (
+            len(commits) < len(set(paths))
+            and (self.clone_depth or self.clone_shallow_since_days)
+            and self.is_shallow
+        ):
+            self.logger.info(f"Fetching {depth} more commits to resolve tombstones...")
+            self.repo.git.fetch("origin", self.default_branch, f"--deepen={depth}")
+            depth *= 2
+            commits = get_last_commits(self.repo, paths)
+        return commits
+
+    def _log_large_files(self):
+        if self.clone_mode == "blobless":
+            # Sizing every file would download all of the deferred content
+            self.logger.info("Large file check skipped for blobless clone...")
+            return
+        super()._log_large_files()
+
+    def _commit_pruned(self):
+        self.flush_indexes()
+        pruned_files = "\n".join(self.pruned)
+        if self._manifest is not None:
+            self._manifest.close()
+            self.repo.index.add([self.manifest_path])
+            manifest = Path(self.manifest_path).relative_to(self.local_path)
+            pruned_files += (
+                f"\n\n...and {self._uncommitted - len(self.pruned)} more.  "
+                f"See {manifest} for the full list."
+            )
+        with self.timer.phase("checkin", count=self._uncommitted):
+            self.checkin(
+                (
+                    "Pruned abandoned evidence at local time "
+                    f"{time.ctime(time.time())}\n\n{pruned_files}"
+                )
+            )
+        if not self._uncommitted:
+            # Checkpoint numbers and manifest suffixes only advance on commits
+            return
+        if self.journal_path:
+            with open(self.journal_path, "a") as f:
+                entry = {
+                    "checkpoint": self.checkpoints,
+                    "commit": self.repo.head.commit.hexsha,
+                    "pruned": self._uncommitted,
+                    "total": self.pruned_count,
+                }
+                f.write(f"{json.dumps(entry)}\n")
+        self.checkpoints += 1
+        self._uncommitted = 0
+        self._manifest = None
+        self._last_checkpoint = time.monotonic()
+
+    def _record_pruned(self, evidence_path):
+        self.pruned_count += 1
+        self._uncommitted += 1
+        if self._evidence_index is not None:
+            self._evidence_index.evidences.pop(evidence_path, None)
+        if self._manifest is None and len(self.pruned) < self.message_limit:
+            self.pruned.append(evidence_path)
+            return
+        if self._manifest is None:
+            stamp = self.commit_date.split(".")[0].replace(":", "")
+            if self.checkpoints:
+                stamp += f"-{self.checkpoints}"
+            self.manifest_path = self.get_file(f"{MANIFESTS_DIR}/pruned-{stamp}.txt")
+            Path(self.manifest_path).parent.mkdir(parents=True, exist_ok=True)
+            self._manifest = open(self.manifest_path, "w")
+            self._manifest.writelines(f"{path}\n" for path in self.pruned)
+        self._manifest.write(f"{evidence_path}\n")
+
+    def _create_partitions_tombstone(self, ev_meta, reason, part_files, commits):
+        # A single tombstone for all partitions, with partitions grouped by
+        # the last commit holding them rather than repeated per partition
+        by_commit = {}
+        for part, ev_file in part_files.items():
+            if commits.get(ev_file):
+                by_commit.setdefault(commits[ev_file], []).append(part)
+        return {
+            "eol": self.commit_date,
+            "last_update": ev_meta["last_update"],
+            "partition_fields": ev_meta["partition_fields"],
+            "partition_root": ev_meta["partition_root"],
+            "partitions": ev_meta["partitions"],
+            "commits": by_commit,
+            "reason": reason,
+        }
+
+    def _get_evidence_files(self, metadata, evidence):
+        if not getattr(evidence, "is_partitioned", False):
+            return [evidence.path]
+        parts = metadata.get(evidence.name, {}).get("partitions", {}).keys()
+        return [f"{evidence.dir_path}/{part}_{evidence.name}" for part in parts]
+
+    def _tombstone_evidence(self, metadata, evidence, reason, pruner, commits=None):
+        commits = commits or {}
+        ev_meta = metadata.get(evidence.name, {})
+        partitions = {}
+        if getattr(evidence, "is_partitioned", False):
+            partitions = ev_meta.get("partitions", {})
+        ev_files = self._get_evidence_files(metadata, evidence)
+        archive = self.archive_path and ev_meta.get("last_update", "") <= (
+            self.archive_cutoff
+        )
+        if archive:
+            self.archived.extend(ev_files)
+        if partitions and len(partitions) >= self.compact_partitions:
+            tombstone = self._create_partitions_tombstone(
+                ev_meta, reason, dict(zip(partitions.keys(), ev_files)), commits
+            )
+            if archive:
+                tombstone["archive"] = Path(self.archive_path).name
+            tombstones = ev_meta.get("tombstones", {})
+            tombstones.setdefault(evidence.name, []).append(tombstone)
+        else:
+            keys = list(partitions.keys()) if partitions else [evidence.name]
+            tombstones = self.create_tombstone_metadata(
+                partitions.keys() if partitions else evidence.name, ev_meta, reason
+            )
+            for key, ev_file in zip(keys, ev_files):
+                if commits.get(ev_file):
+                    tombstones[key][-1]["commit"] = commits[ev_file]
+                if archive:
+                    tombstones[key][-1]["archive"] = Path(self.archive_path).name
+        metadata[evidence.name] = {
+            "description": evidence.description,
+            "pruned_by": pruner,
+            "tombstones": tombstones,
+        }
+        return [self.get_file(ev_file) for ev_file in ev_files]
@@ -0,0 +1,117 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune manifest readers."""
+
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+
+from compliance.utils.data_parse import format_json
+
+STREAMING_SUFFIXES = [".csv", ".jsonl", ".ndjson"]
+CSV_HEADER = ["path", "reason"]
+
+
+def is_streaming_manifest(file_path):
+    """
+    Confirm whether a prune configuration file can be read as a stream.
+
+    :param file_path: the path to the prune configuration file.
+
+    :returns: True or False (file is or isn't a JSON Lines or CSV manifest)
+    """
+    return Path(file_path).suffix.lower() in STREAMING_SUFFIXES
+
+
+def read_manifest(file_path):
+    """
+    Provide the evidence path/reason pairs held in a prune configuration file.
+
+    JSON Lines manifests hold one ``{"path": "...", "reason": "..."}`` object
+    per line.  CSV manifests hold one path,reason row per line with an
+    optional ``path,reason`` header row.  Both are read one entry at a time.
+    Any other file is read as a JSON object of evidence path/reason pairs.
+
+    :param file_path: the path to the prune configuration file.
+
+    :returns: a generator of (evidence path, reason) tuples.
+
+    :raises ValueError: if a CSV manifest row does not hold a reason.
+    """
+    suffix = Path(file_path).suffix.lower()
+    with open(Path(file_path).expanduser(), newline="") as f:
+        if suffix == ".csv":
+            reader = csv.reader(f)
+            for row in reader:
+                if not row or row[:2] == CSV_HEADER:
+                    continue
+                if len(row) < 2:
+                    raise ValueError(
+                        f"Manifest {file_path} line {reader.line_num} must hold "
+                        "a path and a reason"
+                    )
+                yield row[0], row[1]
+        elif is_streaming_manifest(file_path):
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    yield entry["path"], entry["reason"]
+        else:
+            yield from json.loads(f.read()).items()
+
+
+def chunked(iterable, size):
+    """
+    Provide the items of an iterable in lists of a bounded size.
+
+    :param iterable: the iterable to split.
+    :param size: the maximum number of items in each list.
+
+    :returns: a generator of lists.
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def write_manifest(file_path, entries):
+    """
+    Write evidence path/reason pairs to a prune configuration file.
+
+    The file format follows the file extension as with ``read_manifest``.
+
+    :param file_path: the path to the prune configuration file.
+    :param entries: an iterable of (evidence path, reason) tuples.
+
+    :returns: the number of entries written.
+    """
+    suffix = Path(file_path).suffix.lower()
+    count = 0
+    with open(Path(file_path).expanduser(), "w", newline="") as f:
+        if suffix == ".csv":
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            for count, entry in enumerate(entries, 1):
+                writer.writerow(entry)
+        elif is_streaming_manifest(file_path):
+            for count, (path, reason) in enumerate(entries, 1):
+                f.write(f"{json.dumps({'path': path, 'reason': reason})}\n")
+        else:
+            config = dict(entries)
+            count = len(config)
+            f.write(format_json(config))
+    return count
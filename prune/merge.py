@@ -0,0 +1,77 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune index file merging."""
+
+MISSING = object()
+
+
+def merge_index(base, upstream, local):
+    """
+    Merge concurrent changes to an index or tombstones file key by key.
+
+    Entries changed on one side only take that side's change.  When both
+    sides changed an entry, evidence refreshed upstream wins over evidence
+    pruned locally, since the upstream evidence files are newer than the
+    decision to prune them.  Otherwise tombstones from both sides are kept.
+
+    :param base: the common ancestor file content as a dictionary.
+    :param upstream: the upstream file content as a dictionary.
+    :param local: the local file content as a dictionary.
+
+    :returns: a tuple of the merged content as a dictionary and the names of
+      locally pruned evidence kept because it was refreshed upstream.
+    """
+    merged = {}
+    kept = []
+    for key in {**upstream, **local}.keys():
+        up = upstream.get(key, MISSING)
+        loc = local.get(key, MISSING)
+        old = base.get(key, MISSING)
+        if up == loc or loc == old:
+            value = up
+        elif up == old:
+            value = loc
+        else:
+            value = _merge_entry(up, loc)
+            if value is up and _is_pruned(loc):
+                kept.append(key)
+        if value is not MISSING:
+            merged[key] = value
+    return merged, kept
+
+
+def _merge_entry(upstream, local):
+    if not isinstance(upstream, dict) or not isinstance(local, dict):
+        return upstream if local is MISSING else local
+    if "last_update" in upstream:
+        return upstream
+    merged = dict(local)
+    tombstones = {
+        key: list(records) for key, records in upstream.get("tombstones", {}).items()
+    }
+    for key, records in local.get("tombstones", {}).items():
+        tombstones.setdefault(key, []).extend(
+            record for record in records if record not in tombstones[key]
+        )
+    if tombstones:
+        merged["tombstones"] = tombstones
+    return merged
+
+
+def _is_pruned(ev_meta):
+    return (
+        isinstance(ev_meta, dict)
+        and "tombstones" in ev_meta
+        and "last_update" not in ev_meta
+    )
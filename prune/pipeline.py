@@ -0,0 +1,109 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune pipeline runner."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Stage(object):
+    """A prune pipeline stage."""
+
+    def __init__(self, name, func, limit=1, always=False):
+        """
+        Construct and initialize the pipeline stage object.
+
+        :param name: the stage name.
+        :param func: the function run for each job, taking the job dictionary.
+        :param limit: the number of jobs processed by the stage at the same time.
+        :param always: run the stage for jobs that failed in an earlier stage.
+        """
+        self.name = name
+        self.func = func
+        self.limit = limit
+        self.always = always
+
+
+class PrunePipeline(object):
+    """
+    Run jobs through a sequence of stages with per stage concurrency limits.
+
+    Jobs are dictionaries passed from stage to stage.  Stage functions are
+    blocking and run in threads, scheduled by an asyncio event loop, so that a
+    job can be cloned while another is pruned and a third is pushed.  Stages
+    are connected by queues bounded by the concurrency limit of the next stage
+    so a slow stage holds back the stages feeding it rather than letting work
+    pile up.  A job that fails in a stage has its ``error`` set and skips the
+    remaining stages other than those that always run, such as cleanup.
+    """
+
+    def __init__(self, stages):
+        """
+        Construct and initialize the prune pipeline object.
+
+        :param stages: the list of pipeline stages, in order.
+        """
+        self.stages = stages
+
+    def run(self, jobs):
+        """
+        Run jobs through every pipeline stage.
+
+        :param jobs: an iterable of job dictionaries.
+
+        :returns: the list of job dictionaries, in completion order.
+        """
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(max_workers=sum(s.limit for s in self.stages))
+        try:
+            return loop.run_until_complete(self._run(loop, executor, jobs))
+        finally:
+            executor.shutdown()
+            loop.close()
+
+    async def _run(self, loop, executor, jobs):
+        queues = [asyncio.Queue(maxsize=stage.limit) for stage in self.stages]
+        done = []
+        workers = [
+            [
+                loop.create_task(self._work(loop, executor, index, queues, done))
+                for _ in range(stage.limit)
+            ]
+            for index, stage in enumerate(self.stages)
+        ]
+        for job in jobs:
+            job.setdefault("error", None)
+            await queues[0].put(job)
+        # Stop each stage once every job has gone through the stage before it
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.limit):
+                await queues[index].put(None)
+            await asyncio.gather(*workers[index])
+        return done
+
+    async def _work(self, loop, executor, index, queues, done):
+        stage = self.stages[index]
+        while True:
+            job = await queues[index].get()
+            if job is None:
+                return
+            if stage.always or not job["error"]:
+                try:
+                    await loop.run_in_executor(executor, stage.func, job)
+                except Exception as e:
+                    job["error"] = job["error"] or f"{e.__class__.__name__}: {e}"
+            if index + 1 < len(queues):
+                await queues[index + 1].put(job)
+            else:
+                done.append(job)
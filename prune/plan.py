@@ -0,0 +1,238 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune plans built from the locker git object database."""
+
+import json
+from pathlib import PurePath
+
+from compliance.locker import INDEX_FILE
+from compliance.utils.exceptions import EvidenceNotFoundError
+
+from prune.evidence import describe_evidence
+from prune.history import get_last_commits
+from prune.index import format_index, get_tombstones_file
+from prune.selectors import EvidenceIndex, is_selector
+
+
+class PrunePlan(object):
+    """
+    Plan evidence removal without a locker working tree.
+
+    Index files and tree listings are read from the git object database of
+    the locker so that the locker does not need to be checked out.  Planned
+    tombstones are applied to in-memory copies of the index files only, and
+    of the tombstones files when the locker splits tombstones.
+    """
+
+    def __init__(self, locker, rev="HEAD"):
+        """
+        Construct and initialize the prune plan object.
+
+        :param locker: the prune locker object, cloned without a checkout.
+        :param rev: the locker revision to plan evidence removal against.
+        """
+        self.locker = locker
+        self.repo = locker.repo
+        self.rev = rev
+        self.head = self.repo.commit(rev).hexsha
+        self.evidences = []
+        self.errors = []
+        self._folders = {}
+        self._indexes = {}
+        self._evidence_index = None
+
+    def add(self, config, pruner):
+        """
+        Plan the removal of evidence path/reason pairs.
+
+        Evidence that cannot be removed is recorded as an error.
+
+        :param config: a dictionary of evidence path or selector/reason pairs.
+        :param pruner: a string providing the email of the git user.
+        """
+        if any(is_selector(key) for key in config.keys()):
+            config = self._get_evidence_index().expand(config)
+        planned = []
+        for path, reason in config.items():
+            try:
+                planned.append((self._get_descriptor(path), reason))
+            except (EvidenceNotFoundError, ValueError) as e:
+                self.errors.append({"path": path, "error": str(e)})
+        files = [f for evidence, _ in planned for f in evidence.files]
+        commits = get_last_commits(self.repo, files, self.rev)
+        for evidence, reason in planned:
+            index_file = f"{evidence.dir_path}/{INDEX_FILE}"
+            index = self._indexes[index_file]
+            changed = [index]
+            tombstones = None
+            if self.locker.split_tombstones:
+                tombstones_file = get_tombstones_file(index_file)
+                tombstones = self._get_index(tombstones_file)
+                changed.append(self._indexes[tombstones_file])
+            self.locker.tombstone_metadata(
+                index["metadata"], [(evidence, reason)], pruner, commits, tombstones
+            )
+            for changed_index in changed:
+                changed_index["entries"].append(evidence.name)
+            sizes = self._get_folder(evidence.dir_path)
+            self.evidences.append(
+                {
+                    "path": evidence.path,
+                    "reason": reason,
+                    "files": {f: sizes[PurePath(f).name][1] for f in evidence.files},
+                }
+            )
+            if self._evidence_index is not None:
+                self._evidence_index.evidences.pop(evidence.path, None)
+
+    def get_report(self):
+        """
+        Provide the planned change set.
+
+        :returns: a dictionary of the evidence files to delete, the bytes
+          reclaimed and the index and tombstones file entries to change.
+          Index file sizes after the change are those written by a prune.
+        """
+        index_files = {}
+        for index_file, index in sorted(self._indexes.items()):
+            if index["entries"]:
+                content = format_index(
+                    index["metadata"], index["content"], index["entries"]
+                )
+                index_files[index_file] = {
+                    "entries": index["entries"],
+                    "bytes_before": index["size"],
+                    "bytes_after": len(content.encode("utf-8")),
+                }
+        files = [size for ev in self.evidences for size in ev["files"].values()]
+        return {
+            "locker": self.locker.repo_url,
+            "branch": self.locker.branch,
+            "commit": self.head,
+            "summary": {
+                "evidence": len(self.evidences),
+                "files": len(files),
+                "bytes": sum(files),
+                "index_files": len(index_files),
+                "errors": len(self.errors),
+            },
+            "evidence": self.evidences,
+            "index_files": index_files,
+            "errors": self.errors,
+        }
+
+    def _get_folder(self, folder):
+        if folder not in self._folders:
+            listing = self.repo.git(c="core.quotepath=off").ls_tree(
+                "-l", self.rev, "--", f"{folder}/"
+            )
+            entries = {}
+            for line in listing.splitlines():
+                info, path = line.split("\t", 1)
+                _, obj_type, sha, size = info.split()
+                if obj_type == "blob":
+                    entries[PurePath(path).name] = (sha, int(size))
+            self._folders[folder] = entries
+        return self._folders[folder]
+
+    def _get_index(self, index_file):
+        if index_file not in self._indexes:
+            path = PurePath(index_file)
+            entry = self._get_folder(str(path.parent)).get(path.name)
+            content, size = None, 0
+            if entry:
+                content = self.repo.git.get_object_data(entry[0])[3].decode("utf-8")
+                size = entry[1]
+            self._indexes[index_file] = {
+                "metadata": json.loads(content) if content else {},
+                "content": content,
+                "size": size,
+                "entries": [],
+            }
+        return self._indexes[index_file]["metadata"]
+
+    def _get_descriptor(self, path):
+        dir_path = str(PurePath(path).parent)
+        descriptor = describe_evidence(
+            path, self._get_index(f"{dir_path}/{INDEX_FILE}")
+        )
+        sizes = self._get_folder(dir_path)
+        for ev_file in descriptor.files:
+            if PurePath(ev_file).name not in sizes:
+                raise ValueError(f"Evidence {ev_file} was not found in the locker")
+        return descriptor
+
+    def _get_evidence_index(self):
+        if self._evidence_index is None:
+            self._evidence_index = EvidenceIndex()
+            listing = self.repo.git(c="core.quotepath=off").ls_tree(
+                "-r", "--name-only", self.rev
+            )
+            for path in listing.splitlines():
+                if PurePath(path).name == INDEX_FILE:
+                    self._evidence_index.add_index(path, self._get_index(path))
+        return self._evidence_index
+
+
+def format_markdown(report):
+    """
+    Provide a prune plan report as a Markdown document.
+
+    :param report: the prune plan report dictionary.
+
+    :returns: the Markdown report text.
+    """
+    summary = report["summary"]
+    lines = [
+        "# Prune dry-run report",
+        "",
+        f"Locker {report['locker']} branch `{report['branch']}` "
+        f"at commit `{report['commit']}`.",
+        "",
+        "| Evidence | Files | Bytes | Index files | Errors |",
+        "| --- | --- | --- | --- | --- |",
+        f"| {summary['evidence']} | {summary['files']} | {summary['bytes']} "
+        f"| {summary['index_files']} | {summary['errors']} |",
+    ]
+    if report["evidence"]:
+        lines += [
+            "",
+            "## Evidence to remove",
+            "",
+            "| Evidence | Reason | Files | Bytes |",
+            "| --- | --- | --- | --- |",
+        ]
+        for ev in report["evidence"]:
+            lines.append(
+                f"| `{ev['path']}` | {ev['reason']} | {len(ev['files'])} "
+                f"| {sum(ev['files'].values())} |"
+            )
+    if report["index_files"]:
+        lines += [
+            "",
+            "## Index files to update",
+            "",
+            "| Index file | Entries tombstoned | Bytes before | Bytes after |",
+            "| --- | --- | --- | --- |",
+        ]
+        for index_file, index in report["index_files"].items():
+            lines.append(
+                f"| `{index_file}` | {', '.join(index['entries'])} "
+                f"| {index['bytes_before']} | {index['bytes_after']} |"
+            )
+    if report["errors"]:
+        lines += ["", "## Errors", ""]
+        for error in report["errors"]:
+            lines.append(f"- `{error['path']}`: {error['error']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,260 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune tombstone index and evidence recovery."""
+
+import json
+import os
+import sqlite3
+from pathlib import Path, PurePath
+
+from compliance.locker import INDEX_FILE
+
+import git
+
+from prune.index import TOMBSTONES_FILE, get_evidence_folder
+
+TOMBSTONE_COLUMNS = [
+    "path",
+    "file",
+    "commit_sha",
+    "eol",
+    "last_update",
+    "reason",
+    "pruner",
+    "archive",
+]
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS tombstones (
+    locker TEXT NOT NULL,
+    index_file TEXT NOT NULL,
+    {", ".join(f"{column} TEXT" for column in TOMBSTONE_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS tombstones_path ON tombstones (locker, path);
+CREATE INDEX IF NOT EXISTS tombstones_file ON tombstones (locker, file);
+CREATE INDEX IF NOT EXISTS tombstones_index ON tombstones (locker, index_file);
+CREATE TABLE IF NOT EXISTS lockers (
+    locker TEXT PRIMARY KEY,
+    commit_sha TEXT NOT NULL
+);
+"""
+# Only parameter placeholders, one per column, are formatted into the statement
+PLACEHOLDERS = ", ".join("?" * (len(TOMBSTONE_COLUMNS) + 2))
+INSERT_TOMBSTONE = f"INSERT INTO tombstones VALUES ({PLACEHOLDERS})"  # nosec
+
+
+def get_tombstones(index_file, metadata):
+    """
+    Provide the tombstones held in index file metadata, one per evidence file.
+
+    Tombstones for unpartitioned evidence, for each partition of partitioned
+    evidence and compact partitioned evidence tombstones are all supported.
+
+    :param index_file: the index or tombstones file path relative to the
+      locker root.
+    :param metadata: the index or tombstones file content as a dictionary.
+
+    :returns: a generator of dictionaries keyed by ``TOMBSTONE_COLUMNS``.
+    """
+    folder = get_evidence_folder(index_file)
+    for ev_name, ev_meta in metadata.items():
+        if not isinstance(ev_meta, dict):
+            continue
+        path = str(folder.joinpath(ev_name))
+        for key, records in ev_meta.get("tombstones", {}).items():
+            for record in records:
+                files = {key: record.get("commit")}
+                if "commits" in record:
+                    files = {part: None for part in record.get("partitions", {})}
+                    for commit, parts in record["commits"].items():
+                        files.update({part: commit for part in parts})
+                for part, commit in files.items():
+                    ev_file = ev_name if part == ev_name else f"{part}_{ev_name}"
+                    yield {
+                        "path": path,
+                        "file": str(folder.joinpath(ev_file)),
+                        "commit_sha": commit,
+                        "eol": record.get("eol"),
+                        "last_update": record.get("last_update"),
+                        "reason": record.get("reason"),
+                        "pruner": ev_meta.get("pruned_by"),
+                        "archive": record.get("archive"),
+                    }
+
+
+class TombstoneIndex(object):
+    """
+    Maintain a SQLite index of the tombstones in evidence lockers.
+
+    The tombstones of a locker are indexed from the index files of a locker
+    commit, read from the git object database.  The indexed commit is kept so
+    that the next update only reads the index files changed since then.
+    """
+
+    def __init__(self, db_path):
+        """
+        Construct and initialize the tombstone index object.
+
+        :param db_path: the path to the SQLite database file.
+        """
+        self.db_path = os.path.expanduser(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.db_path, timeout=60)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        """Close the SQLite database."""
+        self.db.close()
+
+    def update(self, locker, repo, rev="HEAD"):
+        """
+        Index the tombstones of a locker commit.
+
+        Only index files changed since the last indexed commit are read.  The
+        locker is indexed from scratch when it was never indexed or when the
+        last indexed commit is not an ancestor of the commit, after a history
+        rewrite for example.
+
+        :param locker: the locker URL, or any other locker identifier.
+        :param repo: the GitPython repository object of the locker.
+        :param rev: the locker revision to index.
+
+        :returns: the number of index files read.
+        """
+        head = repo.git.rev_parse(f"{rev}^{{commit}}")
+        row = self.db.execute(
+            "SELECT commit_sha FROM lockers WHERE locker = ?", (locker,)
+        ).fetchone()
+        last = row["commit_sha"] if row else None
+        if last == head:
+            return 0
+        if last and self._is_ancestor(repo, last, head):
+            changed = repo.git.diff("--name-only", "-z", "--no-renames", last, head)
+        else:
+            last = None
+            changed = repo.git.ls_tree("-r", "--name-only", "-z", head)
+        index_files = [
+            path
+            for path in changed.split("\0")
+            if PurePath(path).name in [INDEX_FILE, TOMBSTONES_FILE]
+        ]
+        with self.db:
+            if last is None:
+                self.db.execute("DELETE FROM tombstones WHERE locker = ?", (locker,))
+            for index_file in index_files:
+                self.db.execute(
+                    "DELETE FROM tombstones WHERE locker = ? AND index_file = ?",
+                    (locker, index_file),
+                )
+                try:
+                    data = repo.git.get_object_data(f"{head}:{index_file}")[3]
+                except ValueError:
+                    # Index file deleted since the last indexed commit
+                    continue
+                self.db.executemany(
+                    INSERT_TOMBSTONE,
+                    [
+                        (locker, index_file) + tuple(t[c] for c in TOMBSTONE_COLUMNS)
+                        for t in get_tombstones(index_file, json.loads(data))
+                    ],
+                )
+            self.db.execute(
+                "INSERT OR REPLACE INTO lockers VALUES (?, ?)", (locker, head)
+            )
+        return len(index_files)
+
+    def lookup(self, locker, path):
+        """
+        Provide the tombstones of an evidence path.
+
+        :param locker: the locker URL, or any other locker identifier.
+        :param path: the evidence path, or evidence partition file path,
+          relative to the locker root.
+
+        :returns: a list of tombstone dictionaries, most recent first.
+        """
+        rows = self.db.execute(
+            f"SELECT {', '.join(TOMBSTONE_COLUMNS)} FROM tombstones "
+            "WHERE locker = ? AND (path = ? OR file = ?) ORDER BY eol DESC, file",
+            (locker, path, path),
+        )
+        return [dict(row) for row in rows]
+
+    def _is_ancestor(self, repo, ancestor, rev):
+        try:
+            return repo.is_ancestor(ancestor, rev)
+        except git.GitCommandError:
+            return False
+
+
+def recover_evidence(repo, tombstones, output_dir, archive_dir=None):
+    """
+    Restore removed evidence files from the locker git object database.
+
+    Each file is read from the last commit holding it without a checkout.
+    When a tombstone records no commit, the file is read from the parent of
+    the last commit that deleted it.
+    When that commit was moved out of the locker by archiving, the file is
+    read from the archive repository recorded in the tombstone instead.
+    Archive repositories are recorded by folder name and looked for in the
+    archive folder.
+
+    :param repo: the GitPython repository object of the locker.
+    :param tombstones: the tombstone dictionaries of the files to restore.
+    :param output_dir: the folder to restore files to, under their locker path.
+    :param archive_dir: the folder holding the archive repositories, defaults to
+      the current folder.
+
+    :returns: a list of (restored file path, error) pairs, where only one of
+      the two is set.
+    """
+    results = []
+    for tombstone in tombstones:
+        commit = tombstone["commit_sha"]
+        if not commit:
+            # Fall back to the commit before the last one deleting the file
+            deleted = repo.git.log(
+                "-1", "--diff-filter=D", "--format=%H", "--", tombstone["file"]
+            )
+            if not deleted:
+                results.append((None, f"No commit recorded for {tombstone['file']}"))
+                continue
+            commit = f"{deleted}^"
+        rev = f"{commit}:{tombstone['file']}"
+        try:
+            data = _read_blob(repo, rev, tombstone["archive"], archive_dir)
+        except (ValueError, git.GitCommandError):
+            results.append((None, f"{rev} not found in the locker history"))
+            continue
+        file_path = Path(output_dir, tombstone["file"])
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(data)
+        results.append((str(file_path), None))
+    return results
+
+
+def _read_blob(repo, rev, archive=None, archive_dir=None):
+    try:
+        return repo.git.get_object_data(rev)[3]
+    except ValueError:
+        if not archive:
+            raise
+    archive_path = Path(archive_dir or ".", archive).absolute()
+    if not archive_path.is_dir():
+        raise ValueError(f"Archive repository {archive_path} not found")
+    archive_repo = git.Repo(archive_path)
+    try:
+        return archive_repo.git.get_object_data(rev)[3]
+    finally:
+        archive_repo.close()
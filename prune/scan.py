@@ -0,0 +1,152 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune locker scanner."""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime as dt, timedelta
+from pathlib import Path
+
+from compliance.locker import AE_DEFAULT, INDEX_FILE, NOT_EVIDENCE
+
+from prune.selectors import TIMESTAMP_FORMAT
+
+# Locker folders holding files that are not evidence, including prune manifests
+IGNORED_FOLDERS = ["notifications"]
+IGNORED_FILES = ["check_results.json"]
+
+
+class LockerScan(object):
+    """
+    Scan a local evidence locker for abandoned and orphaned evidence.
+
+    The locker is walked once and each index file is parsed once into a
+    compact table of evidence path, last update and time to live rows.  Files
+    compared against index file entries fall into three groups:
+
+    - abandoned evidence, not updated within its time to live plus the
+      abandoned evidence threshold.  Abandoned evidence can be pruned.
+    - orphaned files, not listed in an index file.
+    - missing evidence, listed in an index file without its files.
+    """
+
+    def __init__(self, local_path, threshold=AE_DEFAULT, workers=1):
+        """
+        Construct and initialize the locker scan object.
+
+        :param local_path: the path to the local locker.
+        :param threshold: the time in seconds after time to live expires that
+          evidence can remain un-updated before it is considered abandoned.
+          Defaults to 30 days.
+        :param workers: the number of threads used to parse index files.
+        """
+        self.local_path = local_path
+        self.threshold = threshold
+        self.workers = workers
+        self.evidences = []
+        self.orphans = []
+        self.missing = []
+        self.files = 0
+        self.index_files = 0
+
+    def scan(self):
+        """
+        Walk the local locker and compare its files with index file entries.
+
+        :returns: the locker scan object.
+        """
+        folders = []
+        for dirpath, dirnames, filenames in os.walk(self.local_path):
+            folder = Path(dirpath).relative_to(self.local_path).as_posix()
+            folder = "" if folder == "." else folder
+            if folder in IGNORED_FOLDERS:
+                dirnames.clear()
+                continue
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            self.files += len(filenames)
+            self.index_files += INDEX_FILE in filenames
+            folders.append((folder, filenames))
+        if self.workers > 1 and len(folders) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(lambda f: self._scan_folder(*f), folders))
+        else:
+            results = [self._scan_folder(*folder) for folder in folders]
+        for evidences, orphans, missing in results:
+            self.evidences.extend(evidences)
+            self.orphans.extend(orphans)
+            self.missing.extend(missing)
+        return self
+
+    def get_abandoned(self, now=None):
+        """
+        Provide abandoned evidence paths along with suggested prune reasons.
+
+        :param now: the UTC date and time used to age evidence.  Defaults to
+          the current UTC date and time.
+
+        :returns: a generator of (evidence path, reason) tuples.
+        """
+        now = now or dt.utcnow()
+        # Timestamps share one format so they are compared as strings, with
+        # cutoffs and reasons computed once per time to live and update date
+        cutoffs = {}
+        reasons = {}
+        for path, last_update, ttl in sorted(self.evidences):
+            if ttl not in cutoffs:
+                cutoff = now - timedelta(seconds=ttl + self.threshold)
+                cutoffs[ttl] = cutoff.strftime(TIMESTAMP_FORMAT)
+            if last_update > cutoffs[ttl]:
+                continue
+            date = last_update[:10]
+            if date not in reasons:
+                days = (now - dt.strptime(date, "%Y-%m-%d")).days
+                reasons[
+                    date
+                ] = f"Abandoned evidence last updated {date}, {days} days ago"
+            yield path, reasons[date]
+
+    def _scan_folder(self, folder, filenames):
+        prefix = f"{folder}/" if folder else ""
+        names = {
+            name
+            for name in filenames
+            if not name.startswith(".")
+            and name not in NOT_EVIDENCE
+            and f"{prefix}{name}" not in IGNORED_FILES
+        }
+        evidences, missing, listed = [], [], set()
+        if INDEX_FILE in filenames:
+            metadata = json.loads(Path(self.local_path, folder, INDEX_FILE).read_text())
+            for ev_name, ev_meta in metadata.items():
+                if not isinstance(ev_meta, dict) or "last_update" not in ev_meta:
+                    continue
+                ev_files = [ev_name]
+                if ev_meta.get("partition_fields") is not None and ev_name.endswith(
+                    ".json"
+                ):
+                    ev_files = [f"{p}_{ev_name}" for p in ev_meta.get("partitions", {})]
+                listed.update(ev_files)
+                if not names.issuperset(ev_files):
+                    missing.append(f"{prefix}{ev_name}")
+                    continue
+                evidences.append(
+                    (
+                        f"{prefix}{ev_name}",
+                        ev_meta["last_update"],
+                        ev_meta.get("ttl", 0),
+                    )
+                )
+        orphans = [f"{prefix}{name}" for name in sorted(names - listed)]
+        return evidences, orphans, missing
@@ -0,0 +1,230 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune evidence selectors."""
+
+import fnmatch
+import re
+from datetime import datetime as dt, timedelta
+from pathlib import PurePath
+
+REGEX_PREFIX = "re:"
+STALE_PREFIX = "stale:"
+KEEP_PREFIX = "keep:"
+GLOB_CHARS = "*?["
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def is_selector(key):
+    """
+    Confirm whether a prune configuration key is a selector.
+
+    Keys that are not selectors are literal evidence paths.
+
+    :param key: the prune configuration key.
+
+    :returns: True or False (key is or isn't a selector)
+    """
+    return key.startswith((REGEX_PREFIX, STALE_PREFIX, KEEP_PREFIX)) or any(
+        c in key for c in GLOB_CHARS
+    )
+
+
+def get_selector_folder(key):
+    """
+    Provide the deepest locker folder holding every evidence a key can match.
+
+    :param key: the prune configuration key.
+
+    :returns: the relative folder path or None if the folder is unknown.
+    """
+    if key.startswith(REGEX_PREFIX):
+        return None
+    folder = []
+    for part in PurePath(_get_pattern(key)).parent.parts:
+        if any(c in part for c in GLOB_CHARS):
+            break
+        folder.append(part)
+    return str(PurePath(*folder)) if folder else None
+
+
+def validate_selector(key):
+    """
+    Confirm that a prune configuration key is a well formed selector.
+
+    Literal evidence paths are always valid.
+
+    :param key: the prune configuration key.
+
+    :raises ValueError: if the selector is malformed.
+    """
+    if not is_selector(key):
+        return
+    if key.startswith(STALE_PREFIX):
+        parts = key.split(":", 2)
+        if len(parts) < 3 or not parts[1].isdigit() or not parts[2]:
+            raise ValueError(
+                f"Selector {key} must be of the form {STALE_PREFIX}<days>:<pattern> "
+                "where <days> is a number"
+            )
+    if key.startswith(KEEP_PREFIX):
+        parts = key.split(":", 3)
+        if len(parts) < 4 or not all(p.isdigit() for p in parts[1:3]) or not parts[3]:
+            raise ValueError(
+                f"Selector {key} must be of the form "
+                f"{KEEP_PREFIX}<count>:<days>:<pattern> "
+                "where <count> and <days> are numbers"
+            )
+    try:
+        _get_matcher(key)
+    except re.error as e:
+        raise ValueError(f"Selector {key} is not a valid regular expression: {e}")
+
+
+def _get_pattern(key):
+    if key.startswith(STALE_PREFIX):
+        return key.split(":", 2)[2]
+    if key.startswith(KEEP_PREFIX):
+        return key.split(":", 3)[3]
+    return key
+
+
+def _get_cutoff(days):
+    return (dt.utcnow() - timedelta(days=int(days))).strftime(TIMESTAMP_FORMAT)
+
+
+def _get_matcher(key):
+    if key.startswith(REGEX_PREFIX):
+        regex = re.compile(key[len(REGEX_PREFIX) :]).fullmatch
+        return lambda path, meta: regex(path)
+    glob = re.compile(fnmatch.translate(_get_pattern(key))).match
+    if key.startswith(STALE_PREFIX):
+        cutoff = _get_cutoff(key.split(":", 2)[1])
+        return lambda path, meta: glob(path) and meta["last_update"] <= cutoff
+    return lambda path, meta: glob(path)
+
+
+def _get_keep(key):
+    # Evidence counted by a retention rule but too recent is never selected,
+    # such as reports that are overwritten in place by every check run
+    if not key.startswith(KEEP_PREFIX):
+        return None
+    _, keep, days, _ = key.split(":", 3)
+    if int(keep) < 0:
+        raise ValueError(f"Selector {key} must not keep a negative number")
+    return int(keep), _get_cutoff(days)
+
+
+def get_retention_group(evidence_path, metadata):
+    """
+    Provide the group an evidence is counted in by keep selectors.
+
+    Reports are grouped by the check classes that generated them, as in the
+    locker check results, and by folder.  Other evidence is grouped by folder.
+
+    :param evidence_path: the evidence path relative to the locker root.
+    :param metadata: the evidence metadata from its index file.
+
+    :returns: the retention group as a tuple.
+    """
+    checks = {check.rsplit(".", 1)[0] for check in metadata.get("checks") or []}
+    return (str(PurePath(evidence_path).parent),) + tuple(sorted(checks))
+
+
+class EvidenceIndex(object):
+    """
+    Provide an in-memory index of the evidence listed in locker index files.
+
+    The index is used to expand prune selectors into evidence paths.  Three
+    kinds of selector are supported along with literal evidence paths:
+
+    - glob patterns, for example ``raw/aws/*_2023*.json``.
+    - regular expressions prefixed with ``re:``, for example
+      ``re:raw/aws/.*_20(21|22)\\.json``.
+    - stale evidence rules prefixed with ``stale:<days>:`` followed by a glob
+      pattern, for example ``stale:90:raw/aws/*``, which matches evidence that
+      has not been updated in 90 days.
+    - retention rules prefixed with ``keep:<count>:<days>:`` followed by a
+      glob pattern, for example ``keep:10:30:reports/*``, which matches all
+      but the most recently updated 10 evidence of each retention group, such
+      as the reports generated by a check, that have not been updated in 30
+      days.
+
+    Evidence that has already been pruned is not indexed.
+    """
+
+    def __init__(self):
+        """Construct and initialize the evidence index object."""
+        self.evidences = {}
+
+    def add_index(self, index_path, metadata):
+        """
+        Add the evidence listed in an index file to the evidence index.
+
+        :param index_path: the index file path relative to the locker root.
+        :param metadata: the index file content as a dictionary.
+        """
+        folder = PurePath(index_path).parent
+        for ev_name, ev_meta in metadata.items():
+            if isinstance(ev_meta, dict) and "last_update" in ev_meta:
+                self.evidences[str(folder.joinpath(ev_name))] = ev_meta
+
+    def expand(self, config):
+        """
+        Expand prune configuration selectors into evidence paths.
+
+        Literal evidence paths are kept as is.  Selectors are matched against
+        the evidence index in a single pass and the first selector, in
+        configuration order, to match an evidence path supplies its reason.
+        Evidence matched by a retention rule is only selected once the most
+        recent evidence of its retention group are set aside, and only if it
+        is older than the minimum age of the rule.
+
+        :param config: a dictionary of evidence path or selector/reason pairs.
+
+        :returns: a dictionary of evidence path/reason pairs.
+        """
+        evidences = {}
+        matchers = []
+        for key, reason in config.items():
+            if is_selector(key):
+                matchers.append((_get_matcher(key), _get_keep(key), reason, {}))
+            else:
+                evidences[key] = reason
+        if not matchers:
+            return evidences
+        for path in sorted(self.evidences.keys()):
+            if path in evidences:
+                continue
+            meta = self.evidences[path]
+            for matcher, keep, reason, groups in matchers:
+                if not matcher(path, meta):
+                    continue
+                if keep is None:
+                    evidences[path] = reason
+                else:
+                    group = get_retention_group(path, meta)
+                    groups.setdefault(group, []).append(path)
+                break
+        for _, keep, reason, groups in matchers:
+            for paths in groups.values():
+                count, cutoff = keep
+                paths.sort(key=lambda p: self.evidences[p]["last_update"], reverse=True)
+                evidences.update(
+                    {
+                        path: reason
+                        for path in paths[count:]
+                        if self.evidences[path]["last_update"] <= cutoff
+                    }
+                )
+        return evidences
@@ -0,0 +1,122 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune run instrumentation."""
+
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+
+class PhaseTimer(object):
+    """
+    Accumulate wall time, counts and bytes for the phases of a prune run.
+
+    Phases are identified by name, for example ``clone`` or ``checkin``, and
+    can be recorded many times and from many threads.  Index file reads and
+    writes are also tracked per index file.
+    """
+
+    def __init__(self):
+        """Construct and initialize the phase timer object."""
+        self.phases = {}
+        self.index_files = {}
+        self._lock = Lock()
+
+    @contextmanager
+    def phase(self, name, count=0, nbytes=0):
+        """
+        Time a block of code as part of a phase.
+
+        :param name: the phase name.
+        :param count: the number of items processed by the block.
+        :param nbytes: the number of bytes processed by the block.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, count, nbytes)
+
+    def record(self, name, seconds, count=0, nbytes=0):
+        """
+        Add wall time, count and bytes to a phase.
+
+        :param name: the phase name.
+        :param seconds: the wall time in seconds.
+        :param count: the number of items processed.
+        :param nbytes: the number of bytes processed.
+        """
+        with self._lock:
+            phase = self.phases.setdefault(
+                name, {"seconds": 0.0, "calls": 0, "count": 0, "bytes": 0}
+            )
+            phase["seconds"] += seconds
+            phase["calls"] += 1
+            phase["count"] += count
+            phase["bytes"] += nbytes
+
+    def record_index_file(self, index_file, seconds, read=0, written=0):
+        """
+        Add wall time and bytes read or written to an index file.
+
+        :param index_file: the index file path relative to the locker root.
+        :param seconds: the wall time in seconds.
+        :param read: the number of bytes read.
+        :param written: the number of bytes written.
+        """
+        with self._lock:
+            stats = self.index_files.setdefault(
+                index_file, {"seconds": 0.0, "bytes_read": 0, "bytes_written": 0}
+            )
+            stats["seconds"] += seconds
+            stats["bytes_read"] += read
+            stats["bytes_written"] += written
+
+    def get_report(self):
+        """
+        Provide the recorded timings as a dictionary.
+
+        :returns: a dictionary of phase and index file timings.
+        """
+        with self._lock:
+            return {
+                "phases": {k: dict(v) for k, v in self.phases.items()},
+                "index_files": {k: dict(v) for k, v in self.index_files.items()},
+            }
+
+    def format_report(self, top=10):
+        """
+        Provide the recorded timings as human readable text.
+
+        :param top: the number of slowest index files to include.
+
+        :returns: the timings report text.
+        """
+        lines = ["Prune timings:"]
+        for name, phase in self.get_report()["phases"].items():
+            lines.append(
+                f"  {name:<12} {phase['seconds']:>10.3f}s  "
+                f"count {phase['count']}  bytes {phase['bytes']}"
+            )
+        slowest = sorted(
+            self.index_files.items(), key=lambda i: i[1]["seconds"], reverse=True
+        )[:top]
+        if slowest:
+            lines.append(f"Slowest index files (top {top}):")
+        for index_file, stats in slowest:
+            lines.append(
+                f"  {index_file} {stats['seconds']:.3f}s  "
+                f"read {stats['bytes_read']}  written {stats['bytes_written']}"
+            )
+        return "\n".join(lines)
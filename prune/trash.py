@@ -0,0 +1,140 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune local locker trash."""
+
+import os
+import shutil
+
+# Only used to run this interpreter on trash entries in detached mode
+import subprocess  # nosec
+import sys
+import tempfile
+import uuid
+from threading import Thread
+
+CLEANUP_MODES = ["sync", "background", "detached", "defer"]
+TRASH_FOLDER = "prune-trash"
+
+
+class Trash(object):
+    """
+    Remove local lockers without waiting for their files to be deleted.
+
+    Local lockers are renamed into a trash folder, which is immediate, and the
+    trash folder is then emptied according to the cleanup mode:
+
+    - ``background`` deletes trashed lockers in a background thread.  The
+      process waits for the thread to finish before exiting.
+    - ``detached`` deletes trashed lockers in a separate process that keeps
+      running once the prune run exits.
+    - ``defer`` leaves trashed lockers in place for a later run to delete.
+
+    Each run only deletes the lockers it trashed, along with the trashed
+    lockers left behind by deferred or interrupted runs, which are picked up
+    the first time the run trashes a locker.  Only entries in the trash folder
+    are ever deleted and entries already being deleted by another run are
+    skipped over.
+    """
+
+    def __init__(self, mode="background", path=None):
+        """
+        Construct and initialize the trash object.
+
+        :param mode: the cleanup mode, one of ``background``, ``detached`` or
+          ``defer``.
+        :param path: the trash folder.  Defaults to a ``prune-trash`` folder
+          in the temporary folder, which holds the local lockers.
+        """
+        if mode not in CLEANUP_MODES[1:]:
+            raise ValueError(f"Unsupported cleanup mode {mode}")
+        self.mode = mode
+        self.path = path or os.path.join(tempfile.gettempdir(), TRASH_FOLDER)
+        self._threads = []
+        self._leftovers = None
+
+    def move(self, path):
+        """
+        Move a folder into the trash and empty it from the trash.
+
+        The trash folder must be on the same file system as the folder.
+
+        :param path: the folder to move.
+
+        :returns: the path of the folder in the trash.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        names = []
+        if self._leftovers is None:
+            self._leftovers = [entry.name for entry in os.scandir(self.path)]
+            names.extend(self._leftovers)
+        name = f"{os.path.basename(path)}-{uuid.uuid4().hex[:12]}"
+        trashed = os.path.join(self.path, name)
+        os.rename(path, trashed)
+        self.empty([name] + names)
+        return trashed
+
+    def empty(self, names=None):
+        """
+        Delete trashed folders according to the cleanup mode.
+
+        :param names: the names of the trash folder entries to delete.
+          Defaults to every entry.
+        """
+        if self.mode == "defer" or not os.path.isdir(self.path):
+            return
+        if names is None:
+            names = [entry.name for entry in os.scandir(self.path)]
+        if not names:
+            return
+        if self.mode == "detached":
+            # The arguments are this interpreter and the trash entry paths
+            subprocess.Popen(  # nosec
+                [sys.executable, "-m", "prune.trash", self.path] + names,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+            return
+        thread = Thread(target=empty_trash, args=(self.path, names), name="prune-trash")
+        thread.start()
+        self._threads.append(thread)
+
+    def wait(self):
+        """Wait for trashed folders being deleted in the background."""
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+def empty_trash(path, names=None):
+    """
+    Delete entries in a trash folder.
+
+    Deletion errors, such as an entry deleted by another run at the same time,
+    are ignored so that the remaining entries are still deleted.
+
+    :param path: the trash folder.
+    :param names: the names of the entries to delete.  Defaults to every
+      entry.
+    """
+    for entry in os.scandir(path):
+        if names is not None and entry.name not in names:
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    empty_trash(sys.argv[1], sys.argv[2:] or None)
@@ -0,0 +1,203 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune archive tests."""
+
+import json
+import logging
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import git
+
+from prune.archive import (
+    get_object_store_size,
+    push_to_archive,
+    remove_from_history,
+    shrink,
+)
+from prune.locker import PruneLocker
+
+
+class TestArchive(unittest.TestCase):
+    """Test the locker archival helpers and the archival mode."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.TemporaryDirectory()
+        work = git.Repo.init(Path(self.tmp.name, "work"))
+        work.git.symbolic_ref("HEAD", "refs/heads/master")
+        with work.config_writer() as cw:
+            cw.set_value("user", "email", "finkel@example.com")
+            cw.set_value("user", "name", "finkel")
+        self.paths = [f"raw/foo/evidence_{n}.json" for n in range(3)]
+        index = {
+            Path(path).name: {
+                "description": "Foo",
+                "last_update": "2021-01-01T00:00:00.000000",
+                "ttl": 86400,
+            }
+            for path in self.paths
+        }
+        Path(work.working_dir, "raw/foo").mkdir(parents=True)
+        Path(work.working_dir, "raw/foo/index.json").write_text(json.dumps(index))
+        # Commit random, incompressible, content twice to grow the history
+        for commit in range(2):
+            for path in self.paths:
+                content = json.dumps({"data": os.urandom(20000).hex()})
+                Path(work.working_dir, path).write_text(content)
+            work.index.add(["raw/foo/index.json"] + self.paths)
+            work.index.commit(f"Commit {commit}")
+        self.remote = Path(self.tmp.name, "locker.git")
+        work.clone(self.remote, bare=True).close()
+        work.close()
+
+    def tearDown(self):
+        """Cleanup supporting test objects after each test."""
+        logging.disable(logging.NOTSET)
+        self.tmp.cleanup()
+
+    def _get_history(self, repo, rev="master"):
+        return set(repo.git.log("--name-only", "--format=", rev).split())
+
+    def test_remove_from_history(self):
+        """Ensures paths are archived then removed from history and repacked."""
+        repo = git.Repo.clone_from(f"file://{self.remote}", Path(self.tmp.name, "l"))
+        repo.git.repack("-a", "-d")
+        before = get_object_store_size(repo)
+        archive_path = Path(self.tmp.name, "archive", "locker.git")
+        push_to_archive(repo, archive_path, "master", "refs/archive/first")
+        pathspec = Path(self.tmp.name, "paths")
+        pathspec.write_text(f"{self.paths[0]}\n{self.paths[1]}\n")
+        remove_from_history(repo, "master", pathspec)
+        shrink(repo, ["refs/remotes/origin/master"])
+        history = self._get_history(repo)
+        self.assertNotIn(self.paths[0], history)
+        self.assertNotIn(self.paths[1], history)
+        self.assertIn(self.paths[2], history)
+        self.assertEqual(len(list(repo.iter_commits("master"))), 2)
+        self.assertLess(get_object_store_size(repo), before)
+        self.assertEqual(repo.git.for_each_ref("refs/original/"), "")
+        repo.close()
+        archive = git.Repo(archive_path)
+        self.assertIn(self.paths[0], self._get_history(archive, "refs/archive/first"))
+        archive.close()
+
+    def test_archive_prune(self):
+        """Ensures archived evidence is tombstoned and force pushed away."""
+        archive_dir = Path(self.tmp.name, "archive")
+        locker = PruneLocker(
+            name="prune-archive",
+            repo_url=f"file://{self.remote}",
+            do_push=True,
+            gitconfig={"user": {"email": "finkel@example.com", "name": "finkel"}},
+            local_path=str(Path(self.tmp.name, "local")),
+            archive_dir=str(archive_dir),
+            archive_days=30,
+        )
+        with locker:
+            evidences = locker.resolve_evidences({self.paths[0]: "Archived"})
+            locker.remove_evidences(evidences, "finkel")
+        locker.repo.close()
+        report = locker.archive_report
+        self.assertEqual(report["files"], 1)
+        self.assertTrue(Path(report["archive"]).is_dir())
+        self.assertLess(report["size_after"], report["size_before"])
+        remote = git.Repo(self.remote)
+        self.assertNotIn(self.paths[0], self._get_history(remote))
+        self.assertEqual(len(list(remote.iter_commits("master"))), 3)
+        index = json.loads(remote.git.show("master:raw/foo/index.json"))
+        remote.close()
+        name = Path(self.paths[0]).name
+        tombstone = index[name]["tombstones"][name][0]
+        self.assertEqual(tombstone["archive"], "prune-archive.git")
+
+    def test_archive_rewrites_tombstone_commits(self):
+        """Ensures earlier tombstones point to the rewritten commits."""
+        kwargs = {
+            "repo_url": f"file://{self.remote}",
+            "do_push": True,
+            "gitconfig": {"user": {"email": "finkel@example.com", "name": "finkel"}},
+        }
+        locker = PruneLocker(
+            name="prune-first", local_path=str(Path(self.tmp.name, "l1")), **kwargs
+        )
+        with locker:
+            evidences = locker.resolve_evidences({self.paths[1]: "Pruned"})
+            locker.remove_evidences(evidences, "finkel")
+        locker.repo.close()
+        locker = PruneLocker(
+            name="prune-archive",
+            local_path=str(Path(self.tmp.name, "l2")),
+            archive_dir=str(Path(self.tmp.name, "archive")),
+            archive_days=30,
+            **kwargs,
+        )
+        with locker:
+            evidences = locker.resolve_evidences({self.paths[0]: "Archived"})
+            locker.remove_evidences(evidences, "finkel")
+        locker.repo.close()
+        remote = git.Repo(self.remote)
+        index = json.loads(remote.git.show("master:raw/foo/index.json"))
+        name = Path(self.paths[1]).name
+        tombstone = index[name]["tombstones"][name][0]
+        self.assertNotIn("archive", tombstone)
+        self.assertIn(tombstone["commit"], remote.git.rev_list("master").split())
+        content = remote.git.show(f"{tombstone['commit']}:{self.paths[1]}")
+        self.assertIn("data", json.loads(content))
+        name = Path(self.paths[0]).name
+        tombstone = index[name]["tombstones"][name][0]
+        self.assertEqual(tombstone["archive"], Path(locker.archive_path).name)
+        self.assertNotIn(tombstone["commit"], remote.git.rev_list("master").split())
+        remote.close()
+
+    def test_archive_incremental(self):
+        """Ensures archiving again only adds new history to the archive."""
+        archive_dir = Path(self.tmp.name, "archive")
+        sizes = []
+        for run, path in enumerate(self.paths[:2]):
+            locker = PruneLocker(
+                name="prune-archive",
+                repo_url=f"file://{self.remote}",
+                do_push=True,
+                gitconfig={"user": {"email": "finkel@example.com", "name": "finkel"}},
+                local_path=str(Path(self.tmp.name, f"l{run}")),
+                archive_dir=str(archive_dir),
+                archive_days=30,
+            )
+            # Archive refs are stamped to the second
+            locker.archive_ref = f"refs/archive/{run}"
+            with locker:
+                evidences = locker.resolve_evidences({path: "Archived"})
+                locker.remove_evidences(evidences, "finkel")
+            locker.repo.close()
+            archive = git.Repo(locker.archive_path)
+            sizes.append(get_object_store_size(archive))
+            archive.close()
+        # Only rewritten commits and trees are added, not the evidence again
+        self.assertLess(sizes[1] - sizes[0], sizes[0] / 10)
+        archive = git.Repo(Path(archive_dir, "prune-archive.git"))
+        self.assertIn(self.paths[1], self._get_history(archive, "refs/archive/0"))
+        self.assertIn(self.paths[1], self._get_history(archive, "refs/archive/1"))
+        self.assertNotIn(self.paths[0], self._get_history(archive, "refs/archive/1"))
+        archive.close()
+
+    def test_archive_clone_mode(self):
+        """Ensures archiving requires a full clone without a mirror cache."""
+        with self.assertRaises(ValueError):
+            PruneLocker("repo-foo", clone_mode="shallow", archive_dir="archive")
+        with self.assertRaises(ValueError):
+            PruneLocker("repo-foo", cache_dir="cache", archive_dir="archive")
@@ -0,0 +1,99 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune benchmark suite tests."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import git
+
+from benchmarks.generator import generate_locker
+from benchmarks.run import compare, run_scenario
+
+
+class TestGenerateLocker(unittest.TestCase):
+    """Test the synthetic evidence locker generator."""
+
+    def test_generate_locker(self):
+        """Ensures evidence, partitions, tombstones and history are generated."""
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = generate_locker(
+                Path(tmp, "locker.git"),
+                evidences=6,
+                partitioned=2,
+                partitions=3,
+                folders=2,
+                tombstones=4,
+                history=3,
+            )
+            repo = git.Repo(Path(tmp, "locker.git"))
+            self.assertTrue(repo.bare)
+            self.assertEqual(len(list(repo.iter_commits("master"))), 3)
+            files = repo.git.ls_tree("-r", "--name-only", "master").splitlines()
+            index = json.loads(repo.git.show("master:raw/bench0/index.json"))
+            repo.close()
+        self.assertEqual(len(paths), 6)
+        self.assertEqual(paths[0], "raw/bench0/evidence_000000.json")
+        self.assertEqual(len(index), 7)
+        self.assertEqual(len(index["evidence_000000.json"]["partitions"]), 3)
+        # 4 unpartitioned evidence, 2 x 3 partitions and 2 index files
+        self.assertEqual(len(files), 12)
+
+
+class TestRunScenario(unittest.TestCase):
+    """Test the prune benchmark runner."""
+
+    def test_run_scenario(self):
+        """Ensures every prune phase is timed against a local remote."""
+        phases = run_scenario(
+            {"evidences": 6, "partitioned": 2, "folders": 2, "history": 2, "prune": 4},
+            repeat=1,
+        )
+        for name in [
+            "clone",
+            "resolve",
+            "tombstone",
+            "remove-evidence",
+            "remove-evidences",
+            "checkin",
+            "push",
+        ]:
+            self.assertIn(name, phases)
+        self.assertEqual(phases["remove-evidence"]["count"], 2)
+        self.assertEqual(phases["checkin"]["count"], 4)
+
+    def test_compare(self):
+        """Ensures phases slower than the baseline tolerance are reported."""
+        baseline = {
+            "scenarios": {
+                "foo": {"phases": {"push": {"median": 1.0}, "clone": {"median": 1.0}}}
+            }
+        }
+        results = {
+            "scenarios": {
+                "foo": {
+                    "phases": {
+                        "push": {"median": 1.5},
+                        "clone": {"median": 1.1},
+                        "checkin": {"median": 9.0},
+                    }
+                },
+                "bar": {"phases": {"push": {"median": 9.0}}},
+            }
+        }
+        self.assertEqual(
+            compare(results, baseline, 0.25), ["foo push: 1.500s vs 1.000s baseline"]
+        )
@@ -0,0 +1,103 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune mirror cache tests."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import git
+
+from prune.cache import MirrorCache
+
+
+class TestMirrorCache(unittest.TestCase):
+    """Test MirrorCache."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.remote_path = Path(self.tmp.name, "remote")
+        self.remote = git.Repo.init(self.remote_path, initial_branch="master")
+        with self.remote.config_writer() as cw:
+            cw.set_value("user", "email", "finkel@example.com")
+            cw.set_value("user", "name", "finkel")
+        self.commit("raw/bar/foo.json")
+        self.url = f"file://{self.remote_path}"
+        self.url_with_creds = f"file://{self.remote_path}/"
+        self.cache = MirrorCache(Path(self.tmp.name, "cache"))
+
+    def tearDown(self):
+        """Cleanup supporting test objects after each test."""
+        self.remote.close()
+        self.tmp.cleanup()
+
+    def commit(self, file_path):
+        """Add a file to the remote repository."""
+        path = Path(self.remote_path, file_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(file_path)
+        self.remote.index.add([str(path)])
+        return self.remote.index.commit(f"Add {file_path}").hexsha
+
+    def test_mirror_path(self):
+        """Ensures each locker URL gets its own mirror."""
+        foo = self.cache.get_mirror_path("https://github.com/org/foo")
+        self.assertTrue(foo.name.startswith("foo-"))
+        self.assertTrue(foo.name.endswith(".git"))
+        self.assertNotEqual(
+            foo, self.cache.get_mirror_path("https://github.example.com/org/foo")
+        )
+
+    def test_clone_and_refresh(self):
+        """Ensures clones come from a mirror that is refreshed incrementally."""
+        first_path = Path(self.tmp.name, "first")
+        first = self.cache.clone(self.url, self.url_with_creds, first_path, "master")
+        self.assertTrue(Path(first_path, "raw/bar/foo.json").is_file())
+        self.assertEqual(first.remote().url, self.url_with_creds)
+        mirror = git.Repo(self.cache.get_mirror_path(self.url))
+        self.assertTrue(mirror.bare)
+        self.assertEqual(mirror.remote().url, self.url)
+        sha = self.commit("raw/bar/baz.json")
+        second_path = Path(self.tmp.name, "second")
+        second = self.cache.clone(self.url, self.url_with_creds, second_path, "master")
+        self.assertEqual(second.head.commit.hexsha, sha)
+        self.assertTrue(Path(second_path, ".git/objects/info/alternates").is_file())
+        for repo in [first, second, mirror]:
+            repo.close()
+
+    def test_refresh_interrupted_clone(self):
+        """Ensures an interrupted mirror clone does not break later runs."""
+        mirror_path = self.cache.get_mirror_path(self.url)
+        with patch("git.Repo.clone_from", side_effect=git.GitCommandError("clone")):
+            with self.assertRaises(git.GitCommandError):
+                self.cache.refresh(self.url, self.url_with_creds)
+        self.assertFalse(mirror_path.exists())
+        Path(mirror_path.with_suffix(".tmp"), "objects").mkdir(parents=True)
+        self.assertEqual(self.cache.refresh(self.url, self.url_with_creds), mirror_path)
+        self.assertFalse(mirror_path.with_suffix(".tmp").exists())
+        mirror = git.Repo(mirror_path)
+        self.assertEqual(mirror.head.commit.hexsha, self.remote.head.commit.hexsha)
+        mirror.close()
+
+    def test_refresh_collects_garbage(self):
+        """Ensures garbage is collected in the foreground after each fetch."""
+        self.cache.refresh(self.url, self.url_with_creds)
+        mirror = git.Repo(self.cache.get_mirror_path(self.url))
+        self.assertEqual(mirror.config_reader().get_value("gc", "auto"), 0)
+        mirror.close()
+        with patch.object(git.cmd.Git, "gc", create=True) as mock_gc:
+            self.cache.refresh(self.url, self.url_with_creds)
+        mock_gc.assert_called_once_with("--auto", "--quiet")
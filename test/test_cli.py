@@ -15,11 +15,26 @@
 
 import json
 import logging
+import os
+
+# Only used to run this interpreter and time the CLI imports
+import subprocess  # nosec
+import sys
 import tempfile
 import unittest
-from unittest.mock import MagicMock, patch
+from pathlib import Path
+from unittest.mock import MagicMock, call, patch
+
+from prune.cli import Prune, get_locker_name
 
-from prune.cli import Prune
+HEAVY_MODULES = [
+    "asyncio",
+    "compliance.config",
+    "compliance.locker",
+    "compliance.utils.credentials",
+    "git",
+    "sqlite3",
+]
 
 
 class TestPruneCLI(unittest.TestCase):
@@ -46,11 +61,12 @@ class TestPruneCLI(unittest.TestCase):
         self.locker_init_config_mock = self.lic_patcher.start()
         self.lci_patcher = patch("compliance.locker.Locker.checkin")
         self.locker_checkin_mock = self.lci_patcher.start()
-        self.plre_patcher = patch("prune.locker.PruneLocker.remove_evidence")
-        self.prune_locker_remove_evidence_mock = self.plre_patcher.start()
-        self.lge_patcher = patch("compliance.locker.Locker.get_evidence")
-        self.locker_get_evidence_mock = self.lge_patcher.start()
-        self.locker_get_evidence_mock.return_value = "Remove me!!"
+        self.plre_patcher = patch("prune.locker.PruneLocker.remove_evidences")
+        self.prune_locker_remove_evidences_mock = self.plre_patcher.start()
+        self.plged_patcher = patch("prune.locker.PruneLocker.get_evidence_descriptor")
+        self.prune_locker_get_evidence_descriptor_mock = self.plged_patcher.start()
+        self.evidence = MagicMock(path="raw/foo/bar.json")
+        self.prune_locker_get_evidence_descriptor_mock.return_value = self.evidence
         self.srm_patcher = patch("prune.cli.shutil.rmtree")
         self.shutil_rmtree_mock = self.srm_patcher.start()
         self.dry_run = [
@@ -68,7 +84,7 @@ class TestPruneCLI(unittest.TestCase):
         self.lic_patcher.stop()
         self.lci_patcher.stop()
         self.plre_patcher.stop()
-        self.lge_patcher.stop()
+        self.plged_patcher.stop()
         self.srm_patcher.stop()
 
     def test_no_config_validation(self):
@@ -76,8 +92,8 @@ class TestPruneCLI(unittest.TestCase):
         self.prune.run(self.push_remote)
         self.git_repo_clone_from_mock.assert_not_called()
         self.locker_init_config_mock.assert_not_called()
-        self.locker_get_evidence_mock.assert_not_called()
-        self.prune_locker_remove_evidence_mock.assert_not_called()
+        self.prune_locker_get_evidence_descriptor_mock.assert_not_called()
+        self.prune_locker_remove_evidences_mock.assert_not_called()
         self.locker_checkin_mock.assert_not_called()
         self.git_remote_push_mock.assert_not_called()
         self.shutil_rmtree_mock.assert_not_called()
@@ -95,8 +111,8 @@ class TestPruneCLI(unittest.TestCase):
         )
         self.git_repo_clone_from_mock.assert_not_called()
         self.locker_init_config_mock.assert_not_called()
-        self.locker_get_evidence_mock.assert_not_called()
-        self.prune_locker_remove_evidence_mock.assert_not_called()
+        self.prune_locker_get_evidence_descriptor_mock.assert_not_called()
+        self.prune_locker_remove_evidences_mock.assert_not_called()
         self.locker_checkin_mock.assert_not_called()
         self.git_remote_push_mock.assert_not_called()
         self.shutil_rmtree_mock.assert_not_called()
@@ -114,12 +130,259 @@ class TestPruneCLI(unittest.TestCase):
         )
         self.git_repo_clone_from_mock.assert_not_called()
         self.locker_init_config_mock.assert_not_called()
-        self.locker_get_evidence_mock.assert_not_called()
-        self.prune_locker_remove_evidence_mock.assert_not_called()
+        self.prune_locker_get_evidence_descriptor_mock.assert_not_called()
+        self.prune_locker_remove_evidences_mock.assert_not_called()
         self.locker_checkin_mock.assert_not_called()
         self.git_remote_push_mock.assert_not_called()
         self.shutil_rmtree_mock.assert_not_called()
 
+    def test_cache_dir_clone_mode_validation(self):
+        """Ensures processing stops when a cache is used with a partial clone."""
+        self.prune.run(
+            self.push_remote
+            + [
+                "--config",
+                json.dumps({"foo": "bar"}),
+                "--cache-dir",
+                "foo/cache",
+                "--clone-mode",
+                "blobless",
+            ]
+        )
+        self.git_repo_clone_from_mock.assert_not_called()
+        self.locker_init_config_mock.assert_not_called()
+        self.shutil_rmtree_mock.assert_not_called()
+
+    def test_sparse_clone_selector_validation(self):
+        """Ensures processing stops when a sparse clone has no folder to use."""
+        config = {"re:raw/foo/.+": "A good reason"}
+        self.prune.run(
+            self.dry_run + ["--config", json.dumps(config), "--clone-mode", "sparse"]
+        )
+        self.git_repo_clone_from_mock.assert_not_called()
+        self.shutil_rmtree_mock.assert_not_called()
+
+    @patch("prune.locker.PruneLocker.get_evidence_index")
+    def test_dry_run_selectors(self, mock_get_evidence_index):
+        """Ensures selectors are expanded into evidence paths."""
+        mock_get_evidence_index.return_value.expand.return_value = {
+            "raw/foo/bar.json": "A good reason"
+        }
+        config = {"raw/foo/*.json": "A good reason"}
+        self.prune.run(self.dry_run + ["--config", json.dumps(config)])
+        mock_get_evidence_index.return_value.expand.assert_called_once_with(config)
+        self.prune_locker_get_evidence_descriptor_mock.assert_called_once_with(
+            "raw/foo/bar.json", {}
+        )
+        self.prune_locker_remove_evidences_mock.assert_called_once_with(
+            [(self.evidence, "A good reason")], "finkel"
+        )
+
+    @patch("prune.locker.PruneLocker.resolve_evidences")
+    @patch("prune.cli.Command.out")
+    def test_dry_run_reports_removed_evidence(self, mock_out, mock_resolve):
+        """Ensures only evidence actually removed is reported."""
+        mock_resolve.return_value = [(self.evidence, "A good reason")]
+        config = {"raw/foo/bar.json": "A good reason", "raw/foo/baz.json": "Done"}
+        self.prune.run(self.dry_run + ["--config", json.dumps(config)])
+        removed = [
+            c.args[0] for c in mock_out.call_args_list if "removed by" in c.args[0]
+        ]
+        self.assertEqual(
+            removed,
+            ["\nEvidence raw/foo/bar.json removed by finkel, tombstone applied..."],
+        )
+
+    def test_selector_validation(self):
+        """Ensures processing stops when a selector is malformed."""
+        for key in ["re:raw/foo/(", "stale:soon:raw/foo/*", "keep:10"]:
+            config = {key: "A good reason"}
+            result = self.prune.run(self.dry_run + ["--config", json.dumps(config)])
+            self.assertTrue(result.startswith(f"ERROR: Selector {key} "))
+        self.git_repo_clone_from_mock.assert_not_called()
+        self.prune_locker_remove_evidences_mock.assert_not_called()
+
+    def test_config_file_errors(self):
+        """Ensures an unreadable configuration file is reported as an error."""
+        with tempfile.TemporaryDirectory() as tmp:
+            Path(tmp, "bad.json").write_text("{")
+            for config_file in [f"{tmp}/missing.json", f"{tmp}/bad.json"]:
+                result = self.prune.run(self.dry_run + ["--config-file", config_file])
+                self.assertTrue(result.startswith("ERROR: "))
+        self.git_repo_clone_from_mock.assert_not_called()
+
+    def test_dry_run_lockers_file_config_error(self):
+        """Ensures a missing locker configuration only fails that locker."""
+        with tempfile.TemporaryDirectory() as tmp:
+            lockers = {
+                "https://github.com/foo/bar": {"raw/foo/bar.json": "A good reason"},
+                "https://github.com/foo/baz": f"{tmp}/missing.json",
+            }
+            Path(tmp, "lockers.json").write_text(json.dumps(lockers))
+            result = self.prune.run(
+                [
+                    "dry-run",
+                    "--creds",
+                    "./test/fixtures/faux_creds.ini",
+                    "--lockers-file",
+                    f"{tmp}/lockers.json",
+                ]
+            )
+        self.assertEqual(result, 1)
+        self.assertEqual(self.git_repo_clone_from_mock.call_count, 1)
+        self.assertEqual(
+            self.prune_locker_remove_evidences_mock.call_args_list,
+            [call([(self.evidence, "A good reason")], "finkel")],
+        )
+
+    def test_locker_and_lockers_file_validation(self):
+        """Ensures processing stops when both a locker and lockers are provided."""
+        self.prune.run(
+            self.push_remote + ["--lockers-file", "./test/fixtures/faux_lockers.json"]
+        )
+        self.prune.run(["push-remote", "--config", json.dumps({"foo": "bar"})])
+        self.git_repo_clone_from_mock.assert_not_called()
+        self.shutil_rmtree_mock.assert_not_called()
+
+    def test_dry_run_lockers_file(self):
+        """Ensures every locker in a lockers file is pruned separately."""
+        self.prune.run(
+            [
+                "dry-run",
+                "--creds",
+                "./test/fixtures/faux_creds.ini",
+                "--lockers-file",
+                "./test/fixtures/faux_lockers.json",
+            ]
+        )
+        bar_path = f"{tempfile.gettempdir()}/{get_locker_name(self.dry_run[1])}"
+        baz_path = (
+            f"{tempfile.gettempdir()}/{get_locker_name('https://github.com/foo/baz')}"
+        )
+        self.assertNotEqual(bar_path, baz_path)
+        self.assertCountEqual(
+            self.git_repo_clone_from_mock.call_args_list,
+            [
+                call(
+                    "https://1a2b3c4d5e6f7g8h9i0@github.com/foo/bar",
+                    bar_path,
+                    single_branch=True,
+                    branch="master",
+                ),
+                call(
+                    "https://1a2b3c4d5e6f7g8h9i0@github.com/foo/baz",
+                    baz_path,
+                    single_branch=True,
+                    branch="master",
+                ),
+            ],
+        )
+        self.assertEqual(
+            self.prune_locker_remove_evidences_mock.call_args_list,
+            [call([(self.evidence, "A good reason")], "finkel")] * 2,
+        )
+        self.git_remote_push_mock.assert_not_called()
+        self.assertCountEqual(
+            self.shutil_rmtree_mock.call_args_list, [call(bar_path), call(baz_path)]
+        )
+
+    def test_dry_run_lockers_file_pipeline(self):
+        """Ensures every locker in a lockers file is pruned in a pipeline."""
+        self.prune.run(
+            [
+                "dry-run",
+                "--creds",
+                "./test/fixtures/faux_creds.ini",
+                "--lockers-file",
+                "./test/fixtures/faux_lockers.json",
+                "--pipeline",
+                "--clone-limit",
+                "1",
+            ]
+        )
+        bar_path = f"{tempfile.gettempdir()}/{get_locker_name(self.dry_run[1])}"
+        baz_path = (
+            f"{tempfile.gettempdir()}/{get_locker_name('https://github.com/foo/baz')}"
+        )
+        self.assertEqual(self.git_repo_clone_from_mock.call_count, 2)
+        self.assertEqual(
+            self.prune_locker_remove_evidences_mock.call_args_list,
+            [call([(self.evidence, "A good reason")], "finkel")] * 2,
+        )
+        self.assertEqual(self.locker_checkin_mock.call_count, 2)
+        self.git_remote_push_mock.assert_not_called()
+        self.assertCountEqual(
+            self.shutil_rmtree_mock.call_args_list, [call(bar_path), call(baz_path)]
+        )
+
+    def test_dry_run_lockers_file_pipeline_failure(self):
+        """Ensures a locker that failed to prune is not cleaned up."""
+        self.prune_locker_remove_evidences_mock.side_effect = [
+            RuntimeError("meh"),
+            None,
+        ]
+        result = self.prune.run(
+            [
+                "dry-run",
+                "--creds",
+                "./test/fixtures/faux_creds.ini",
+                "--lockers-file",
+                "./test/fixtures/faux_lockers.json",
+                "--pipeline",
+                "--clone-limit",
+                "1",
+                "--prune-limit",
+                "1",
+            ]
+        )
+        baz_path = (
+            f"{tempfile.gettempdir()}/{get_locker_name('https://github.com/foo/baz')}"
+        )
+        self.assertEqual(result, 1)
+        self.assertEqual(self.shutil_rmtree_mock.call_args_list, [call(baz_path)])
+
+    def test_pipeline_validation(self):
+        """Ensures processing stops when pipeline options are invalid."""
+        for options in [
+            ["--config", json.dumps({"foo": "bar"}), "--pipeline"],
+            ["--config", json.dumps({"foo": "bar"}), "--push-limit", "0"],
+        ]:
+            self.prune.run(self.push_remote + options)
+        self.git_repo_clone_from_mock.assert_not_called()
+        self.prune_locker_remove_evidences_mock.assert_not_called()
+
+    def test_profile_validation(self):
+        """Ensures processing stops when profiling threads that are not main."""
+        for options in [
+            ["--lockers-file", "./test/fixtures/faux_lockers.json"],
+            ["--config", json.dumps({"foo": "bar"}), "--workers", "2"],
+        ]:
+            self.prune.run(self.push_remote + options + ["--profile", "prune.prof"])
+        self.git_repo_clone_from_mock.assert_not_called()
+        self.prune_locker_remove_evidences_mock.assert_not_called()
+        self.assertFalse(os.path.exists("prune.prof"))
+
+    @patch("prune.cli.Trash.move")
+    def test_dry_run_cleanup_defer(self, mock_move):
+        """Ensures local lockers are moved to the trash rather than deleted."""
+        config = {"raw/foo/bar.json": "A good reason"}
+        self.prune.run(
+            self.dry_run + ["--config", json.dumps(config), "--cleanup", "defer"]
+        )
+        mock_move.assert_called_once_with(f"{tempfile.gettempdir()}/prune")
+        self.shutil_rmtree_mock.assert_not_called()
+
+    @patch("prune.cli.Trash.wait")
+    @patch("prune.cli.Trash.move")
+    def test_dry_run_cleanup_background(self, mock_move, mock_wait):
+        """Ensures the run waits for the trash to be emptied before exiting."""
+        config = {"raw/foo/bar.json": "A good reason"}
+        self.prune.run(
+            self.dry_run + ["--config", json.dumps(config), "--cleanup", "background"]
+        )
+        mock_move.assert_called_once_with(f"{tempfile.gettempdir()}/prune")
+        mock_wait.assert_called_once_with()
+
     def test_dry_run_config(self):
         """Ensures dry-run mode works when config JSON is provided."""
         config = {"raw/foo/bar.json": "A good reason"}
@@ -131,11 +394,11 @@ class TestPruneCLI(unittest.TestCase):
             branch="master",
         )
         self.locker_init_config_mock.assert_called_once_with()
-        self.locker_get_evidence_mock.assert_called_once_with(
-            "raw/foo/bar.json", ignore_ttl=True
+        self.prune_locker_get_evidence_descriptor_mock.assert_called_once_with(
+            "raw/foo/bar.json", {}
         )
-        self.prune_locker_remove_evidence_mock.assert_called_once_with(
-            "Remove me!!", "A good reason", "finkel"
+        self.prune_locker_remove_evidences_mock.assert_called_once_with(
+            [(self.evidence, "A good reason")], "finkel"
         )
         self.git_remote_push_mock.assert_not_called()
         self.shutil_rmtree_mock.assert_called_once_with(
@@ -153,17 +416,108 @@ class TestPruneCLI(unittest.TestCase):
             branch="master",
         )
         self.locker_init_config_mock.assert_called_once_with()
-        self.locker_get_evidence_mock.assert_called_once_with(
-            "raw/foo/bar.json", ignore_ttl=True
+        self.prune_locker_get_evidence_descriptor_mock.assert_called_once_with(
+            "raw/foo/bar.json", {}
         )
-        self.prune_locker_remove_evidence_mock.assert_called_once_with(
-            "Remove me!!", "A good reason", "finkel"
+        self.prune_locker_remove_evidences_mock.assert_called_once_with(
+            [(self.evidence, "A good reason")], "finkel"
         )
         self.git_remote_push_mock.assert_not_called()
         self.shutil_rmtree_mock.assert_called_once_with(
             f"{tempfile.gettempdir()}/prune"
         )
 
+    def test_dry_run_streaming_config_file(self):
+        """Ensures a streaming manifest is processed in chunks."""
+        config_file = "./test/fixtures/faux_config.jsonl"
+        self.prune.run(
+            self.dry_run + ["--config-file", config_file, "--chunk-size", "1"]
+        )
+        self.assertEqual(
+            self.prune_locker_get_evidence_descriptor_mock.call_args_list,
+            [
+                call("raw/foo/bar.json", {}),
+                call("raw/foo/baz.json", {}),
+            ],
+        )
+        self.assertEqual(
+            self.prune_locker_remove_evidences_mock.call_args_list,
+            [
+                call([(self.evidence, "A good reason")], "finkel"),
+                call([(self.evidence, "Another good reason")], "finkel"),
+            ],
+        )
+        self.git_remote_push_mock.assert_not_called()
+
+    @patch("prune.locker.PruneLocker.checkpoint")
+    def test_dry_run_checkpoints(self, mock_checkpoint):
+        """Ensures checkpoints are checked after each checkpoint sized chunk."""
+        config_file = "./test/fixtures/faux_config.jsonl"
+        self.prune.run(
+            self.dry_run
+            + ["--config-file", config_file, "--checkpoint-items", "1", "--resume"]
+        )
+        self.assertEqual(self.prune_locker_remove_evidences_mock.call_count, 2)
+        self.assertEqual(mock_checkpoint.call_count, 2)
+        self.git_remote_push_mock.assert_not_called()
+
+    def test_checkpoint_validation(self):
+        """Ensures processing stops when checkpoint options are invalid."""
+        for options in [
+            ["--checkpoint-items", "0"],
+            ["--checkpoint-seconds", "-1"],
+            ["--checkpoint-push"],
+        ]:
+            self.prune.run(
+                self.push_remote + ["--config", json.dumps({"foo": "bar"})] + options
+            )
+        self.git_repo_clone_from_mock.assert_not_called()
+        self.prune_locker_remove_evidences_mock.assert_not_called()
+        self.git_remote_push_mock.assert_not_called()
+
+    def test_archive_validation(self):
+        """Ensures processing stops when archive, bare or push options are invalid."""
+        for options in [
+            ["--archive-dir", "archive", "--clone-mode", "shallow"],
+            ["--archive-dir", "archive", "--cache-dir", "cache"],
+            ["--archive-dir", "archive", "--resume"],
+            ["--archive-days", "-1"],
+            ["--archive-dir", "archive", "--bare"],
+            ["--bare", "--clone-mode", "sparse"],
+            ["--push-retries", "-1"],
+        ]:
+            self.prune.run(
+                self.push_remote + ["--config", json.dumps({"foo": "bar"})] + options
+            )
+        self.git_repo_clone_from_mock.assert_not_called()
+        self.prune_locker_remove_evidences_mock.assert_not_called()
+        self.git_remote_push_mock.assert_not_called()
+
+    def test_dry_run_timings_and_profile(self):
+        """Ensures phase timings and profile statistics are written."""
+        config = {"raw/foo/bar.json": "A good reason"}
+        with tempfile.TemporaryDirectory() as tmp:
+            self.prune.run(
+                self.dry_run
+                + [
+                    "--config",
+                    json.dumps(config),
+                    "--timings",
+                    "--timings-file",
+                    f"{tmp}/timings.json",
+                    "--profile",
+                    f"{tmp}/prune.prof",
+                ]
+            )
+            with open(f"{tmp}/timings.json") as f:
+                timings = json.loads(f.read())
+            self.assertTrue(os.path.isfile(f"{tmp}/prune.prof"))
+        phases = timings["https://github.com/foo/bar"]["phases"]
+        self.assertEqual(
+            set(phases.keys()), {"clone", "resolve", "checkin", "push", "cleanup"}
+        )
+        self.assertEqual(phases["resolve"]["count"], 1)
+
     def test_dry_run_git_config(self):
         """Ensures dry-run mode works when a git config is provided."""
         config = {"raw/foo/bar.json": "A good reason"}
@@ -182,11 +536,11 @@ class TestPruneCLI(unittest.TestCase):
             branch="master",
         )
         self.locker_init_config_mock.assert_called_once_with()
-        self.locker_get_evidence_mock.assert_called_once_with(
-            "raw/foo/bar.json", ignore_ttl=True
+        self.prune_locker_get_evidence_descriptor_mock.assert_called_once_with(
+            "raw/foo/bar.json", {}
         )
-        self.prune_locker_remove_evidence_mock.assert_called_once_with(
-            "Remove me!!", "A good reason", "finkel"
+        self.prune_locker_remove_evidences_mock.assert_called_once_with(
+            [(self.evidence, "A good reason")], "finkel"
         )
         self.git_remote_push_mock.assert_not_called()
         self.shutil_rmtree_mock.assert_called_once_with(
@@ -212,17 +566,29 @@ class TestPruneCLI(unittest.TestCase):
             branch="master",
         )
         self.locker_init_config_mock.assert_called_once_with()
-        self.locker_get_evidence_mock.assert_called_once_with(
-            "raw/foo/bar.json", ignore_ttl=True
+        self.prune_locker_get_evidence_descriptor_mock.assert_called_once_with(
+            "raw/foo/bar.json", {}
         )
-        self.prune_locker_remove_evidence_mock.assert_called_once_with(
-            "Remove me!!", "A good reason", "finkel"
+        self.prune_locker_remove_evidences_mock.assert_called_once_with(
+            [(self.evidence, "A good reason")], "finkel"
         )
         self.git_remote_push_mock.assert_not_called()
         self.shutil_rmtree_mock.assert_called_once_with(
             f"{tempfile.gettempdir()}/prune"
         )
 
+    @patch("prune.cli.Command.out")
+    @patch("prune.locker.PruneLocker.push", autospec=True)
+    def test_push_remote_reports_kept_evidence(self, mock_push, mock_out):
+        """Ensures evidence updated remotely and kept on push is reported."""
+        mock_push.side_effect = lambda locker: locker.kept.append("raw/foo/bar.json")
+        config = {"raw/foo/bar.json": "A good reason"}
+        self.prune.run(self.push_remote + ["--config", json.dumps(config)])
+        mock_push.assert_called_once()
+        mock_out.assert_any_call(
+            "\nEvidence raw/foo/bar.json updated remotely, kept rather than pruned"
+        )
+
     def test_push_remote(self):
         """
         Ensures push-remote mode works as expected.
@@ -239,11 +605,11 @@ class TestPruneCLI(unittest.TestCase):
             branch="master",
         )
         self.locker_init_config_mock.assert_called_once_with()
-        self.locker_get_evidence_mock.assert_called_once_with(
-            "raw/foo/bar.json", ignore_ttl=True
+        self.prune_locker_get_evidence_descriptor_mock.assert_called_once_with(
+            "raw/foo/bar.json", {}
         )
-        self.prune_locker_remove_evidence_mock.assert_called_once_with(
-            "Remove me!!", "A good reason", "finkel"
+        self.prune_locker_remove_evidences_mock.assert_called_once_with(
+            [(self.evidence, "A good reason")], "finkel"
         )
         self.git_remote_push_mock.assert_called_once_with(
             "master", force=False, set_upstream=True
@@ -251,3 +617,236 @@ class TestPruneCLI(unittest.TestCase):
         self.shutil_rmtree_mock.assert_called_once_with(
             f"{tempfile.gettempdir()}/prune"
         )
+
+    def test_dry_run_blobless_clone(self):
+        """Ensures blobless mode only checks out the evidence folders."""
+        config = {"raw/foo/bar.json": "A good reason"}
+        self.prune.run(
+            self.dry_run + ["--config", json.dumps(config), "--clone-mode", "blobless"]
+        )
+        self.git_repo_clone_from_mock.assert_called_once_with(
+            "https://1a2b3c4d5e6f7g8h9i0@github.com/foo/bar",
+            f"{tempfile.gettempdir()}/prune",
+            single_branch=True,
+            branch="master",
+            sparse=True,
+            filter="blob:none",
+        )
+        repo_mock = self.git_repo_clone_from_mock.return_value
+        repo_mock.git.sparse_checkout.assert_called_once_with("set", "raw/foo")
+        self.prune_locker_remove_evidences_mock.assert_called_once_with(
+            [(self.evidence, "A good reason")], "finkel"
+        )
+        self.git_remote_push_mock.assert_not_called()
+
+    def test_dry_run_shallow_clone(self):
+        """Ensures shallow mode clones only the most recent commit."""
+        config = {"raw/foo/bar.json": "A good reason"}
+        self.prune.run(
+            self.dry_run + ["--config", json.dumps(config), "--clone-mode", "shallow"]
+        )
+        self.git_repo_clone_from_mock.assert_called_once_with(
+            "https://1a2b3c4d5e6f7g8h9i0@github.com/foo/bar",
+            f"{tempfile.gettempdir()}/prune",
+            single_branch=True,
+            branch="master",
+            depth=1,
+        )
+
+    def test_report_validation(self):
+        """Ensures a report is only planned by a dry-run of a full clone."""
+        config = ["--config", json.dumps({"foo": "bar"}), "--report", "foo.json"]
+        self.assertEqual(
+            self.prune.run(self.push_remote + config),
+            "ERROR: --report is only available in dry-run mode.",
+        )
+        self.assertEqual(
+            self.prune.run(self.dry_run + config + ["--clone-mode", "sparse"]),
+            "ERROR: --report cannot be used with sparse clones.",
+        )
+        self.git_repo_clone_from_mock.assert_not_called()
+
+    @patch("prune.plan.PrunePlan")
+    def test_dry_run_report(self, mock_plan):
+        """Ensures a dry-run report is planned without a checkout."""
+        report = {
+            "summary": {"evidence": 1, "files": 1, "bytes": 2, "index_files": 1},
+            "evidence": [],
+            "index_files": {},
+            "errors": [],
+        }
+        mock_plan.return_value.get_report.return_value = report
+        mock_plan.return_value.errors = []
+        config = {"raw/foo/bar.json": "A good reason"}
+        with tempfile.TemporaryDirectory() as tmp:
+            self.prune.run(
+                self.dry_run
+                + ["--config", json.dumps(config), "--report", f"{tmp}/report.json"]
+            )
+            with open(f"{tmp}/report.json") as f:
+                self.assertEqual(json.loads(f.read()), report)
+        self.assertTrue(self.git_repo_clone_from_mock.call_args[1]["no_checkout"])
+        mock_plan.return_value.add.assert_called_once_with(config, "finkel")
+        self.prune_locker_remove_evidences_mock.assert_not_called()
+        self.locker_checkin_mock.assert_not_called()
+        self.git_remote_push_mock.assert_not_called()
+
+    def test_scan_validation(self):
+        """Ensures a scan needs either a locker url or a local path."""
+        self.assertEqual(
+            self.prune.run(["scan"]),
+            "ERROR: Provide either a locker url or a --local-path.",
+        )
+        self.assertEqual(
+            self.prune.run(["scan", "--local-path", "foo", "--threshold-days", "-1"]),
+            "ERROR: --threshold-days must not be negative.",
+        )
+        self.git_repo_clone_from_mock.assert_not_called()
+
+    @patch("prune.scan.LockerScan")
+    def test_scan_local_path(self, mock_scan):
+        """Ensures abandoned evidence is written as a prune configuration."""
+        scan = mock_scan.return_value.scan.return_value
+        scan.get_abandoned.return_value = iter([("raw/foo/bar.json", "Meh")])
+        scan.orphans = []
+        scan.missing = []
+        with tempfile.TemporaryDirectory() as tmp:
+            output = f"{tmp}/scan.jsonl"
+            self.prune.run(
+                ["scan", "--local-path", tmp, "--workers", "2", "--output", output]
+            )
+            with open(output) as f:
+                self.assertEqual(
+                    json.loads(f.read()), {"path": "raw/foo/bar.json", "reason": "Meh"}
+                )
+        mock_scan.assert_called_once_with(tmp, 30 * 24 * 60 * 60, 2)
+        self.git_repo_clone_from_mock.assert_not_called()
+
+    @patch("prune.scan.LockerScan")
+    def test_scan_locker(self, mock_scan):
+        """Ensures a locker is cloned, scanned and removed."""
+        scan = mock_scan.return_value.scan.return_value
+        scan.get_abandoned.return_value = iter([])
+        scan.orphans = ["raw/foo/stray.json"]
+        scan.missing = []
+        self.prune.run(
+            ["scan", "https://github.com/foo/bar", "--creds"]
+            + ["./test/fixtures/faux_creds.ini"]
+        )
+        local_path = (
+            f"{tempfile.gettempdir()}/{get_locker_name('https://github.com/foo/bar')}"
+            "-scan"
+        )
+        self.git_repo_clone_from_mock.assert_called_once()
+        mock_scan.assert_called_once_with(local_path, 30 * 24 * 60 * 60, 1)
+        self.shutil_rmtree_mock.assert_called_with(local_path)
+        self.git_remote_push_mock.assert_not_called()
+
+    def test_tombstone_validation(self):
+        """Ensures tombstone options and commands are validated."""
+        self.assertEqual(
+            self.prune.run(
+                self.dry_run
+                + ["--config", json.dumps({"foo": "bar"}), "--tombstone-db", "t.db"]
+            ),
+            "ERROR: --tombstone-db is only available in push-remote mode.",
+        )
+        self.assertEqual(
+            self.prune.run(["lookup", "--evidence", "raw/foo/bar.json"]),
+            "ERROR: Provide either a locker url or a --local-path.",
+        )
+        self.git_repo_clone_from_mock.assert_not_called()
+
+    @patch("prune.recovery.TombstoneIndex")
+    def test_push_remote_tombstone_db(self, mock_index):
+        """Ensures the tombstone index is updated after pushing."""
+        config = {"raw/foo/bar.json": "A good reason"}
+        self.prune.run(
+            self.push_remote
+            + ["--config", json.dumps(config), "--tombstone-db", "t.db"]
+        )
+        mock_index.assert_called_once_with("t.db")
+        mock_index.return_value.update.assert_called_once_with(
+            "https://github.com/foo/bar", self.git_repo_clone_from_mock.return_value
+        )
+        mock_index.return_value.close.assert_called_once_with()
+
+    @patch("prune.recovery.TombstoneIndex")
+    def test_lookup_locker(self, mock_index):
+        """Ensures a locker is cloned without a checkout to look up evidence."""
+        mock_index.return_value.update.return_value = 1
+        mock_index.return_value.lookup.return_value = []
+        self.assertEqual(
+            self.prune.run(
+                ["lookup", "https://github.com/foo/bar", "--evidence"]
+                + ["raw/foo/bar.json", "--creds", "./test/fixtures/faux_creds.ini"]
+            ),
+            1,
+        )
+        local_path = (
+            f"{tempfile.gettempdir()}/{get_locker_name('https://github.com/foo/bar')}"
+            "-lookup"
+        )
+        self.assertTrue(self.git_repo_clone_from_mock.call_args[1]["no_checkout"])
+        mock_index.assert_called_once_with("~/.prune/tombstones.db")
+        mock_index.return_value.lookup.assert_called_once_with(
+            "https://github.com/foo/bar", "raw/foo/bar.json"
+        )
+        self.shutil_rmtree_mock.assert_called_with(local_path)
+        self.git_remote_push_mock.assert_not_called()
+
+    @patch("prune.recovery.recover_evidence")
+    @patch("prune.recovery.TombstoneIndex")
+    @patch("git.Repo")
+    def test_recover_local_path(self, mock_repo, mock_index, mock_recover):
+        """Ensures the most recent copy of each evidence file is recovered."""
+        tombstones = [
+            {"file": "raw/foo/bar.json", "eol": "2022"},
+            {"file": "raw/foo/bar.json", "eol": "2021"},
+        ]
+        mock_index.return_value.lookup.return_value = tombstones
+        mock_recover.return_value = [("out/raw/foo/bar.json", None)]
+        with tempfile.TemporaryDirectory() as tmp:
+            self.prune.run(
+                ["recover", "--local-path", tmp, "--evidence", "raw/foo/bar.json"]
+                + ["--output-dir", "out"]
+            )
+            mock_index.return_value.update.assert_called_once_with(
+                tmp, mock_repo.return_value
+            )
+        self.assertEqual(list(mock_recover.call_args[0][1]), tombstones[:1])
+        self.assertEqual(mock_recover.call_args[0][2], "out")
+        self.git_repo_clone_from_mock.assert_not_called()
+
+
+class TestPruneCLIImports(unittest.TestCase):
+    """Test the modules imported by fast CLI paths."""
+
+    def _get_imports(self, *cli_args):
+        # The arguments are this interpreter and the fixed CLI arguments below
+        result = subprocess.run(  # nosec
+            [sys.executable, "-X", "importtime", "-m", "prune.cli", *cli_args],
+            capture_output=True,
+            text=True,
+        )
+        return {
+            line.rsplit("|", 1)[1].strip()
+            for line in result.stderr.splitlines()
+            if line.startswith("import time:")
+        }
+
+    def test_fast_paths_skip_heavy_imports(self):
+        """Ensures version, help and validation skip the framework imports."""
+        for cli_args in [
+            ["--version"],
+            ["dry-run", "-h"],
+            ["dry-run", "https://github.com/foo/bar"],
+            ["scan"],
+        ]:
+            imports = self._get_imports(*cli_args)
+            self.assertIn("ilcli", imports)
+            for module in HEAVY_MODULES:
+                self.assertNotIn(module, imports, cli_args)
+        with tempfile.TemporaryDirectory() as tmp:
+            imports = self._get_imports("scan", "--local-path", tmp)
+        self.assertIn("compliance.locker", imports)
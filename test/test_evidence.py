@@ -0,0 +1,51 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune evidence descriptor tests."""
+
+import unittest
+
+from prune.evidence import EvidenceDescriptor
+
+
+class TestEvidenceDescriptor(unittest.TestCase):
+    """Test EvidenceDescriptor."""
+
+    def test_unpartitioned(self):
+        """Ensures unpartitioned evidence is described by its path."""
+        evidence = EvidenceDescriptor(
+            "raw/bar/foo.json",
+            {"description": "Foo", "last_update": "now", "ttl": 86400},
+        )
+        self.assertEqual(evidence.name, "foo.json")
+        self.assertEqual(evidence.dir_path, "raw/bar")
+        self.assertEqual(evidence.description, "Foo")
+        self.assertEqual(evidence.ttl, 86400)
+        self.assertFalse(evidence.is_partitioned)
+        self.assertEqual(evidence.files, ["raw/bar/foo.json"])
+
+    def test_partitioned(self):
+        """Ensures partitioned evidence is described by its partition files."""
+        metadata = {
+            "description": "Foo",
+            "last_update": "now",
+            "ttl": 86400,
+            "partition_fields": ["region"],
+            "partition_root": "regions",
+            "partitions": {"part-1": ["us"]},
+        }
+        evidence = EvidenceDescriptor("raw/bar/foo.json", metadata)
+        self.assertTrue(evidence.is_partitioned)
+        self.assertEqual(evidence.part_root, "regions")
+        self.assertEqual(evidence.files, ["raw/bar/part-1_foo.json"])
+        self.assertFalse(EvidenceDescriptor("raw/bar/foo.txt", metadata).is_partitioned)
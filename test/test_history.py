@@ -0,0 +1,71 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune history tests."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import git
+
+from prune.history import get_last_commits
+
+
+class TestGetLastCommits(unittest.TestCase):
+    """Test the single pass last commit lookup."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.repo = git.Repo.init(self.tmp.name)
+        with self.repo.config_writer() as cw:
+            cw.set_value("user", "email", "finkel@example.com")
+            cw.set_value("user", "name", "finkel")
+        self.shas = {}
+        for name in ["foo.json", "bar.json", "foo.json"]:
+            path = Path(self.tmp.name, "raw", "bar", name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"{len(self.shas)} {name}")
+            self.repo.index.add([str(path)])
+            self.shas[name] = self.repo.index.commit(f"Add {name}").hexsha
+
+    def tearDown(self):
+        """Cleanup supporting test objects after each test."""
+        self.repo.close()
+        self.tmp.cleanup()
+
+    def test_last_commits(self):
+        """Ensures the most recent commit is provided for each path."""
+        self.assertEqual(
+            get_last_commits(
+                self.repo, ["raw/bar/foo.json", "raw/bar/bar.json", "raw/bar/baz.json"]
+            ),
+            {
+                "raw/bar/foo.json": self.shas["foo.json"],
+                "raw/bar/bar.json": self.shas["bar.json"],
+            },
+        )
+
+    def test_no_paths(self):
+        """Ensures history is not walked when no paths are provided."""
+        self.assertEqual(get_last_commits(NoGitRepo(), []), {})
+
+
+class NoGitRepo(object):
+    """A repository stand-in that fails if git is invoked."""
+
+    @property
+    def git(self):
+        """Fail when the git command wrapper is used."""
+        raise AssertionError("git should not be invoked")
@@ -0,0 +1,107 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune index file helper tests."""
+
+import json
+import unittest
+
+from compliance.utils.data_parse import format_json
+
+from prune.index import (
+    format_index,
+    get_evidence_folder,
+    get_tombstones_file,
+    move_tombstones,
+)
+
+
+class TestIndex(unittest.TestCase):
+    """Test the index file helpers."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        self.metadata = {
+            "bar.json": {
+                "description": "Bar,\nevidence",
+                "last_update": "2021-01-01T00:00:00.000000",
+                "ttl": 86400,
+            },
+            "baz.json": {"description": "Baz", "tombstones": {"baz.json": []}},
+            "foo.json": {
+                "description": "Foo évidence",
+                "last_update": "2021-01-01T00:00:00.000000",
+                "partitions": {"aaa": ["us"], "bbb": [{"eu": None}]},
+            },
+        }
+        self.text = format_json(self.metadata)
+
+    def test_format_index(self):
+        """Ensures only changed entries are serialized in the canonical format."""
+        self.assertEqual(format_index(self.metadata, self.text), self.text)
+        metadata = json.loads(self.text)
+        del metadata["bar.json"]
+        metadata["foo.json"] = {"description": "Foo", "tombstones": {"foo.json": []}}
+        metadata["new.json"] = {"description": "New"}
+        self.assertEqual(
+            format_index(metadata, self.text, ["bar.json", "foo.json"]),
+            format_json(metadata),
+        )
+        # Unchanged entries are reused from the current content as is
+        self.assertIn(
+            '"description": "Stale"',
+            format_index(
+                self.metadata, self.text.replace('"Baz"', '"Stale"'), ["bar.json"]
+            ),
+        )
+        self.assertEqual(format_index({}, self.text), "{}")
+
+    def test_format_index_not_canonical(self):
+        """Ensures content not in the canonical format is fully serialized."""
+        for text in [None, "", "{}", json.dumps(self.metadata)]:
+            self.assertEqual(format_index(self.metadata, text), self.text)
+
+    def test_get_tombstones_file(self):
+        """Ensures the tombstones file sits where it is not taken for evidence."""
+        self.assertEqual(
+            get_tombstones_file("locker/raw/foo/index.json", "locker"),
+            "locker/notifications/prune/tombstones/raw/foo/tombstones.json",
+        )
+        self.assertEqual(
+            get_tombstones_file("raw/foo/index.json"),
+            "notifications/prune/tombstones/raw/foo/tombstones.json",
+        )
+        self.assertEqual(
+            str(get_evidence_folder(get_tombstones_file("raw/foo/index.json"))),
+            "raw/foo",
+        )
+        self.assertEqual(str(get_evidence_folder("raw/foo/index.json")), "raw/foo")
+
+    def test_move_tombstones(self):
+        """Ensures pruned entries are moved and merged into tombstones."""
+        tombstones = {
+            "baz.json": {
+                "description": "Baz",
+                "tombstones": {"baz.json": [{"eol": "2020"}]},
+            }
+        }
+        self.metadata["baz.json"]["tombstones"]["baz.json"] = [
+            {"eol": "2020"},
+            {"eol": "2021"},
+        ]
+        move_tombstones(self.metadata, tombstones, ["baz.json"])
+        self.assertNotIn("baz.json", self.metadata)
+        self.assertEqual(
+            tombstones["baz.json"]["tombstones"],
+            {"baz.json": [{"eol": "2020"}, {"eol": "2021"}]},
+        )
@@ -0,0 +1,93 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune manifest tests."""
+
+import tempfile
+import types
+import unittest
+from pathlib import Path
+
+from prune.manifest import (
+    chunked,
+    is_streaming_manifest,
+    read_manifest,
+    write_manifest,
+)
+
+
+class TestManifest(unittest.TestCase):
+    """Test prune manifest readers."""
+
+    def test_is_streaming_manifest(self):
+        """Ensures JSON Lines and CSV manifests are streamed."""
+        self.assertTrue(is_streaming_manifest("foo/bar.jsonl"))
+        self.assertTrue(is_streaming_manifest("foo/bar.CSV"))
+        self.assertFalse(is_streaming_manifest("foo/bar.json"))
+
+    def test_read_json(self):
+        """Ensures a JSON configuration file is read."""
+        self.assertEqual(
+            list(read_manifest("./test/fixtures/faux_config.json")),
+            [("raw/foo/bar.json", "A good reason")],
+        )
+
+    def test_read_json_lines(self):
+        """Ensures a JSON Lines manifest is read one entry at a time."""
+        entries = read_manifest("./test/fixtures/faux_config.jsonl")
+        self.assertIsInstance(entries, types.GeneratorType)
+        self.assertEqual(
+            list(entries),
+            [
+                ("raw/foo/bar.json", "A good reason"),
+                ("raw/foo/baz.json", "Another good reason"),
+            ],
+        )
+
+    def test_read_csv(self):
+        """Ensures a CSV manifest is read and its header row skipped."""
+        self.assertEqual(
+            list(read_manifest("./test/fixtures/faux_config.csv")),
+            [
+                ("raw/foo/bar.json", "A good reason"),
+                ("raw/foo/baz.json", "Another, good reason"),
+            ],
+        )
+
+    def test_read_csv_missing_reason(self):
+        """Ensures a CSV manifest row without a reason is reported."""
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = str(Path(tmp, "config.csv"))
+            Path(manifest).write_text(
+                "path,reason\nraw/foo/bar.json,Meh\nraw/foo/baz.json\n"
+            )
+            with self.assertRaises(ValueError) as cm:
+                list(read_manifest(manifest))
+        self.assertEqual(
+            str(cm.exception),
+            f"Manifest {manifest} line 3 must hold a path and a reason",
+        )
+
+    def test_chunked(self):
+        """Ensures items are provided in bounded size lists."""
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(chunked([], 2)), [])
+
+    def test_write_manifest(self):
+        """Ensures written manifests can be read back in every format."""
+        entries = [("raw/foo/bar.json", "A good reason"), ("raw/foo/baz.json", "Meh")]
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ["config.json", "config.jsonl", "config.csv"]:
+                manifest = str(Path(tmp, name))
+                self.assertEqual(write_manifest(manifest, iter(entries)), 2)
+                self.assertEqual(list(read_manifest(manifest)), entries)
@@ -0,0 +1,77 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune index file merging tests."""
+
+import unittest
+
+from prune.merge import merge_index
+
+
+class TestMergeIndex(unittest.TestCase):
+    """Test the key by key index file merge."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        self.live = {"description": "Foo", "last_update": "2021", "ttl": 86400}
+        self.pruned = {
+            "description": "Foo",
+            "pruned_by": "finkel",
+            "tombstones": {"foo.json": [{"eol": "2022", "reason": "Old"}]},
+        }
+
+    def test_merge_one_sided_changes(self):
+        """Ensures changes made on one side only are all kept."""
+        base = {"foo.json": self.live, "bar.json": self.live, "baz.json": self.live}
+        upstream = {
+            "foo.json": self.live,
+            "bar.json": dict(self.live, last_update="2023"),
+            "qux.json": self.live,
+        }
+        local = {"foo.json": self.pruned, "bar.json": self.live, "baz.json": self.live}
+        merged, kept = merge_index(base, upstream, local)
+        self.assertEqual(
+            merged,
+            {
+                "foo.json": self.pruned,
+                "bar.json": dict(self.live, last_update="2023"),
+                "qux.json": self.live,
+            },
+        )
+        self.assertEqual(kept, [])
+
+    def test_merge_evidence_updated_upstream(self):
+        """Ensures evidence updated upstream wins over evidence pruned locally."""
+        updated = dict(self.live, last_update="2023")
+        merged, kept = merge_index(
+            {"foo.json": self.live}, {"foo.json": updated}, {"foo.json": self.pruned}
+        )
+        self.assertEqual(merged, {"foo.json": updated})
+        self.assertEqual(kept, ["foo.json"])
+
+    def test_merge_tombstones(self):
+        """Ensures tombstones added on both sides are all kept."""
+        upstream = {
+            "description": "Foo",
+            "pruned_by": "meh",
+            "tombstones": {"foo.json": [{"eol": "2022", "reason": "Other"}]},
+        }
+        merged, kept = merge_index(
+            {"foo.json": self.live}, {"foo.json": upstream}, {"foo.json": self.pruned}
+        )
+        self.assertEqual(merged["foo.json"]["pruned_by"], "finkel")
+        self.assertEqual(
+            merged["foo.json"]["tombstones"]["foo.json"],
+            [{"eol": "2022", "reason": "Other"}, {"eol": "2022", "reason": "Old"}],
+        )
+        self.assertEqual(kept, [])
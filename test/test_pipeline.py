@@ -0,0 +1,80 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune pipeline tests."""
+
+import time
+import unittest
+from threading import Lock
+
+from prune.pipeline import PrunePipeline, Stage
+
+
+class TestPrunePipeline(unittest.TestCase):
+    """Test PrunePipeline."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        self.lock = Lock()
+        self.running = {}
+        self.peaks = {}
+
+    def _get_stage(self, name, limit, fail=None, always=False):
+        def func(job):
+            with self.lock:
+                self.running[name] = self.running.get(name, 0) + 1
+                self.peaks[name] = max(self.peaks.get(name, 0), self.running[name])
+            time.sleep(0.01)
+            job.setdefault("stages", []).append(name)
+            with self.lock:
+                self.running[name] -= 1
+            if job["id"] == fail:
+                raise ValueError(f"{name} failed")
+
+        return Stage(name, func, limit, always)
+
+    def test_run(self):
+        """Ensures jobs go through every stage within the stage limits."""
+        pipeline = PrunePipeline(
+            [
+                self._get_stage("clone", 3),
+                self._get_stage("prune", 2),
+                self._get_stage("push", 1),
+            ]
+        )
+        jobs = pipeline.run({"id": n} for n in range(8))
+        self.assertCountEqual([job["id"] for job in jobs], range(8))
+        for job in jobs:
+            self.assertIsNone(job["error"])
+            self.assertEqual(job["stages"], ["clone", "prune", "push"])
+        self.assertLessEqual(self.peaks["clone"], 3)
+        self.assertLessEqual(self.peaks["prune"], 2)
+        self.assertEqual(self.peaks["push"], 1)
+        # Clones overlap with one another
+        self.assertGreater(self.peaks["clone"], 1)
+
+    def test_run_error(self):
+        """Ensures failed jobs skip the remaining stages except cleanup."""
+        pipeline = PrunePipeline(
+            [
+                self._get_stage("clone", 2),
+                self._get_stage("prune", 2, fail=1),
+                self._get_stage("push", 2),
+                self._get_stage("cleanup", 2, always=True),
+            ]
+        )
+        jobs = {job["id"]: job for job in pipeline.run({"id": n} for n in range(3))}
+        self.assertEqual(jobs[1]["error"], "ValueError: prune failed")
+        self.assertEqual(jobs[1]["stages"], ["clone", "prune", "cleanup"])
+        self.assertIsNone(jobs[0]["error"])
+        self.assertEqual(jobs[0]["stages"], ["clone", "prune", "push", "cleanup"])
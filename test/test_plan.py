@@ -0,0 +1,137 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune plan tests."""
+
+import json
+import logging
+import tempfile
+import unittest
+from pathlib import Path
+
+import git
+
+from prune.index import format_index
+from prune.locker import PruneLocker
+from prune.plan import PrunePlan, format_markdown
+
+
+class TestPrunePlan(unittest.TestCase):
+    """Test PrunePlan."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.repo = git.Repo.init(self.tmp.name)
+        with self.repo.config_writer() as cw:
+            cw.set_value("user", "email", "finkel@example.com")
+            cw.set_value("user", "name", "finkel")
+        index = {
+            "foo.json": {
+                "description": "Foo",
+                "last_update": "2021-01-01T00:00:00.000000",
+                "ttl": 86400,
+            },
+            "bar.json": {
+                "description": "Bar",
+                "last_update": "2021-01-01T00:00:00.000000",
+                "ttl": 86400,
+                "partition_fields": ["region"],
+                "partition_root": None,
+                "partitions": {"aaa": ["us"], "bbb": ["eu"]},
+            },
+        }
+        files = {
+            "raw/baz/index.json": json.dumps(index),
+            "raw/baz/foo.json": "{}",
+            "raw/baz/aaa_bar.json": "[1]",
+            "raw/baz/bbb_bar.json": "[22]",
+        }
+        for path, content in files.items():
+            Path(self.tmp.name, path).parent.mkdir(parents=True, exist_ok=True)
+            Path(self.tmp.name, path).write_text(content)
+        self.repo.index.add(list(files.keys()))
+        self.sha = self.repo.index.commit("Add evidence").hexsha
+        self.index_size = len(files["raw/baz/index.json"])
+        self.locker = PruneLocker("repo-foo", local_path=self.tmp.name)
+        self.locker.repo = self.repo
+
+    def tearDown(self):
+        """Cleanup supporting test objects after each test."""
+        logging.disable(logging.NOTSET)
+        self.repo.close()
+        self.tmp.cleanup()
+
+    def test_plan(self):
+        """Ensures files, bytes and index changes are planned from git objects."""
+        plan = PrunePlan(self.locker)
+        plan.add({"raw/baz/foo.json": "Meh", "raw/baz/nope.json": "Meh"}, "finkel")
+        plan.add({"raw/baz/b*.json": "Partitioned"}, "finkel")
+        report = plan.get_report()
+        self.assertEqual(report["commit"], self.sha)
+        self.assertEqual(
+            report["summary"],
+            {"evidence": 2, "files": 3, "bytes": 9, "index_files": 1, "errors": 1},
+        )
+        self.assertEqual(
+            report["evidence"],
+            [
+                {
+                    "path": "raw/baz/foo.json",
+                    "reason": "Meh",
+                    "files": {"raw/baz/foo.json": 2},
+                },
+                {
+                    "path": "raw/baz/bar.json",
+                    "reason": "Partitioned",
+                    "files": {"raw/baz/aaa_bar.json": 3, "raw/baz/bbb_bar.json": 4},
+                },
+            ],
+        )
+        index = report["index_files"]["raw/baz/index.json"]
+        self.assertEqual(index["entries"], ["foo.json", "bar.json"])
+        self.assertEqual(index["bytes_before"], self.index_size)
+        self.assertEqual(report["errors"][0]["path"], "raw/baz/nope.json")
+        tombstone = plan._indexes["raw/baz/index.json"]["metadata"]["foo.json"]
+        self.assertEqual(tombstone["tombstones"]["foo.json"][0]["commit"], self.sha)
+        # The locker files and git index are untouched
+        self.assertTrue(Path(self.tmp.name, "raw/baz/foo.json").is_file())
+        self.assertFalse(self.repo.is_dirty())
+
+    def test_plan_split_tombstones(self):
+        """Ensures tombstones files are planned when splitting tombstones."""
+        self.locker.split_tombstones = True
+        plan = PrunePlan(self.locker)
+        plan.add({"raw/baz/foo.json": "Meh"}, "finkel")
+        report = plan.get_report()
+        index = report["index_files"]["raw/baz/index.json"]
+        self.assertLess(index["bytes_after"], index["bytes_before"])
+        self.assertNotIn("foo.json", plan._indexes["raw/baz/index.json"]["metadata"])
+        tombstones_file = "notifications/prune/tombstones/raw/baz/tombstones.json"
+        tombstones = report["index_files"][tombstones_file]
+        self.assertEqual(tombstones["entries"], ["foo.json"])
+        self.assertEqual(tombstones["bytes_before"], 0)
+        metadata = plan._indexes[tombstones_file]["metadata"]
+        self.assertEqual(tombstones["bytes_after"], len(format_index(metadata)))
+        self.assertEqual(report["summary"]["index_files"], 2)
+
+    def test_format_markdown(self):
+        """Ensures a plan report is rendered as Markdown."""
+        plan = PrunePlan(self.locker)
+        plan.add({"raw/baz/foo.json": "Meh", "raw/baz/nope.json": "Meh"}, "finkel")
+        markdown = format_markdown(plan.get_report())
+        self.assertTrue(markdown.startswith("# Prune dry-run report\n"))
+        self.assertIn("| `raw/baz/foo.json` | Meh | 1 | 2 |", markdown)
+        self.assertIn("| `raw/baz/index.json` | foo.json |", markdown)
+        self.assertIn("## Errors\n\n- `raw/baz/nope.json`: ", markdown)
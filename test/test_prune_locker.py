@@ -17,10 +17,19 @@ import json
 import logging
 import tempfile
 import unittest
-from unittest.mock import MagicMock, call, create_autospec, mock_open, patch
+from pathlib import Path
+from unittest.mock import (
+    MagicMock,
+    call,
+    create_autospec,
+    mock_open,
+    patch,
+)
 
 from compliance.evidence import RawEvidence
-from compliance.utils.exceptions import EvidenceNotFoundError
+from compliance.utils.exceptions import EvidenceNotFoundError, LockerPushError
+
+import git
 
 from prune.locker import PruneLocker
 
@@ -37,12 +46,15 @@ class TestPruneLocker(unittest.TestCase):
         self.ctime_patcher = patch("prune.locker.time.ctime")
         self.ctime_mock = self.ctime_patcher.start()
         self.ctime_mock.return_value = "NOW"
-        self.push_patcher = patch("compliance.locker.Locker.push")
+        self.push_patcher = patch("prune.locker.PruneLocker.push")
         self.push_mock = self.push_patcher.start()
         self.checkin_patcher = patch("compliance.locker.Locker.checkin")
         self.checkin_mock = self.checkin_patcher.start()
         self.init_patcher = patch("compliance.locker.Locker.init")
         self.init_mock = self.init_patcher.start()
+        self.glc_patcher = patch("prune.locker.get_last_commits")
+        self.get_last_commits_mock = self.glc_patcher.start()
+        self.get_last_commits_mock.return_value = {}
 
     def tearDown(self):
         """Cleanup supporting test objects after each test."""
@@ -51,12 +63,64 @@ class TestPruneLocker(unittest.TestCase):
         self.push_patcher.stop()
         self.checkin_patcher.stop()
         self.init_patcher.stop()
+        self.glc_patcher.stop()
 
     def test_constructor(self):
         """Ensures a pruned list is added as an attribute."""
         locker = PruneLocker("repo-foo")
         self.assertEqual(locker.pruned, [])
 
+    def test_constructor_clone_mode(self):
+        """Ensures clone modes are validated and shallow mode sets depth."""
+        with self.assertRaises(ValueError):
+            PruneLocker("repo-foo", clone_mode="foo")
+        locker = PruneLocker(
+            "repo-foo", clone_mode="shallow", sparse_paths=["raw/foo/bar.json"]
+        )
+        self.assertEqual(locker.clone_depth, 1)
+        self.assertEqual(locker.sparse_folders, ["raw/foo"])
+
+    def test_sparse_folders_split_tombstones(self):
+        """Ensures tombstones folders are checked out with split tombstones."""
+        locker = PruneLocker(
+            "repo-foo",
+            clone_mode="sparse",
+            sparse_paths=["raw/foo/bar.json"],
+            split_tombstones=True,
+        )
+        self.assertEqual(
+            locker.sparse_folders,
+            ["notifications/prune/tombstones/raw/foo", "raw/foo"],
+        )
+
+    def test_deepen_shallow_history(self):
+        """Ensures more history is fetched when a tombstone commit is missing."""
+        self.glc_patcher.stop()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        work = git.Repo.init(Path(tmp.name, "work"))
+        work.git.symbolic_ref("HEAD", "refs/heads/master")
+        with work.config_writer() as cw:
+            cw.set_value("user", "email", "finkel@example.com")
+            cw.set_value("user", "name", "finkel")
+        shas = {}
+        for name in ["foo.json", "bar.json", "baz.json"]:
+            path = Path(work.working_dir, "raw", "bar", name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(name)
+            work.index.add([str(path)])
+            shas[f"raw/bar/{name}"] = work.index.commit(f"Add {name}").hexsha
+        work.close()
+        locker = PruneLocker("repo-foo", clone_mode="shallow")
+        locker.repo = git.Repo.clone_from(
+            f"file://{Path(tmp.name, 'work')}", Path(tmp.name, "local"), depth=1
+        )
+        self.addCleanup(locker.repo.close)
+        self.assertTrue(locker.is_shallow)
+        self.assertEqual(locker._get_last_commits(list(shas.keys())), shas)
+        self.assertFalse(locker.is_shallow)
+        self.glc_patcher.start()
+
     def test_custom_exit_no_push(self):
         """Ensures that the context manager exit routine does not run push."""
         with PruneLocker("repo-foo") as locker:
@@ -96,7 +160,32 @@ class TestPruneLocker(unittest.TestCase):
         )
         self.push_mock.assert_called_once()
 
-    @patch("prune.locker.format_json")
+    def test_custom_exit_manifest(self):
+        """Ensures pruned paths beyond the message limit go to a manifest."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with PruneLocker("repo-foo", local_path=tmp, message_limit=2) as locker:
+                locker.logger = self.mock_logger
+                locker.repo = MagicMock()
+                locker.commit_date = "2020-01-01T12:34:56.123456"
+                for path in ["foo", "bar", "baz", "qux"]:
+                    locker._record_pruned(path)
+                self.assertEqual(locker.pruned, ["foo", "bar"])
+                self.assertEqual(locker.pruned_count, 4)
+            manifest = (
+                f"{tmp}/notifications/prune/manifests/pruned-2020-01-01T123456.txt"
+            )
+            self.assertEqual(locker.manifest_path, manifest)
+            with open(manifest) as f:
+                self.assertEqual(f.read(), "foo\nbar\nbaz\nqux\n")
+            locker.repo.index.add.assert_called_once_with([manifest])
+        self.checkin_mock.assert_called_once_with(
+            "Pruned abandoned evidence at local time NOW\n\nfoo\nbar\n\n"
+            "...and 2 more.  See "
+            "notifications/prune/manifests/pruned-2020-01-01T123456.txt "
+            "for the full list."
+        )
+
+    @patch("prune.index.format_json")
     @patch("compliance.locker.Locker.remove_partitions")
     def test_remove_unpartitioned_evidence(self, mock_remove_parts, mock_format):
         """Ensures that removing unpartitioned evidence works."""
@@ -124,6 +213,11 @@ class TestPruneLocker(unittest.TestCase):
                 locker.repo = mock_repo
                 self.assertEqual(locker.pruned, [])
                 locker.remove_evidence(evidence, "Just cuz", "finkel")
+                mock_format.assert_not_called()
+                self.assertEqual(
+                    locker.flush_indexes(),
+                    [f"{tempfile.gettempdir()}/repo-foo/raw/bar/index.json"],
+                )
                 mock_remove_parts.assert_not_called()
                 mock_repo_index_remove.assert_called_once_with(
                     [f"{tempfile.gettempdir()}/repo-foo/raw/bar/foo.json"],
@@ -161,7 +255,7 @@ class TestPruneLocker(unittest.TestCase):
             m.mock_calls,
         )
 
-    @patch("prune.locker.format_json")
+    @patch("prune.index.format_json")
     @patch("compliance.locker.Locker.remove_partitions")
     def test_remove_partitioned_evidence(self, mock_remove_parts, mock_format):
         """Ensures that removing partitioned evidence works."""
@@ -197,6 +291,11 @@ class TestPruneLocker(unittest.TestCase):
                 locker.repo = mock_repo
                 self.assertEqual(locker.pruned, [])
                 locker.remove_evidence(evidence, "Just cuz", "finkel")
+                mock_format.assert_not_called()
+                self.assertEqual(
+                    locker.flush_indexes(),
+                    [f"{tempfile.gettempdir()}/repo-foo/raw/bar/index.json"],
+                )
                 mock_remove_parts.assert_called_once_with(
                     evidence, {"part-1": ["foo"], "part-2": ["bar"]}.keys()
                 )
@@ -245,3 +344,813 @@ class TestPruneLocker(unittest.TestCase):
             call(f"{tempfile.gettempdir()}/repo-foo/raw/bar/index.json", "w"),
             m.mock_calls,
         )
+
+    @patch("prune.index.format_json")
+    @patch("compliance.locker.Locker.remove_partitions")
+    def test_remove_evidences(self, mock_remove_parts, mock_format):
+        """Ensures that evidence sharing an index file is removed in bulk."""
+        m = mock_open(
+            read_data=json.dumps(
+                {
+                    "foo.json": {
+                        "description": "Foo evidence",
+                        "last_update": "a long time ago",
+                        "ttl": 86400,
+                    },
+                    "bar.json": {
+                        "description": "Bar evidence",
+                        "last_update": "yesterday",
+                        "ttl": 86400,
+                        "partition_fields": ["whatever"],
+                        "partition_root": None,
+                        "partitions": {"part-1": ["foo"]},
+                    },
+                }
+            )
+        )
+        with patch("builtins.open", m):
+            foo = RawEvidence("foo.json", "bar", description="Foo evidence")
+            bar = RawEvidence(
+                "bar.json",
+                "bar",
+                description="Bar evidence",
+                partition={"fields": ["whatever"]},
+            )
+            self.get_last_commits_mock.return_value = {
+                "raw/bar/part-1_bar.json": "abc123"
+            }
+            with PruneLocker("repo-foo") as locker:
+                mock_repo = MagicMock()
+                locker.repo = mock_repo
+                locker.remove_evidences([(foo, "Just cuz"), (bar, "Because")], "finkel")
+                mock_repo.index.add.assert_not_called()
+                locker.flush_indexes()
+                mock_remove_parts.assert_not_called()
+                mock_repo.index.remove.assert_called_once_with(
+                    [
+                        f"{tempfile.gettempdir()}/repo-foo/raw/bar/foo.json",
+                        f"{tempfile.gettempdir()}/repo-foo/raw/bar/part-1_bar.json",
+                    ],
+                    working_tree=True,
+                )
+                mock_repo.index.add.assert_called_once_with(
+                    [f"{tempfile.gettempdir()}/repo-foo/raw/bar/index.json"]
+                )
+                self.assertEqual(
+                    locker.pruned, ["raw/bar/foo.json", "raw/bar/bar.json"]
+                )
+                self.get_last_commits_mock.assert_called_once_with(
+                    mock_repo, ["raw/bar/foo.json", "raw/bar/part-1_bar.json"]
+                )
+                metadata = mock_format.call_args[0][0]
+                self.assertNotIn(
+                    "commit", metadata["foo.json"]["tombstones"]["foo.json"][0]
+                )
+                self.assertEqual(
+                    metadata["bar.json"]["tombstones"]["part-1"][0]["commit"],
+                    "abc123",
+                )
+                self.assertEqual(metadata["foo.json"]["pruned_by"], "finkel")
+                self.assertEqual(
+                    metadata["bar.json"]["tombstones"]["part-1"][0]["reason"],
+                    "Because",
+                )
+        handle = m()
+        self.assertEqual(handle.read.call_count, 1)
+        self.assertEqual(handle.write.call_count, 1)
+        mock_format.assert_called_once()
+
+    def test_remove_evidences_nothing_to_remove(self):
+        """Ensures that the git index is untouched when there is no evidence."""
+        with PruneLocker("repo-foo") as locker:
+            mock_repo = MagicMock()
+            locker.repo = mock_repo
+            locker.remove_evidences([], "finkel")
+            mock_repo.index.remove.assert_not_called()
+            mock_repo.index.add.assert_not_called()
+
+    def test_remove_evidences_concurrently(self):
+        """Ensures evidence across index files is tombstoned by many workers."""
+        with tempfile.TemporaryDirectory() as tmp:
+            evidences = []
+            for category in ["foo", "bar", "baz"]:
+                index = Path(tmp, "raw", category, "index.json")
+                index.parent.mkdir(parents=True)
+                index.write_text(
+                    json.dumps(
+                        {
+                            "foo.json": {
+                                "description": "Foo evidence",
+                                "last_update": "a long time ago",
+                                "ttl": 86400,
+                            }
+                        }
+                    )
+                )
+                evidences.append(
+                    (RawEvidence("foo.json", category, description="Foo"), category)
+                )
+            with PruneLocker("repo-foo", local_path=tmp, workers=3) as locker:
+                locker.repo = MagicMock()
+                locker.remove_evidences(evidences, "finkel")
+                locker.flush_indexes()
+                self.assertEqual(
+                    locker.pruned,
+                    ["raw/foo/foo.json", "raw/bar/foo.json", "raw/baz/foo.json"],
+                )
+                locker.repo.index.remove.assert_called_once_with(
+                    [f"{tmp}/raw/{c}/foo.json" for c in ["foo", "bar", "baz"]],
+                    working_tree=True,
+                )
+                locker.repo.index.add.assert_called_once_with(
+                    [f"{tmp}/raw/{c}/index.json" for c in ["bar", "baz", "foo"]]
+                )
+            for category in ["foo", "bar", "baz"]:
+                index = json.loads(Path(tmp, "raw", category, "index.json").read_text())
+                tombstone = index["foo.json"]["tombstones"]["foo.json"][0]
+                self.assertEqual(tombstone["reason"], category)
+
+    @patch("prune.locker.BULK_REMOVE_FILES", 2)
+    def test_remove_evidences_bulk_partitions(self):
+        """Ensures many partitions are removed in bulk with a compact tombstone."""
+        with tempfile.TemporaryDirectory() as tmp:
+            parts = {f"part-{n}": [f"key-{n}"] for n in range(4)}
+            index = {
+                "bar.json": {
+                    "description": "Bar evidence",
+                    "last_update": "a long time ago",
+                    "ttl": 86400,
+                    "partition_fields": ["whatever"],
+                    "partition_root": None,
+                    "partitions": parts,
+                }
+            }
+            files = [f"raw/bar/{part}_bar.json" for part in parts]
+            Path(tmp, "raw", "bar").mkdir(parents=True)
+            Path(tmp, "raw", "bar", "index.json").write_text(json.dumps(index))
+            for ev_file in files:
+                Path(tmp, ev_file).write_text("{}")
+            repo = git.Repo.init(tmp)
+            repo.index.add(["raw/bar/index.json"] + files)
+            repo.index.commit("Add evidence")
+            self.get_last_commits_mock.return_value = {
+                files[0]: "abc123",
+                files[1]: "abc123",
+                files[2]: "def456",
+            }
+            locker = PruneLocker("repo-foo", local_path=tmp, compact_partitions=3)
+            locker.repo = repo
+            evidence = locker.get_evidence_descriptor("raw/bar/bar.json")
+            locker.remove_evidences([(evidence, "Because")], "finkel")
+            locker.flush_indexes()
+            staged = repo.git.ls_files().splitlines()
+            repo.close()
+            self.assertEqual(staged, ["raw/bar/index.json"])
+            self.assertFalse(any(Path(tmp, ev_file).exists() for ev_file in files))
+            index = json.loads(Path(tmp, "raw", "bar", "index.json").read_text())
+        tombstones = index["bar.json"]["tombstones"]
+        self.assertEqual(list(tombstones.keys()), ["bar.json"])
+        self.assertEqual(tombstones["bar.json"][0]["partitions"], parts)
+        self.assertEqual(
+            tombstones["bar.json"][0]["commits"],
+            {"abc123": ["part-0", "part-1"], "def456": ["part-2"]},
+        )
+        self.assertEqual(tombstones["bar.json"][0]["reason"], "Because")
+
+    @patch("compliance.locker.Locker.load_content")
+    def test_resolve_evidences(self, mock_load_content):
+        """Ensures evidence is described from index files without its content."""
+        with tempfile.TemporaryDirectory() as tmp:
+            index = Path(tmp, "raw", "bar", "index.json")
+            index.parent.mkdir(parents=True)
+            index.write_text(
+                json.dumps(
+                    {
+                        "foo.json": {
+                            "description": "Foo evidence",
+                            "last_update": "a long time ago",
+                            "ttl": 86400,
+                        },
+                        "bar.json": {
+                            "description": "Bar evidence",
+                            "last_update": "a long time ago",
+                            "ttl": 86400,
+                            "partition_fields": ["region"],
+                            "partition_root": None,
+                            "partitions": {"part-1": ["us"], "part-2": ["eu"]},
+                        },
+                    }
+                )
+            )
+            index_size = index.stat().st_size
+            for name in ["foo.json", "part-1_bar.json", "part-2_bar.json"]:
+                Path(tmp, "raw", "bar", name).write_text("[]")
+            with PruneLocker("repo-foo", local_path=tmp) as locker:
+                locker.repo = MagicMock()
+                evidences = locker.resolve_evidences(
+                    {"raw/bar/foo.json": "foo", "raw/bar/bar.json": "bar"}
+                )
+        mock_load_content.assert_not_called()
+        self.assertEqual([reason for _, reason in evidences], ["foo", "bar"])
+        foo, bar = [evidence for evidence, _ in evidences]
+        self.assertEqual(foo.path, "raw/bar/foo.json")
+        self.assertEqual(foo.description, "Foo evidence")
+        self.assertFalse(foo.is_partitioned)
+        self.assertEqual(bar.dir_path, "raw/bar")
+        self.assertTrue(bar.is_partitioned)
+        self.assertEqual(
+            bar.files, ["raw/bar/part-1_bar.json", "raw/bar/part-2_bar.json"]
+        )
+        self.assertEqual(
+            locker.timer.get_report()["phases"]["resolve"]["bytes"], index_size
+        )
+
+    def test_get_evidence_descriptor_errors(self):
+        """Ensures missing, pruned and absent evidence is reported."""
+        metadata = {
+            "foo.json": {
+                "description": "Foo evidence",
+                "pruned_by": "finkel",
+                "tombstones": {"foo.json": [{"reason": "meh"}]},
+            },
+            "bar.json": {"description": "Bar", "last_update": "now", "ttl": 1},
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            with PruneLocker("repo-foo", local_path=tmp) as locker:
+                locker.repo = MagicMock()
+                for path in ["raw/bar/foo.json", "raw/bar/baz.json"]:
+                    with self.assertRaises(EvidenceNotFoundError):
+                        locker.get_evidence_descriptor(path, metadata)
+                with self.assertRaises(ValueError) as cm:
+                    locker.get_evidence_descriptor("raw/bar/bar.json", metadata)
+                self.assertEqual(
+                    str(cm.exception),
+                    "Evidence raw/bar/bar.json was not found in the locker",
+                )
+                with self.assertRaises(EvidenceNotFoundError):
+                    locker.get_evidence_descriptor("raw/bar/bar.json")
+
+    def test_checkpoint_items(self):
+        """Ensures pruned evidence is committed once enough is pruned."""
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = Path(tmp, "journal.jsonl")
+            with PruneLocker(
+                "repo-foo",
+                repo_url="https://github.com/foo/bar",
+                local_path=tmp,
+                checkpoint_items=2,
+                checkpoint_push=True,
+                journal_path=str(journal),
+            ) as locker:
+                locker.repo = MagicMock()
+                locker.repo.head.commit.hexsha = "abc123"
+                locker._record_pruned("raw/bar/foo.json")
+                self.assertFalse(locker.checkpoint())
+                locker._record_pruned("raw/bar/bar.json")
+                self.assertTrue(locker.checkpoint())
+                self.checkin_mock.assert_called_once_with(
+                    "Pruned abandoned evidence at local time NOW\n\n"
+                    "raw/bar/foo.json\nraw/bar/bar.json"
+                )
+                self.push_mock.assert_called_once()
+                self.assertEqual(locker.pruned, [])
+                self.assertEqual(locker.checkpoints, 1)
+                self.assertFalse(locker.checkpoint())
+                locker._record_pruned("raw/bar/baz.json")
+            self.assertEqual(self.checkin_mock.call_count, 2)
+            self.assertEqual(self.push_mock.call_count, 2)
+            self.assertEqual(
+                [json.loads(line) for line in journal.read_text().splitlines()],
+                [
+                    {"checkpoint": 0, "commit": "abc123", "pruned": 2, "total": 2},
+                    {"checkpoint": 1, "commit": "abc123", "pruned": 1, "total": 3},
+                ],
+            )
+
+    def test_checkpoint_empty_batch(self):
+        """Ensures checkpoints are only numbered for actual commits."""
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = Path(tmp, "journal.jsonl")
+            with PruneLocker(
+                "repo-foo",
+                local_path=tmp,
+                checkpoint_items=1,
+                journal_path=str(journal),
+                message_limit=0,
+            ) as locker:
+                locker.repo = MagicMock()
+                locker.repo.head.commit.hexsha = "abc123"
+                manifests = []
+                for batch in [["raw/bar/foo.json"], [], ["raw/bar/bar.json"]]:
+                    for evidence_path in batch:
+                        locker._record_pruned(evidence_path)
+                        manifests.append(Path(locker.manifest_path).name)
+                    self.assertEqual(locker.checkpoint(), bool(batch))
+                    locker.commit_pruned()
+                self.assertEqual(locker.checkpoints, 2)
+            stamp = locker.commit_date.split(".")[0].replace(":", "")
+            self.assertEqual(
+                manifests, [f"pruned-{stamp}.txt", f"pruned-{stamp}-1.txt"]
+            )
+            self.assertEqual(
+                [
+                    json.loads(line)["checkpoint"]
+                    for line in journal.read_text().splitlines()
+                ],
+                [0, 1],
+            )
+
+    def test_checkpoint_seconds(self):
+        """Ensures pruned evidence is committed once enough time passes."""
+        with PruneLocker("repo-foo", checkpoint_seconds=60) as locker:
+            locker.repo = MagicMock()
+            locker._record_pruned("raw/bar/foo.json")
+            self.assertFalse(locker.checkpoint())
+            locker._last_checkpoint -= 60
+            self.assertTrue(locker.checkpoint())
+            self.checkin_mock.assert_called_once()
+            self.push_mock.assert_not_called()
+
+    def test_resolve_evidences_resume(self):
+        """Ensures already pruned evidence is skipped when resuming."""
+        with tempfile.TemporaryDirectory() as tmp:
+            index = Path(tmp, "raw", "bar", "index.json")
+            index.parent.mkdir(parents=True)
+            index.write_text(
+                json.dumps(
+                    {
+                        "foo.json": {
+                            "description": "Foo evidence",
+                            "pruned_by": "finkel",
+                            "tombstones": {"foo.json": [{"reason": "meh"}]},
+                        },
+                        "bar.json": {
+                            "description": "Bar evidence",
+                            "last_update": "a long time ago",
+                            "ttl": 86400,
+                        },
+                    }
+                )
+            )
+            Path(tmp, "raw", "bar", "bar.json").write_text("{}")
+            config = {"raw/bar/foo.json": "foo", "raw/bar/bar.json": "bar"}
+            with PruneLocker("repo-foo", local_path=tmp, resume=True) as locker:
+                locker.repo = MagicMock()
+                evidences = locker.resolve_evidences(config)
+            self.assertEqual(
+                [(e.path, reason) for e, reason in evidences],
+                [("raw/bar/bar.json", "bar")],
+            )
+            with PruneLocker("repo-foo", local_path=tmp) as locker:
+                locker.repo = MagicMock()
+                with self.assertRaises(EvidenceNotFoundError):
+                    locker.resolve_evidences(config)
+
+    def test_resume_progress(self):
+        """Ensures the journaled progress is restored when resuming."""
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = Path(tmp, "journal.jsonl")
+            journal.write_text(
+                "".join(
+                    f"{json.dumps(entry)}\n"
+                    for entry in [
+                        {"checkpoint": 0, "commit": "a1", "pruned": 2, "total": 2},
+                        {"checkpoint": 1, "commit": "b2", "pruned": 3, "total": 5},
+                    ]
+                )
+            )
+            for head, checkpoints, pruned in [("b2", 2, 5), ("a1", 0, 0)]:
+                locker = PruneLocker(
+                    "repo-foo",
+                    local_path=str(Path(tmp, "locker")),
+                    journal_path=str(journal),
+                    resume=True,
+                )
+                locker.repo = MagicMock()
+                locker.repo.head.commit.hexsha = head
+                locker.init()
+                self.assertEqual(locker.checkpoints, checkpoints)
+                self.assertEqual(locker.pruned_count, pruned)
+            self.assertIsNone(locker.resumed_from)
+
+    def test_resolve_evidences_pruned_by_run(self):
+        """Ensures evidence pruned earlier in the run is skipped."""
+        for split_tombstones in [False, True]:
+            with tempfile.TemporaryDirectory() as tmp:
+                index = Path(tmp, "raw", "bar", "index.json")
+                index.parent.mkdir(parents=True)
+                index.write_text(
+                    json.dumps(
+                        {
+                            "foo.json": {
+                                "description": "Foo evidence",
+                                "last_update": "a long time ago",
+                                "ttl": 86400,
+                            }
+                        }
+                    )
+                )
+                Path(tmp, "raw", "bar", "foo.json").write_text("{}")
+                config = {"raw/bar/foo.json": "foo"}
+                locker = PruneLocker(
+                    "repo-foo", local_path=tmp, split_tombstones=split_tombstones
+                )
+                locker.repo = MagicMock()
+                evidences = locker.resolve_evidences(config)
+                locker.remove_evidences(evidences, "finkel")
+                locker.flush_indexes()
+                self.assertEqual(locker.resolve_evidences(config), [])
+                self.assertEqual(locker.pruned_count, 1)
+
+    def test_index_cache(self):
+        """Ensures index files are parsed once and written once per flush."""
+        with tempfile.TemporaryDirectory() as tmp:
+            index = Path(tmp, "raw", "bar", "index.json")
+            index.parent.mkdir(parents=True)
+            metadata = {
+                name: {
+                    "description": "Evidence",
+                    "last_update": "a long time ago",
+                    "ttl": 86400,
+                }
+                for name in ["foo.json", "bar.json", "baz.json"]
+            }
+            index.write_text(json.dumps(metadata))
+            for name in metadata.keys():
+                Path(tmp, "raw", "bar", name).write_text("{}")
+            locker = PruneLocker("repo-foo", local_path=tmp)
+            locker.repo = MagicMock()
+            for path in ["raw/bar/foo.json", "raw/bar/bar.json"]:
+                evidences = locker.resolve_evidences({path: "Because"})
+                locker.remove_evidences(evidences, "finkel")
+            self.assertEqual(locker.timer.phases["index-read"]["calls"], 1)
+            self.assertEqual(json.loads(index.read_text()), metadata)
+            self.assertNotIn(
+                "last_update", locker.get_evidence_metadata("raw/bar/foo.json")
+            )
+            self.assertEqual(locker.flush_indexes(), [str(index)])
+            self.assertEqual(locker.flush_indexes(), [])
+            self.assertEqual(locker.timer.phases["index-write"]["calls"], 1)
+            flushed = json.loads(index.read_text())
+            self.assertEqual(list(flushed["bar.json"].keys())[-1], "tombstones")
+            self.assertEqual(flushed["baz.json"], metadata["baz.json"])
+            locker.get_evidence_descriptor("raw/bar/baz.json")
+            self.assertEqual(locker.timer.phases["index-read"]["calls"], 1)
+            index.write_text(json.dumps({"baz.json": metadata["baz.json"]}))
+            self.assertIsNone(locker.get_evidence_metadata("raw/bar/foo.json"))
+            self.assertEqual(locker.timer.phases["index-read"]["calls"], 2)
+
+    def test_remove_evidences_split_tombstones(self):
+        """Ensures pruned entries are moved to a tombstones file when splitting."""
+        with tempfile.TemporaryDirectory() as tmp:
+            index = Path(tmp, "raw", "bar", "index.json")
+            index.parent.mkdir(parents=True)
+            metadata = {
+                "foo.json": {
+                    "description": "Foo evidence",
+                    "last_update": "a long time ago",
+                    "ttl": 86400,
+                },
+                "bar.json": {
+                    "description": "Bar evidence",
+                    "last_update": "a long time ago",
+                    "ttl": 86400,
+                },
+            }
+            index.write_text(json.dumps(metadata))
+            Path(tmp, "raw", "bar", "foo.json").write_text("{}")
+            Path(tmp, "raw", "bar", "bar.json").write_text("{}")
+            config = {"raw/bar/foo.json": "foo"}
+            locker = PruneLocker("repo-foo", local_path=tmp, split_tombstones=True)
+            locker.repo = MagicMock()
+            locker.remove_evidences(locker.resolve_evidences(config), "finkel")
+            locker.flush_indexes()
+            tombstones_file = Path(
+                tmp, "notifications/prune/tombstones/raw/bar/tombstones.json"
+            )
+            locker.repo.index.add.assert_called_once_with(
+                [str(tombstones_file), str(index)]
+            )
+            self.assertEqual(
+                json.loads(index.read_text()), {"bar.json": metadata["bar.json"]}
+            )
+            tombstones = json.loads(tombstones_file.read_text())
+            self.assertEqual(tombstones["foo.json"]["pruned_by"], "finkel")
+            self.assertEqual(
+                tombstones["foo.json"]["tombstones"]["foo.json"][0]["reason"], "foo"
+            )
+            locker = PruneLocker(
+                "repo-foo", local_path=tmp, split_tombstones=True, resume=True
+            )
+            self.assertEqual(locker.resolve_evidences(config), [])
+
+
+class TestPruneLockerBare(unittest.TestCase):
+    """Test PruneLocker bare mode against a local remote locker."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.TemporaryDirectory()
+        work = git.Repo.init(Path(self.tmp.name, "work"))
+        work.git.symbolic_ref("HEAD", "refs/heads/master")
+        index = {
+            "foo.json": {
+                "description": "Foo evidence",
+                "last_update": "2021-01-01T00:00:00.000000",
+                "ttl": 86400,
+            },
+            "bar.json": {
+                "description": "Bar evidence",
+                "last_update": "2021-01-01T00:00:00.000000",
+                "ttl": 86400,
+                "partition_fields": ["whatever"],
+                "partition_root": None,
+                "partitions": {"part-1": ["foo"], "part-2": ["bar"]},
+            },
+        }
+        files = {
+            "raw/baz/index.json": json.dumps(index),
+            "raw/baz/foo.json": "{}",
+            "raw/baz/part-1_bar.json": "[1]",
+            "raw/baz/part-2_bar.json": "[2]",
+        }
+        for path, content in files.items():
+            Path(work.working_dir, path).parent.mkdir(parents=True, exist_ok=True)
+            Path(work.working_dir, path).write_text(content)
+        work.index.add(list(files.keys()))
+        self.gitconfig = {"user": {"email": "finkel@example.com", "name": "finkel"}}
+        with work.config_writer() as cw:
+            cw.set_value("user", "email", "finkel@example.com")
+            cw.set_value("user", "name", "finkel")
+        work.index.commit("Add evidence")
+        self.remote = Path(self.tmp.name, "locker.git")
+        work.clone(self.remote, bare=True).close()
+        work.close()
+
+    def tearDown(self):
+        """Cleanup supporting test objects after each test."""
+        logging.disable(logging.NOTSET)
+        self.tmp.cleanup()
+
+    def test_bare_prune(self):
+        """Ensures evidence is pruned and pushed without checking out files."""
+        local_path = Path(self.tmp.name, "local")
+        locker = PruneLocker(
+            name="prune-bare",
+            repo_url=f"file://{self.remote}",
+            do_push=True,
+            gitconfig=self.gitconfig,
+            local_path=str(local_path),
+            bare=True,
+        )
+        with locker:
+            evidences = locker.resolve_evidences({"raw/baz/bar.json": "Parts"})
+            locker.remove_evidences(evidences, "finkel")
+            evidence = locker.get_evidence_descriptor("raw/baz/foo.json")
+            locker.remove_evidence(evidence, "Foo", "finkel")
+            with self.assertRaises(ValueError):
+                locker.get_evidence_descriptor("raw/baz/bar.json")
+        locker.repo.close()
+        self.assertEqual(sorted(p.name for p in local_path.iterdir()), [".git"])
+        remote = git.Repo(self.remote)
+        files = remote.git.ls_tree("-r", "--name-only", "master").splitlines()
+        index = json.loads(remote.git.show("master:raw/baz/index.json"))
+        remote.close()
+        self.assertEqual(files, ["raw/baz/index.json"])
+        self.assertEqual(
+            index["foo.json"]["tombstones"]["foo.json"][0]["reason"], "Foo"
+        )
+        self.assertEqual(
+            index["bar.json"]["tombstones"]["part-2"][0]["reason"], "Parts"
+        )
+
+    def test_bare_prune_workers(self):
+        """Ensures index blobs are read safely by concurrent workers."""
+        work = git.Repo.clone_from(f"file://{self.remote}", Path(self.tmp.name, "many"))
+        index = {
+            name: {
+                "description": "Evidence",
+                "last_update": "2021-01-01T00:00:00.000000",
+                "ttl": 86400,
+            }
+            for name in ["foo.json", "bar.json"]
+        }
+        config = {}
+        for category in range(100):
+            folder = Path(work.working_dir, "raw", f"cat{category}")
+            folder.mkdir(parents=True)
+            Path(folder, "index.json").write_text(json.dumps(index))
+            for name in index:
+                Path(folder, name).write_text("{}")
+                config[f"raw/cat{category}/{name}"] = "Workers"
+        work.git.add("raw")
+        work.index.commit("Add more evidence")
+        work.remote().push("master")
+        work.close()
+        locker = PruneLocker(
+            name="prune-bare-workers",
+            repo_url=f"file://{self.remote}",
+            do_push=True,
+            gitconfig=self.gitconfig,
+            local_path=str(Path(self.tmp.name, "local")),
+            bare=True,
+            workers=16,
+        )
+        with locker:
+            evidences = locker.resolve_evidences(config)
+            locker.remove_evidences(evidences, "finkel")
+        locker.repo.close()
+        self.assertEqual(locker.pruned_count, 200)
+        remote = git.Repo(self.remote)
+        files = remote.git.ls_tree("-r", "--name-only", "master").splitlines()
+        remote.close()
+        self.assertEqual(len([f for f in files if f.startswith("raw/cat")]), 100)
+
+    def test_bare_clone_mode(self):
+        """Ensures bare mode requires a clone mode with a full index."""
+        with self.assertRaises(ValueError):
+            PruneLocker("repo-foo", clone_mode="sparse", bare=True)
+        with self.assertRaises(ValueError):
+            PruneLocker("repo-foo", archive_dir="archive", bare=True)
+
+
+class TestPruneLockerPush(unittest.TestCase):
+    """Test PruneLocker pushes against a remote locker changed concurrently."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.gitconfig = {"user": {"email": "finkel@example.com", "name": "finkel"}}
+        self.index = {
+            name: {
+                "description": "Evidence",
+                "last_update": "2021-01-01T00:00:00.000000",
+                "ttl": 86400,
+            }
+            for name in ["foo.json", "bar.json"]
+        }
+        self.remote = Path(self.tmp.name, "locker.git")
+        work = self._clone("work", init=True)
+        self._commit(work, {"foo.json": "{}", "bar.json": "{}"}, self.index)
+        work.clone(self.remote, bare=True).close()
+        work.close()
+
+    def tearDown(self):
+        """Cleanup supporting test objects after each test."""
+        logging.disable(logging.NOTSET)
+        self.tmp.cleanup()
+
+    def _clone(self, name, init=False):
+        path = Path(self.tmp.name, name)
+        if init:
+            repo = git.Repo.init(path)
+            repo.git.symbolic_ref("HEAD", "refs/heads/master")
+        else:
+            repo = git.Repo.clone_from(f"file://{self.remote}", path)
+        with repo.config_writer() as cw:
+            cw.set_value("user", "email", "fetcher@example.com")
+            cw.set_value("user", "name", "fetcher")
+        return repo
+
+    def _commit(self, repo, files, index):
+        files = {f"raw/baz/{name}": content for name, content in files.items()}
+        files["raw/baz/index.json"] = json.dumps(index)
+        for path, content in files.items():
+            Path(repo.working_dir, path).parent.mkdir(parents=True, exist_ok=True)
+            Path(repo.working_dir, path).write_text(content)
+        repo.index.add(list(files.keys()))
+        repo.index.commit("Fetch evidence")
+
+    def _fetch_remotely(self, files, index):
+        fetcher = self._clone("fetcher")
+        self._commit(fetcher, files, index)
+        fetcher.remote().push("master")
+        fetcher.close()
+
+    def _get_locker(self, **kwargs):
+        return PruneLocker(
+            name="prune-push",
+            repo_url=f"file://{self.remote}",
+            do_push=True,
+            gitconfig=self.gitconfig,
+            local_path=str(Path(self.tmp.name, "local")),
+            **kwargs,
+        )
+
+    def _get_remote_files(self):
+        remote = git.Repo(self.remote)
+        files = remote.git.ls_tree("-r", "--name-only", "master").splitlines()
+        index = json.loads(remote.git.show("master:raw/baz/index.json"))
+        remote.close()
+        return files, index
+
+    def test_push_merges_index_changes(self):
+        """Ensures index changes made remotely are merged by evidence."""
+        index = dict(self.index)
+        index["bar.json"] = dict(index["bar.json"], last_update="2023")
+        index["qux.json"] = index["bar.json"]
+        with self._get_locker() as locker:
+            evidences = locker.resolve_evidences({"raw/baz/foo.json": "Old"})
+            locker.remove_evidences(evidences, "finkel")
+            self._fetch_remotely({"bar.json": "[1]", "qux.json": "{}"}, index)
+        locker.repo.close()
+        files, merged = self._get_remote_files()
+        self.assertEqual(
+            files, ["raw/baz/bar.json", "raw/baz/index.json", "raw/baz/qux.json"]
+        )
+        self.assertEqual(merged["bar.json"]["last_update"], "2023")
+        self.assertIn("qux.json", merged)
+        self.assertEqual(
+            merged["foo.json"]["tombstones"]["foo.json"][0]["reason"], "Old"
+        )
+        self.assertEqual(locker.kept, [])
+
+    def test_push_keeps_evidence_updated_remotely(self):
+        """Ensures evidence updated remotely during the prune is kept."""
+        index = dict(self.index)
+        index["foo.json"] = dict(index["foo.json"], last_update="2023")
+        with self._get_locker() as locker:
+            evidences = locker.resolve_evidences(
+                {"raw/baz/foo.json": "Old", "raw/baz/bar.json": "Old"}
+            )
+            locker.remove_evidences(evidences, "finkel")
+            self._fetch_remotely({"foo.json": "[1]"}, index)
+        locker.repo.close()
+        files, merged = self._get_remote_files()
+        self.assertEqual(files, ["raw/baz/foo.json", "raw/baz/index.json"])
+        self.assertEqual(merged["foo.json"], index["foo.json"])
+        self.assertIn("tombstones", merged["bar.json"])
+        self.assertEqual(locker.kept, ["raw/baz/foo.json"])
+        self.assertEqual(locker.pruned_count, 1)
+        remote = git.Repo(self.remote)
+        message = remote.head.commit.message
+        remote.close()
+        self.assertIn("raw/baz/bar.json", message)
+        self.assertNotIn("raw/baz/foo.json", message)
+
+    def test_push_keeps_evidence_updated_remotely_manifest(self):
+        """Ensures evidence kept is taken out of the pruned evidence manifest."""
+        index = dict(self.index)
+        index["foo.json"] = dict(index["foo.json"], last_update="2023")
+        with self._get_locker(message_limit=1) as locker:
+            evidences = locker.resolve_evidences(
+                {"raw/baz/bar.json": "Old", "raw/baz/foo.json": "Old"}
+            )
+            locker.remove_evidences(evidences, "finkel")
+            self._fetch_remotely({"foo.json": "[1]"}, index)
+        locker.repo.close()
+        manifest = Path(locker.manifest_path).relative_to(locker.local_path)
+        remote = git.Repo(self.remote)
+        message = remote.head.commit.message
+        pruned = remote.git.show(f"master:{manifest}")
+        remote.close()
+        self.assertEqual(locker.kept, ["raw/baz/foo.json"])
+        self.assertEqual(pruned, "raw/baz/bar.json")
+        self.assertIn("raw/baz/bar.json\n\n...and 0 more.", message)
+
+    def test_push_keeps_evidence_updated_remotely_split(self):
+        """Ensures evidence updated remotely is kept with split tombstones."""
+        index = dict(self.index)
+        index["foo.json"] = dict(index["foo.json"], last_update="2023")
+        with self._get_locker(split_tombstones=True) as locker:
+            evidences = locker.resolve_evidences(
+                {"raw/baz/foo.json": "Old", "raw/baz/bar.json": "Old"}
+            )
+            locker.remove_evidences(evidences, "finkel")
+            self._fetch_remotely({"foo.json": "[1]"}, index)
+        locker.repo.close()
+        files, merged = self._get_remote_files()
+        self.assertEqual(
+            files,
+            [
+                "notifications/prune/tombstones/raw/baz/tombstones.json",
+                "raw/baz/foo.json",
+                "raw/baz/index.json",
+            ],
+        )
+        self.assertEqual(merged, {"foo.json": index["foo.json"]})
+        remote = git.Repo(self.remote)
+        tombstones = json.loads(
+            remote.git.show(
+                "master:notifications/prune/tombstones/raw/baz/tombstones.json"
+            )
+        )
+        remote.close()
+        self.assertEqual(list(tombstones.keys()), ["bar.json"])
+        self.assertEqual(locker.kept, ["raw/baz/foo.json"])
+
+    @patch("prune.locker.time.sleep")
+    def test_push_retries(self, mock_sleep):
+        """Ensures rejected pushes are retried with a growing delay."""
+        flags = git.remote.PushInfo.ERROR | git.remote.PushInfo.REJECTED
+        rejected = MagicMock(flags=flags)
+        with patch("git.Remote.push", return_value=[rejected]) as mock_push:
+            with self.assertRaises(LockerPushError):
+                with self._get_locker(push_retries=2) as locker:
+                    evidences = locker.resolve_evidences({"raw/baz/foo.json": "Old"})
+                    locker.remove_evidences(evidences, "finkel")
+        locker.repo.close()
+        self.assertEqual(mock_push.call_count, 3)
+        self.assertEqual(mock_sleep.call_args_list, [call(2), call(4)])
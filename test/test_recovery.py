@@ -0,0 +1,207 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune tombstone index and evidence recovery tests."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import git
+
+from prune.recovery import TombstoneIndex, get_tombstones, recover_evidence
+
+
+class TestRecovery(unittest.TestCase):
+    """Test the tombstone index and evidence recovery."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.repo = git.Repo.init(Path(self.tmp.name, "locker"))
+        with self.repo.config_writer() as cw:
+            cw.set_value("user", "email", "finkel@example.com")
+            cw.set_value("user", "name", "finkel")
+        self._write("raw/foo/bar.json", '{"bar": 1}')
+        self._write("raw/foo/a1_baz.json", '{"baz": 1}')
+        self._write("raw/foo/b2_baz.json", '{"baz": 2}')
+        self._write("raw/qux/quux.json", '{"quux": 1}')
+        self.first = self._commit("Add evidence")
+        self.index = {
+            "bar.json": {
+                "description": "Bar",
+                "pruned_by": "finkel",
+                "tombstones": {
+                    "bar.json": [
+                        {
+                            "eol": "2022-01-01T00:00:00.000000",
+                            "last_update": "2021-01-01T00:00:00.000000",
+                            "reason": "Abandoned",
+                            "commit": self.first,
+                        }
+                    ]
+                },
+            },
+            "baz.json": {
+                "description": "Baz",
+                "pruned_by": "finkel",
+                "tombstones": {
+                    "baz.json": [
+                        {
+                            "eol": "2022-01-01T00:00:00.000000",
+                            "last_update": "2021-01-01T00:00:00.000000",
+                            "partition_fields": ["id"],
+                            "partition_root": None,
+                            "partitions": {"a1": ["1"], "b2": ["2"]},
+                            "commits": {self.first: ["a1", "b2"]},
+                            "reason": "Too big",
+                        }
+                    ]
+                },
+            },
+        }
+        self.repo.index.remove(
+            ["raw/foo/bar.json", "raw/foo/a1_baz.json", "raw/foo/b2_baz.json"],
+            working_tree=True,
+        )
+        self._write("raw/foo/index.json", json.dumps(self.index))
+        self.second = self._commit("Prune evidence")
+        self.db_path = str(Path(self.tmp.name, "db", "tombstones.db"))
+        self.tombstones = TombstoneIndex(self.db_path)
+
+    def tearDown(self):
+        """Cleanup supporting test objects after each test."""
+        self.tombstones.close()
+        self.repo.close()
+        self.tmp.cleanup()
+
+    def _write(self, path, content):
+        Path(self.repo.working_dir, path).parent.mkdir(parents=True, exist_ok=True)
+        Path(self.repo.working_dir, path).write_text(content)
+        self.repo.index.add([path])
+
+    def _commit(self, message):
+        return self.repo.index.commit(message).hexsha
+
+    def test_get_tombstones(self):
+        """Ensures a tombstone is provided per removed evidence file."""
+        tombstones = list(get_tombstones("raw/foo/index.json", self.index))
+        self.assertEqual(
+            [(t["path"], t["file"], t["commit_sha"]) for t in tombstones],
+            [
+                ("raw/foo/bar.json", "raw/foo/bar.json", self.first),
+                ("raw/foo/baz.json", "raw/foo/a1_baz.json", self.first),
+                ("raw/foo/baz.json", "raw/foo/b2_baz.json", self.first),
+            ],
+        )
+        self.assertEqual(tombstones[1]["reason"], "Too big")
+        self.assertEqual(tombstones[1]["pruner"], "finkel")
+
+    def test_lookup(self):
+        """Ensures tombstones are found by evidence path or file path."""
+        self.assertEqual(self.tombstones.update("locker", self.repo), 1)
+        bar = self.tombstones.lookup("locker", "raw/foo/bar.json")
+        self.assertEqual(len(bar), 1)
+        self.assertEqual(bar[0]["commit_sha"], self.first)
+        self.assertEqual(bar[0]["eol"], "2022-01-01T00:00:00.000000")
+        self.assertEqual(len(self.tombstones.lookup("locker", "raw/foo/baz.json")), 2)
+        self.assertEqual(
+            len(self.tombstones.lookup("locker", "raw/foo/b2_baz.json")), 1
+        )
+        self.assertEqual(self.tombstones.lookup("other", "raw/foo/bar.json"), [])
+
+    def test_update_incremental(self):
+        """Ensures only index files changed since the last update are read."""
+        self.tombstones.update("locker", self.repo)
+        self.assertEqual(self.tombstones.update("locker", self.repo), 0)
+        self.repo.index.remove(["raw/qux/quux.json"], working_tree=True)
+        self._write(
+            "notifications/prune/tombstones/raw/qux/tombstones.json",
+            json.dumps(
+                {
+                    "quux.json": {
+                        "pruned_by": "finkel",
+                        "tombstones": {
+                            "quux.json": [
+                                {"eol": "2023-01-01T00:00:00.000000", "reason": "Old"}
+                            ]
+                        },
+                    }
+                }
+            ),
+        )
+        self._commit("Prune more evidence")
+        self.assertEqual(self.tombstones.update("locker", self.repo), 1)
+        self.assertEqual(len(self.tombstones.lookup("locker", "raw/foo/bar.json")), 1)
+        quux = self.tombstones.lookup("locker", "raw/qux/quux.json")
+        self.assertEqual(quux[0]["reason"], "Old")
+        self.assertIsNone(quux[0]["commit_sha"])
+
+    def test_update_rewritten_history(self):
+        """Ensures a locker is indexed again after its history is rewritten."""
+        self.tombstones.update("locker", self.repo)
+        self.repo.git.reset("--hard", self.first)
+        self.assertEqual(self.tombstones.update("locker", self.repo), 0)
+        self.assertEqual(self.tombstones.lookup("locker", "raw/foo/bar.json"), [])
+
+    def test_recover_evidence(self):
+        """Ensures evidence is restored from the git object database."""
+        self.tombstones.update("locker", self.repo)
+        tombstones = self.tombstones.lookup("locker", "raw/foo/baz.json")
+        tombstones.append(dict(tombstones[0], commit_sha=None))
+        tombstones.append(dict(tombstones[0], file="raw/foo/c3_baz.json"))
+        tombstones[-1]["commit_sha"] = None
+        output = Path(self.tmp.name, "recovered")
+        results = recover_evidence(self.repo, tombstones, output)
+        self.assertEqual(
+            results,
+            [
+                (str(output / "raw/foo/a1_baz.json"), None),
+                (str(output / "raw/foo/b2_baz.json"), None),
+                (str(output / "raw/foo/a1_baz.json"), None),
+                (None, "No commit recorded for raw/foo/c3_baz.json"),
+            ],
+        )
+        self.assertEqual((output / "raw/foo/b2_baz.json").read_text(), '{"baz": 2}')
+        self.assertFalse(Path(self.repo.working_dir, "raw/foo/b2_baz.json").exists())
+
+    def test_recover_archived_evidence(self):
+        """Ensures archived evidence is restored from the archive repository."""
+        archive = Path(self.tmp.name, "archive", "locker.git")
+        self.repo.clone(archive, bare=True).close()
+        clone = git.Repo.init(Path(self.tmp.name, "clone"))
+        try:
+            tombstone = {
+                "file": "raw/foo/bar.json",
+                "commit_sha": self.first,
+                "archive": archive.name,
+            }
+            output = Path(self.tmp.name, "recovered")
+            results = recover_evidence(clone, [tombstone], output)
+            self.assertIsNone(results[0][0])
+            results = recover_evidence(clone, [tombstone], output, archive.parent)
+            self.assertEqual(results, [(str(output / "raw/foo/bar.json"), None)])
+            tombstone["archive"] = None
+            tombstone["commit_sha"] = "0" * 40
+            self.assertEqual(
+                recover_evidence(clone, [tombstone], output),
+                [
+                    (
+                        None,
+                        f"{'0' * 40}:raw/foo/bar.json not found in the locker history",
+                    )
+                ],
+            )
+        finally:
+            clone.close()
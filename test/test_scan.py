@@ -0,0 +1,107 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune locker scanner tests."""
+
+import json
+import tempfile
+import unittest
+from datetime import datetime as dt
+from pathlib import Path
+
+from prune.scan import LockerScan
+
+DAY = 24 * 60 * 60
+
+
+class TestLockerScan(unittest.TestCase):
+    """Test LockerScan."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.now = dt(2021, 3, 1)
+        old = "2021-01-01T00:00:00.000000"
+        new = "2021-02-28T00:00:00.000000"
+        self._write(
+            "raw/foo/index.json",
+            json.dumps(
+                {
+                    "old.json": {"last_update": old, "ttl": DAY},
+                    "new.json": {"last_update": new, "ttl": DAY},
+                    "gone.json": {"last_update": old, "ttl": DAY},
+                    "parts.json": {
+                        "last_update": old,
+                        "ttl": DAY,
+                        "partition_fields": ["region"],
+                        "partition_root": None,
+                        "partitions": {"aaa": ["us"], "bbb": ["eu"]},
+                    },
+                    "pruned.json": {"tombstones": {"pruned.json": []}},
+                }
+            ),
+        )
+        for name in ["old.json", "new.json", "aaa_parts.json", "bbb_parts.json"]:
+            self._write(f"raw/foo/{name}")
+        for path in [
+            "raw/foo/stray.json",
+            "raw/bar/stray.json",
+            "raw/foo/README.md",
+            "notifications/prune/tombstones/raw/foo/tombstones.json",
+            "raw/foo/.gitkeep",
+            "check_results.json",
+            "notifications/alerts.json",
+            "notifications/prune/manifests/pruned.txt",
+            ".git/HEAD",
+        ]:
+            self._write(path)
+
+    def tearDown(self):
+        """Cleanup supporting test objects after each test."""
+        self.tmp.cleanup()
+
+    def _write(self, path, content="{}"):
+        file_path = Path(self.tmp.name, path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+
+    def test_scan(self):
+        """Ensures abandoned, orphaned and missing evidence is found."""
+        for workers in [1, 4]:
+            scan = LockerScan(self.tmp.name, threshold=30 * DAY, workers=workers)
+            scan.scan()
+            self.assertEqual(scan.index_files, 1)
+            self.assertEqual(
+                sorted(scan.orphans), ["raw/bar/stray.json", "raw/foo/stray.json"]
+            )
+            self.assertEqual(scan.missing, ["raw/foo/gone.json"])
+            self.assertEqual(
+                list(scan.get_abandoned(self.now)),
+                [
+                    (
+                        "raw/foo/old.json",
+                        "Abandoned evidence last updated 2021-01-01, 59 days ago",
+                    ),
+                    (
+                        "raw/foo/parts.json",
+                        "Abandoned evidence last updated 2021-01-01, 59 days ago",
+                    ),
+                ],
+            )
+
+    def test_threshold(self):
+        """Ensures the abandoned evidence threshold is applied."""
+        scan = LockerScan(self.tmp.name, threshold=60 * DAY).scan()
+        self.assertEqual(list(scan.get_abandoned(self.now)), [])
+        scan.threshold = 0
+        self.assertEqual(len(list(scan.get_abandoned(self.now))), 3)
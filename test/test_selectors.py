@@ -0,0 +1,217 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune selector tests."""
+
+import unittest
+from datetime import datetime as dt, timedelta
+
+from prune.selectors import (
+    EvidenceIndex,
+    get_selector_folder,
+    is_selector,
+    validate_selector,
+)
+
+
+class TestSelectors(unittest.TestCase):
+    """Test prune selector helpers and the evidence index."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        recent = dt.utcnow().isoformat()
+        old = (dt.utcnow() - timedelta(days=100)).isoformat()
+        self.index = EvidenceIndex()
+        self.index.add_index(
+            "raw/aws/index.json",
+            {
+                "users_2023.json": {"last_update": recent, "ttl": 86400},
+                "users_2022.json": {"last_update": old, "ttl": 86400},
+                "keys_2023.json": {"last_update": old, "ttl": 86400},
+                "gone.json": {"pruned_by": "finkel", "tombstones": {}},
+            },
+        )
+        self.index.add_index(
+            "raw/gh/index.json", {"repos.json": {"last_update": old, "ttl": 86400}}
+        )
+
+    def test_is_selector(self):
+        """Ensures selectors are told apart from literal evidence paths."""
+        self.assertFalse(is_selector("raw/aws/users.json"))
+        self.assertTrue(is_selector("raw/aws/*.json"))
+        self.assertTrue(is_selector("re:raw/aws/.+"))
+        self.assertTrue(is_selector("stale:30:raw/aws/users.json"))
+        self.assertTrue(is_selector("keep:10:30:reports/foo/bar.md"))
+
+    def test_get_selector_folder(self):
+        """Ensures the folder holding selector matches is provided."""
+        self.assertEqual(get_selector_folder("raw/aws/users.json"), "raw/aws")
+        self.assertEqual(get_selector_folder("raw/aws/*_2023*.json"), "raw/aws")
+        self.assertEqual(get_selector_folder("raw/*/users.json"), "raw")
+        self.assertEqual(get_selector_folder("stale:30:raw/gh/*"), "raw/gh")
+        self.assertEqual(get_selector_folder("keep:10:30:reports/foo/*"), "reports/foo")
+        self.assertIsNone(get_selector_folder("re:raw/aws/.+"))
+        self.assertIsNone(get_selector_folder("*.json"))
+
+    def test_validate_selector(self):
+        """Ensures malformed selectors are rejected before expanding them."""
+        for key in [
+            "raw/aws/users.json",
+            "raw/aws/*.json",
+            "re:raw/aws/.+",
+            "stale:30:raw/aws/*",
+            "keep:0:0:reports/*",
+        ]:
+            validate_selector(key)
+        for key in [
+            "re:raw/aws/(",
+            "stale:thirty:raw/aws/*",
+            "stale:-1:raw/aws/*",
+            "stale:30",
+            "keep:ten:30:reports/*",
+            "keep:10:thirty:reports/*",
+            "keep:10:reports/*",
+            "keep:10:30:",
+        ]:
+            with self.assertRaises(ValueError):
+                validate_selector(key)
+
+    def test_pruned_evidence_not_indexed(self):
+        """Ensures already pruned evidence is left out of the index."""
+        self.assertNotIn("raw/aws/gone.json", self.index.evidences)
+        self.assertEqual(len(self.index.evidences), 4)
+
+    def test_expand_literal(self):
+        """Ensures literal evidence paths are kept as is."""
+        self.assertEqual(
+            self.index.expand({"raw/foo/bar.json": "Abandoned"}),
+            {"raw/foo/bar.json": "Abandoned"},
+        )
+
+    def test_expand_glob(self):
+        """Ensures glob patterns are expanded."""
+        self.assertEqual(
+            self.index.expand({"raw/aws/*_2023*.json": "2023"}),
+            {"raw/aws/keys_2023.json": "2023", "raw/aws/users_2023.json": "2023"},
+        )
+
+    def test_expand_regex(self):
+        """Ensures regular expressions are expanded."""
+        self.assertEqual(
+            self.index.expand({r"re:raw/(aws|gh)/[a-z]+\.json": "Regex"}),
+            {"raw/gh/repos.json": "Regex"},
+        )
+
+    def test_expand_stale(self):
+        """Ensures stale evidence rules are expanded."""
+        self.assertEqual(
+            self.index.expand({"stale:90:raw/*": "Stale"}),
+            {
+                "raw/aws/keys_2023.json": "Stale",
+                "raw/aws/users_2022.json": "Stale",
+                "raw/gh/repos.json": "Stale",
+            },
+        )
+
+    def test_expand_precedence(self):
+        """Ensures literal paths and then earlier selectors supply the reason."""
+        self.assertEqual(
+            self.index.expand(
+                {
+                    "raw/aws/*": "Glob",
+                    "raw/aws/users_2023.json": "Literal",
+                    "stale:90:raw/*": "Stale",
+                }
+            ),
+            {
+                "raw/aws/keys_2023.json": "Glob",
+                "raw/aws/users_2022.json": "Glob",
+                "raw/aws/users_2023.json": "Literal",
+                "raw/gh/repos.json": "Stale",
+            },
+        )
+
+    def test_expand_keep(self):
+        """Ensures retention rules keep the most recent evidence per group."""
+        checks = {
+            "summary": ["chk.foo.FooCheck.test_foo", "chk.foo.FooCheck.test_bar"],
+            "detail": ["chk.bar.BarCheck.test_bar"],
+        }
+        self.index.add_index(
+            "reports/foo/index.json",
+            {
+                f"{report}_{day:02}.md": {
+                    "last_update": f"2023-01-{day:02}T00:00:00.000000",
+                    "checks": checks[report],
+                }
+                for report in ["summary", "detail"]
+                for day in range(1, 5)
+            },
+        )
+        self.assertEqual(
+            self.index.expand({"keep:2:30:reports/*": "Retention"}),
+            {
+                "reports/foo/detail_01.md": "Retention",
+                "reports/foo/detail_02.md": "Retention",
+                "reports/foo/summary_01.md": "Retention",
+                "reports/foo/summary_02.md": "Retention",
+            },
+        )
+        self.assertEqual(
+            self.index.expand(
+                {
+                    "reports/foo/summary_01.md": "Literal",
+                    "reports/foo/detail_04.md": "Literal",
+                    "reports/foo/summary_*": "Glob",
+                    "keep:1:30:*": "Retention",
+                }
+            ),
+            {
+                "reports/foo/summary_01.md": "Literal",
+                "reports/foo/detail_04.md": "Literal",
+                "reports/foo/summary_02.md": "Glob",
+                "reports/foo/summary_03.md": "Glob",
+                "reports/foo/summary_04.md": "Glob",
+                "reports/foo/detail_01.md": "Retention",
+                "reports/foo/detail_02.md": "Retention",
+                "raw/aws/keys_2023.json": "Retention",
+                "raw/aws/users_2022.json": "Retention",
+            },
+        )
+        with self.assertRaises(ValueError):
+            self.index.expand({"keep:-1:30:reports/*": "Retention"})
+
+    def test_expand_keep_recent(self):
+        """Ensures retention rules never select recently updated evidence."""
+        now = dt.utcnow()
+        self.index.add_index(
+            "reports/foo/index.json",
+            {
+                f"report_{days}.md": {
+                    "last_update": (now - timedelta(days=days)).isoformat(),
+                    "checks": ["chk.foo.FooCheck.test_foo"],
+                }
+                for days in [0, 10, 40, 50]
+            },
+        )
+        self.assertEqual(
+            self.index.expand({"keep:1:30:reports/*": "Retention"}),
+            {
+                "reports/foo/report_40.md": "Retention",
+                "reports/foo/report_50.md": "Retention",
+            },
+        )
+        self.assertEqual(
+            self.index.expand({"keep:1:0:reports/*": "Retention"}),
+            {f"reports/foo/report_{days}.md": "Retention" for days in [10, 40, 50]},
+        )
@@ -0,0 +1,60 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune instrumentation tests."""
+
+import unittest
+
+from prune.timing import PhaseTimer
+
+
+class TestPhaseTimer(unittest.TestCase):
+    """Test PhaseTimer."""
+
+    def test_phases(self):
+        """Ensures phase time, calls, counts and bytes accumulate."""
+        timer = PhaseTimer()
+        with timer.phase("clone", count=1):
+            pass
+        timer.record("index-read", 0.5, 1, 100)
+        timer.record("index-read", 0.25, 1, 50)
+        report = timer.get_report()
+        self.assertEqual(set(report["phases"].keys()), {"clone", "index-read"})
+        self.assertEqual(report["phases"]["clone"]["count"], 1)
+        self.assertEqual(
+            report["phases"]["index-read"],
+            {"seconds": 0.75, "calls": 2, "count": 2, "bytes": 150},
+        )
+
+    def test_phase_error(self):
+        """Ensures a phase is recorded when its block raises an exception."""
+        timer = PhaseTimer()
+        with self.assertRaises(ValueError):
+            with timer.phase("push"):
+                raise ValueError("meh")
+        self.assertEqual(timer.get_report()["phases"]["push"]["calls"], 1)
+
+    def test_index_files(self):
+        """Ensures index file reads and writes are tracked per index file."""
+        timer = PhaseTimer()
+        timer.record_index_file("raw/foo/index.json", 0.5, read=100)
+        timer.record_index_file("raw/foo/index.json", 0.25, written=120)
+        timer.record_index_file("raw/bar/index.json", 1.0, read=10)
+        self.assertEqual(
+            timer.get_report()["index_files"]["raw/foo/index.json"],
+            {"seconds": 0.75, "bytes_read": 100, "bytes_written": 120},
+        )
+        report = timer.format_report(top=1)
+        self.assertIn("Slowest index files (top 1):", report)
+        self.assertIn("raw/bar/index.json", report)
+        self.assertNotIn("raw/foo/index.json", report)
@@ -0,0 +1,97 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prune trash tests."""
+
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from prune.trash import Trash, empty_trash
+
+
+class TestTrash(unittest.TestCase):
+    """Test Trash."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.trash_path = os.path.join(self.tmp.name, "trash")
+
+    def tearDown(self):
+        """Cleanup supporting test objects after each test."""
+        self.tmp.cleanup()
+
+    def _make_locker(self, name="prune"):
+        path = Path(self.tmp.name, name)
+        Path(path, "raw", "foo").mkdir(parents=True)
+        Path(path, "raw", "foo", "bar.json").write_text("{}")
+        return str(path)
+
+    def test_move_background(self):
+        """Ensures trashed lockers are deleted in a background thread."""
+        trash = Trash("background", self.trash_path)
+        locker_path = self._make_locker()
+        trashed = trash.move(locker_path)
+        self.assertFalse(os.path.exists(locker_path))
+        self.assertTrue(os.path.basename(trashed).startswith("prune-"))
+        trash.wait()
+        self.assertEqual(os.listdir(self.trash_path), [])
+
+    def test_move_own_entries(self):
+        """Ensures a run only deletes its own and left behind trashed lockers."""
+        os.makedirs(self.trash_path)
+        os.rename(self._make_locker("old"), os.path.join(self.trash_path, "old"))
+        trash = Trash("background", self.trash_path)
+        trash.move(self._make_locker("foo"))
+        trash.wait()
+        self.assertEqual(os.listdir(self.trash_path), [])
+        os.rename(self._make_locker("other"), os.path.join(self.trash_path, "other"))
+        trash.move(self._make_locker("bar"))
+        trash.wait()
+        self.assertEqual(os.listdir(self.trash_path), ["other"])
+
+    def test_move_defer(self):
+        """Ensures deferred lockers are left for a later run to delete."""
+        Trash("defer", self.trash_path).move(self._make_locker("foo"))
+        self.assertEqual(len(os.listdir(self.trash_path)), 1)
+        trash = Trash("background", self.trash_path)
+        trash.move(self._make_locker("bar"))
+        trash.wait()
+        self.assertEqual(os.listdir(self.trash_path), [])
+
+    def test_move_detached(self):
+        """Ensures trashed lockers are deleted by a separate process."""
+        Trash("detached", self.trash_path).move(self._make_locker())
+        for _ in range(100):
+            if not os.listdir(self.trash_path):
+                break
+            time.sleep(0.1)
+        self.assertEqual(os.listdir(self.trash_path), [])
+
+    def test_empty_trash(self):
+        """Ensures only folders in the trash folder are deleted."""
+        os.makedirs(self.trash_path)
+        locker_path = self._make_locker()
+        os.symlink(locker_path, os.path.join(self.trash_path, "link"))
+        os.rename(self._make_locker("foo"), os.path.join(self.trash_path, "foo"))
+        empty_trash(self.trash_path)
+        self.assertEqual(os.listdir(self.trash_path), ["link"])
+        self.assertTrue(os.path.isfile(os.path.join(locker_path, "raw/foo/bar.json")))
+
+    def test_cleanup_mode(self):
+        """Ensures an error is raised for unsupported cleanup modes."""
+        with self.assertRaises(ValueError):
+            Trash("sync", self.trash_path)